@@ -7,6 +7,7 @@ from modules.transform_tab import render_transform_tab
 from modules.load_tab import render_load_tab
 from modules.schedule_tab import render_schedule_tab
 from modules.mariadb_tab import render_mariadb_tab
+from modules.runs_tab import render_runs_tab
 
 # 페이지 기본 설정
 st.set_page_config(
@@ -37,7 +38,7 @@ st.title("☁️ Salesforce Data ETL Manager")
 st.markdown("Salesforce 데이터를 추출하고 스케줄링을 관리하는 대시보드입니다.")
 
 # 탭 구성
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🔐 Connection", "📊 Extract Settings", "🛠️ Transform", "🚀 Load", "⏰ Schedule", "🗄️ MariaDB"])
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["🔐 Connection", "📊 Extract Settings", "🛠️ Transform", "🚀 Load", "⏰ Schedule", "🗄️ MariaDB", "📈 Runs"])
 
 # --- TAB 1: Salesforce 연결 설정 ---
 with tab1:
@@ -62,3 +63,7 @@ with tab5:
 # --- TAB 6: MariaDB 연결 설정 ---
 with tab6:
     render_mariadb_tab()
+
+# --- TAB 7: 실행 이력 ---
+with tab7:
+    render_runs_tab()
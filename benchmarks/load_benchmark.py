@@ -0,0 +1,126 @@
+"""Row-by-row INSERT vs multi-row INSERT vs LOAD DATA LOCAL INFILE throughput.
+
+Usage:
+    python benchmarks/load_benchmark.py [--rows 100000 1000000] [--batch-size 1000]
+    MARIADB_HOST=... MARIADB_USER=... MARIADB_PASSWORD=... MARIADB_DATABASE=... \\
+        python benchmarks/load_benchmark.py
+
+Without MARIADB_HOST the benchmark runs against an in-memory SQLite database as a
+stand-in; LOAD DATA is MariaDB-only and is reported as skipped there. The server
+needs local_infile=ON for the LOAD DATA row.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db import connect_mariadb, quote_ident
+from modules.db_loader import insert_sql, multi_row_insert, load_data_infile, supports_local_infile
+from modules.transformer import frame_to_rows
+
+TABLE = "etl_load_benchmark"
+COLUMNS = ["sf_id", "name", "amount", "close_date", "is_active", "description"]
+
+def synthetic_frame(rows, seed=42):
+    """A transformed batch shaped like an Opportunity load (strings, decimals, dates, flags, text)."""
+    rng = np.random.default_rng(seed)
+    days = np.datetime64('2020-01-01') + rng.integers(0, 5 * 365, rows).astype('timedelta64[D]')
+    description = pd.Series(rng.choice(['', 'Renewal', 'Multi-line\nnote', 'Tab\tseparated'], rows), dtype=object)
+    return pd.DataFrame({
+        'sf_id': pd.Series([f"006{i:015d}" for i in range(rows)], dtype=object),
+        'name': pd.Series(rng.choice(['Acme', 'Globex', 'Initech', '한글 거래처'], rows), dtype=object),
+        'amount': np.round(rng.random(rows) * 100000, 2),
+        'close_date': pd.Series(np.datetime_as_string(days), dtype=object),
+        'is_active': pd.Series(rng.integers(0, 2, rows), dtype='Int64'),
+        'description': description.mask(description == '', None),
+    })
+
+def create_table(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(f"""
+            CREATE TABLE {TABLE} (
+                sf_id CHAR(18) NOT NULL,
+                name VARCHAR(255),
+                amount DECIMAL(18,2),
+                close_date DATE,
+                is_active TINYINT(1),
+                description TEXT
+            )
+        """)
+        conn.commit()
+    finally:
+        cur.close()
+
+def row_by_row(conn, frame):
+    sql = insert_sql(conn, TABLE, COLUMNS)
+    cur = conn.cursor()
+    try:
+        for row in frame_to_rows(frame):
+            cur.execute(sql, row)
+    finally:
+        cur.close()
+
+def multi_row(conn, frame):
+    multi_row_insert(conn, TABLE, COLUMNS, frame_to_rows(frame))
+
+def load_data(conn, frame):
+    load_data_infile(conn, TABLE, COLUMNS, frame)
+
+METHODS = [("row-by-row", row_by_row), ("multi-row", multi_row), ("LOAD DATA", load_data)]
+
+def run(conn, method, frame, batch_size):
+    """Load the frame batch by batch, committing after each batch like the runner does."""
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {quote_ident(TABLE)}")
+    conn.commit()
+    started = time.perf_counter()
+    for i in range(0, len(frame), batch_size):
+        method(conn, frame.iloc[i:i + batch_size])
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    cur.execute(f"SELECT COUNT(*) FROM {quote_ident(TABLE)}")
+    count = cur.fetchone()[0]
+    cur.close()
+    if count != len(frame):
+        raise RuntimeError(f"expected {len(frame)} rows, found {count}")
+    return elapsed
+
+def connect():
+    if not os.environ.get("MARIADB_HOST"):
+        return sqlite3.connect(":memory:"), "SQLite (stand-in)"
+    return connect_mariadb({
+        'host': os.environ["MARIADB_HOST"],
+        'port': os.environ.get("MARIADB_PORT", 3306),
+        'user': os.environ.get("MARIADB_USER", "root"),
+        'password': os.environ.get("MARIADB_PASSWORD", ""),
+        'database': os.environ.get("MARIADB_DATABASE", "test"),
+    }), "MariaDB"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    conn, label = connect()
+    create_table(conn)
+    print(f"Target: {label}, batch size {args.batch_size}")
+    print(f"{'Method':<12} {'rows':>10} {'seconds':>9} {'rows/s':>12}")
+    for rows in args.rows:
+        frame = synthetic_frame(rows)
+        for name, method in METHODS:
+            if method is load_data and not supports_local_infile(conn):
+                print(f"{name:<12} {rows:>10,} {'skipped (needs MariaDB with local_infile)':>22}")
+                continue
+            elapsed = run(conn, method, frame, args.batch_size)
+            print(f"{name:<12} {rows:>10,} {elapsed:>9.2f} {rows / elapsed:>12,.0f}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from .metrics import count, observe, timed
+
+DEFAULT_API_CONCURRENCY = 4
+# Object the current thread (or pipeline stage started from it) is calling the API for
+_tag = contextvars.ContextVar("api_budget_tag", default=None)
+
+class TokenBucket:
+    """Token bucket: rate tokens per second (None = unlimited) in bursts of up to capacity."""
+
+    def __init__(self, rate=None, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            if rate != self.rate:
+                self._refill(time.monotonic())
+                self.rate = rate
+
+    def take(self):
+        """Take one token, sleeping until it is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                if not self.rate:
+                    return waited
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+class ApiBudget:
+    """Global concurrency / rate budget for Salesforce API calls shared by extraction workers.
+
+    With a governor (api_limits.ApiGovernor) every call is checked against the org's remaining
+    daily allocation, and the token bucket slows down as that headroom runs low.
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_API_CONCURRENCY, calls_per_second=None, governor=None):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._sem = threading.BoundedSemaphore(self.max_concurrent)
+        self.calls_per_second = calls_per_second or None
+        self._bucket = TokenBucket(self.calls_per_second, self.max_concurrent)
+        self.governor = governor
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.bytes = 0
+        # Per-object usage, attributed through track() on the calling thread
+        self.usage = {}
+
+    @contextmanager
+    def acquire(self):
+        """Hold one API slot for the duration of a call, pacing calls through the token bucket."""
+        with self._sem:
+            if self.governor is not None:
+                self.governor.check()
+                self._bucket.set_rate(self.governor.rate(self.calls_per_second))
+            waited = self._bucket.take()
+            if waited:
+                observe("sf_throttle", waited)
+            with self._lock:
+                self.calls += 1
+            yield
+
+    @contextmanager
+    def track(self, tag):
+        """Attribute the API calls and response bytes made on this thread to tag (an object name).
+
+        Threads started in a copy of the caller's context (see pipeline.prefetch) are attributed too.
+        """
+        token = _tag.set(tag)
+        try:
+            yield
+        finally:
+            _tag.reset(token)
+
+    def record(self, resp):
+        if self.governor is not None:
+            self.governor.observe_header(resp.headers.get("Sforce-Limit-Info"))
+        size = len(resp.content or b"")
+        count("sf_response_bytes", size)
+        tag = _tag.get()
+        with self._lock:
+            self.bytes += size
+            if tag is not None:
+                usage = self.usage.setdefault(tag, {'api_calls': 0, 'bytes': 0})
+                usage['api_calls'] += 1
+                usage['bytes'] += size
+
+    def install(self, sf):
+        """Route every HTTP call of a simple-salesforce client through this budget."""
+        session = sf.session
+        if not hasattr(session, '_unbudgeted_request'):
+            session._unbudgeted_request = session.request
+            # Let concurrent workers keep their own pooled connections
+            adapter = HTTPAdapter(pool_connections=self.max_concurrent, pool_maxsize=self.max_concurrent)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        original = session._unbudgeted_request
+
+        def request(*args, **kwargs):
+            method = str(args[0] if args else kwargs.get('method', "")).upper()
+            with self.acquire():
+                started = time.perf_counter()
+                resp = original(*args, **kwargs)
+                observe("sf_request", time.perf_counter() - started, method=method, status=resp.status_code // 100 * 100)
+            self.record(resp)
+            resp.json = _timed_json(resp.json)
+            return resp
+
+        session.request = request
+        return sf
+
+def _timed_json(parse):
+    """Wrap Response.json so REST JSON decoding shows up as its own timer."""
+    def json(**kwargs):
+        with timed("parse", format="json"):
+            return parse(**kwargs)
+    return json
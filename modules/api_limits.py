@@ -0,0 +1,121 @@
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# /limits entries the governor watches and the Connection tab shows
+WATCHED_LIMITS = ["DailyApiRequests", "DailyBulkV2QueryJobs", "DailyBulkV2QueryFileStorageMB"]
+# Share of each daily allocation a run leaves untouched for the org's other integrations
+DEFAULT_API_RESERVE_PCT = 10
+# /limits is re-read between objects once the last reading is this old
+LIMITS_REFRESH_SECONDS = 300
+# Calls slow down once less than this share of the allocation above the reserve is left ...
+THROTTLE_BELOW = 0.25
+# ... starting from this rate when no api_calls_per_second is configured, down to the floor
+THROTTLED_CALLS_PER_SECOND = 5.0
+MIN_CALLS_PER_SECOND = 0.2
+_LIMIT_INFO = re.compile(r"(?:^|[\s,;])api-usage=(\d+)/(\d+)")
+
+class ApiLimitExceeded(RuntimeError):
+    pass
+
+def fetch_limits(sf):
+    """The org's limits from the REST /limits resource: {name: {'Max', 'Remaining'}}."""
+    return sf.limits()
+
+def parse_limit_info(header):
+    """(used, max) of the daily API requests from a Sforce-Limit-Info header, or None."""
+    match = _LIMIT_INFO.search(header or "")
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+def headroom(limits, names=None):
+    """Rows of {'limit', 'max', 'remaining', 'used_pct'} for the watched limits present in limits."""
+    rows = []
+    for name in names or WATCHED_LIMITS:
+        entry = limits.get(name)
+        if not entry or not entry.get('Max'):
+            continue
+        rows.append({
+            'limit': name, 'max': entry['Max'], 'remaining': entry['Remaining'],
+            'used_pct': round(100.0 * (entry['Max'] - entry['Remaining']) / entry['Max'], 1),
+        })
+    return rows
+
+class ApiGovernor:
+    """Keeps runs within the org's daily Salesforce API allocations.
+
+    Reads /limits before a run and between objects, and the Sforce-Limit-Info header of
+    every response. Once DailyApiRequests would drop into the reserve_pct kept for other
+    integrations, calls raise ApiLimitExceeded; above it, rate() slows the budget's token
+    bucket as the headroom shrinks. Pass fetch (sf -> limits dict) to read a simulated
+    limits endpoint instead of the org's.
+    """
+
+    def __init__(self, reserve_pct=DEFAULT_API_RESERVE_PCT, fetch=fetch_limits, refresh_seconds=LIMITS_REFRESH_SECONDS):
+        self.reserve_pct = max(0.0, min(100.0, float(reserve_pct)))
+        self.fetch = fetch
+        self.refresh_seconds = refresh_seconds
+        self.limits = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, sf, force=False):
+        """Re-read /limits if forced or the last reading is stale. Returns the current limits."""
+        if not force and self._fetched_at is not None and time.monotonic() - self._fetched_at < self.refresh_seconds:
+            return self.limits
+        try:
+            limits = self.fetch(sf)
+        except ApiLimitExceeded:
+            raise
+        except Exception as e:
+            logger.warning("Could not read Salesforce /limits: %s", e)
+            limits = None
+        with self._lock:
+            self._fetched_at = time.monotonic()
+            if limits:
+                self.limits = {**self.limits, **limits}
+            return self.limits
+
+    def observe_header(self, header):
+        """Update DailyApiRequests from a response's Sforce-Limit-Info header."""
+        usage = parse_limit_info(header)
+        if usage is None:
+            return
+        used, maximum = usage
+        with self._lock:
+            self.limits['DailyApiRequests'] = {'Max': maximum, 'Remaining': max(0, maximum - used)}
+
+    def available(self, name="DailyApiRequests"):
+        """Remaining calls of a limit above the reserve (None while unknown)."""
+        entry = self.limits.get(name)
+        if not entry or not entry.get('Max'):
+            return None
+        return entry['Remaining'] - entry['Max'] * self.reserve_pct / 100.0
+
+    def check(self):
+        available = self.available()
+        if available is not None and available <= 0:
+            entry = self.limits['DailyApiRequests']
+            raise ApiLimitExceeded(
+                f"Salesforce daily API requests are down to {entry['Remaining']:,} of {entry['Max']:,}; "
+                f"the last {self.reserve_pct:g}% are reserved for other integrations")
+
+    def rate(self, base_rate=None):
+        """Calls per second for the budget's token bucket (None = unthrottled)."""
+        available = self.available()
+        if available is None:
+            return base_rate
+        entry = self.limits['DailyApiRequests']
+        share = available / max(1.0, entry['Max'] * (1 - self.reserve_pct / 100.0))
+        if share >= THROTTLE_BELOW:
+            return base_rate
+        return max(MIN_CALLS_PER_SECOND, (base_rate or THROTTLED_CALLS_PER_SECOND) * share / THROTTLE_BELOW)
+
+    def allow_bulk(self):
+        """False once Bulk API 2.0 query jobs are down to the reserve (extract through REST instead)."""
+        available = self.available("DailyBulkV2QueryJobs")
+        return available is None or available > 0
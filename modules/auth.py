@@ -1,6 +1,7 @@
 import streamlit as st
 from simple_salesforce import Salesforce, SalesforceAuthenticationFailed
 from .config_manager import save_config
+from .api_limits import DEFAULT_API_RESERVE_PCT, fetch_limits, headroom
 
 def attempt_login(silent=False):
     """Attempts to login with current session state credentials."""
@@ -54,6 +55,28 @@ def attempt_login(silent=False):
             st.session_state['is_connected'] = False
             return False
 
+def render_api_headroom(sf):
+    """Remaining daily Salesforce allocations of the org (from /limits)."""
+    if 'sf_limits' not in st.session_state:
+        st.session_state['sf_limits'] = fetch_limits(sf)
+    rows = headroom(st.session_state['sf_limits'])
+    if not rows:
+        return
+    reserve = st.session_state.get('etl_config', {}).get('api_reserve_pct', DEFAULT_API_RESERVE_PCT)
+    st.markdown("**📊 API Headroom (today)**")
+    for col, row in zip(st.columns(len(rows)), rows):
+        with col:
+            st.metric(row['limit'], f"{row['remaining']:,} / {row['max']:,}")
+            st.progress(min(1.0, row['used_pct'] / 100), text=f"{row['used_pct']}% used")
+    col_caption, col_refresh = st.columns([4, 1])
+    with col_caption:
+        st.caption(f"ETL 실행은 각 한도의 마지막 {reserve}%를 다른 연동을 위해 남겨두고 멈추며, "
+                   f"남은 여유가 줄어들면 API 호출 속도를 낮춥니다 (Load 탭의 API Reserve).")
+    with col_refresh:
+        if st.button("🔄 Refresh Limits", use_container_width=True):
+            del st.session_state['sf_limits']
+            st.rerun()
+
 def render_auth_tab():
     st.subheader("Salesforce Authentication")
     
@@ -138,6 +161,11 @@ def render_auth_tab():
         except Exception as info_err:
             st.warning(f"Connected, but failed to fetch details: {info_err}")
 
+        try:
+            render_api_headroom(st.session_state['sf_client'])
+        except Exception as limits_err:
+            st.caption(f"⚠️ Could not read API limits: {limits_err}")
+
         if st.button("Logout", type="secondary"):
             st.session_state['sf_client'] = None
             st.session_state['is_connected'] = False
@@ -147,4 +175,6 @@ def render_auth_tab():
                 del st.session_state['org_info']
             if 'user_info' in st.session_state:
                 del st.session_state['user_info']
+            if 'sf_limits' in st.session_state:
+                del st.session_state['sf_limits']
             st.rerun()
@@ -0,0 +1,91 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_SECONDS = 2.0
+DEFAULT_MIN_BATCH_SIZE = 100
+DEFAULT_MAX_BATCH_SIZE = 20000
+# Share of max_allowed_packet one batch may fill, leaving room for the SQL text and escaping
+PACKET_SHARE = 0.5
+# Weight of the newest batch in the running per-row averages
+SMOOTHING = 0.5
+# A batch grows or shrinks by at most this factor at a time
+MAX_STEP = 2.0
+# Loaded batches measured before a size is worth recording for the next run
+MIN_OBSERVATIONS = 3
+
+def _smooth(average, value):
+    return value if average is None else average + SMOOTHING * (value - average)
+
+def frame_bytes(frame):
+    """Approximate in-memory size of a batch; an upper bound of what it sends to the database."""
+    return int(frame.memory_usage(deep=True, index=False).sum())
+
+class BatchSizer:
+    """Batch size of one object, tuned after each loaded batch from its write + commit latency.
+
+    The size moves toward the row count expected to take target_seconds to load, is capped
+    so a batch stays within PACKET_SHARE of max_allowed_packet, and always stays within
+    [min_size, max_size].
+    """
+
+    def __init__(self, size, min_size=DEFAULT_MIN_BATCH_SIZE, max_size=DEFAULT_MAX_BATCH_SIZE,
+                 target_seconds=DEFAULT_TARGET_SECONDS, max_packet=None):
+        self.min_size = max(1, int(min_size))
+        self.max_size = max(self.min_size, int(max_size))
+        self.target_seconds = float(target_seconds)
+        self.max_packet = max_packet
+        self.size = self._clamp(size)
+        self.seconds_per_row = None
+        self.bytes_per_row = None
+        self.observations = 0
+
+    def _clamp(self, size):
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    def current(self):
+        return self.size
+
+    def observe(self, rows, nbytes, seconds):
+        """Fold in one loaded batch and pick the size of the next ones."""
+        # The per-commit overhead dominates small batches (the last one of an object, or ones
+        # extracted before the size grew), which would understate the throughput of full ones
+        if rows <= 0 or rows < self.size / MAX_STEP:
+            return
+        self.seconds_per_row = _smooth(self.seconds_per_row, seconds / rows)
+        self.bytes_per_row = _smooth(self.bytes_per_row, nbytes / rows)
+        self.observations += 1
+        wanted = self.target_seconds / max(self.seconds_per_row, 1e-9)
+        wanted = min(max(wanted, self.size / MAX_STEP), self.size * MAX_STEP)
+        if self.max_packet and self.bytes_per_row:
+            wanted = min(wanted, self.max_packet * PACKET_SHARE / self.bytes_per_row)
+        size = self._clamp(wanted)
+        if size != self.size:
+            logger.debug("Batch size %d -> %d (%.2f ms/row, %d bytes/row)", self.size, size,
+                         self.seconds_per_row * 1000, self.bytes_per_row)
+        self.size = size
+
+    @property
+    def converged(self):
+        return self.observations >= MIN_OBSERVATIONS
+
+def batch_sizers(etl_config, run_plan, batch_size, max_packet=None, learned=None):
+    """A BatchSizer per object of the run, starting from its learned size; None unless adaptive sizing is on.
+
+    learned is {object: rows} as stored by state_store.save_batch_sizes.
+    """
+    if not etl_config.get('adaptive_batch_size'):
+        return None
+    bounds = {
+        'min_size': etl_config.get('batch_size_min') or DEFAULT_MIN_BATCH_SIZE,
+        'max_size': etl_config.get('batch_size_max') or DEFAULT_MAX_BATCH_SIZE,
+        'target_seconds': etl_config.get('batch_target_seconds') or DEFAULT_TARGET_SECONDS,
+    }
+    learned = learned or {}
+    return {mapping['object']: BatchSizer(learned.get(mapping['object']) or mapping.get('batch_size') or batch_size,
+                                          max_packet=max_packet, **bounds)
+            for mapping, _ in run_plan}
+
+def learned_batch_sizes(results):
+    """{object: converged batch size} of the successful objects of a run."""
+    return {r['object']: r['batch_size'] for r in results if 'error' not in r and r.get('batch_size')}
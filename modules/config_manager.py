@@ -1,6 +1,8 @@
 import json
 import os
 import streamlit as st
+from .db import get_pool
+from .state_store import ensure_state_tables, get_etl_config, save_etl_config
 
 CONFIG_FILE = "config.json"
 
@@ -22,6 +24,28 @@ def save_config(config_data):
     except Exception as e:
         st.error(f"Failed to save config file: {e}")
 
+def load_saved_etl_config(mariadb_config):
+    """etl_config saved in the target database, or None if there is none or the database is unreachable."""
+    if not mariadb_config.get('host'):
+        return None
+    try:
+        with get_pool(mariadb_config).connection() as conn:
+            return get_etl_config(conn)
+    except Exception:
+        return None
+
+def save_etl_config_to_db(mariadb_config, etl_config):
+    """Store etl_config in the target database, where the scheduler worker reads it."""
+    if not mariadb_config.get('host'):
+        return
+    try:
+        with get_pool(mariadb_config).connection() as conn:
+            ensure_state_tables(conn)
+            save_etl_config(conn, etl_config)
+    except Exception as e:
+        st.warning(f"⚠️ Saved to config.json only; the scheduler worker keeps its previous settings "
+                   f"until they can be saved to MariaDB: {e}")
+
 def save_app_config():
     """Helper to save all relevant session state to config.json."""
     save_data = {
@@ -31,7 +55,12 @@ def save_app_config():
         "schedule_config": {
             "frequency": st.session_state['schedule_config']['frequency'],
             "run_time": st.session_state['schedule_config']['run_time'].strftime("%H:%M:%S") if hasattr(st.session_state['schedule_config']['run_time'], 'strftime') else st.session_state['schedule_config']['run_time'],
-            "is_active": st.session_state['schedule_config']['is_active']
+            "is_active": st.session_state['schedule_config']['is_active'],
+            "cron": st.session_state['schedule_config'].get('cron', "0 9 * * *"),
+            "day_of_week": st.session_state['schedule_config'].get('day_of_week', "mon"),
+            "daily_api_budget": st.session_state['schedule_config'].get('daily_api_budget', 0),
+            "max_db_writers": st.session_state['schedule_config'].get('max_db_writers', 2)
         }
     }
     save_config(save_data)
+    save_etl_config_to_db(save_data['mariadb_config'], save_data['etl_config'])
@@ -0,0 +1,243 @@
+import fcntl
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 5
+# Seconds to wait for a free pooled connection before giving up
+DEFAULT_POOL_TIMEOUT = 30
+# Idle connections older than this are pinged before reuse (MariaDB wait_timeout drops them silently)
+HEALTH_CHECK_INTERVAL = 30
+CONNECT_TIMEOUT = 10
+
+# Process-wide pools keyed by connection settings, shared by Streamlit reruns and runner threads
+_pools = {}
+_pools_lock = threading.Lock()
+
+def connect_mariadb(config):
+    """Open a DB-API connection to MariaDB from a mariadb_config dict."""
+    import pymysql
+
+    return pymysql.connect(
+        host=config['host'],
+        port=int(config.get('port', 3306)),
+        user=config['user'],
+        password=config.get('password', ''),
+        database=config['database'],
+        charset='utf8mb4',
+        autocommit=False,
+        connect_timeout=CONNECT_TIMEOUT,
+        # Lets the BULK LOAD / COPY strategy use LOAD DATA LOCAL INFILE
+        local_infile=True,
+    )
+
+def driver_name(conn):
+    """Return the top-level module name of a DB-API connection's driver (e.g. 'pymysql', 'sqlite3')."""
+    return type(conn).__module__.split('.')[0]
+
+def is_sqlite(conn):
+    """True for the SQLite stand-in used by the CLI's --sqlite option and the benchmarks."""
+    return driver_name(conn) == "sqlite3"
+
+def placeholder(conn):
+    """Return the bind-parameter placeholder for a DB-API connection's driver."""
+    module = sys.modules[driver_name(conn)]
+    return '?' if getattr(module, 'paramstyle', 'format') == 'qmark' else '%s'
+
+def quote_ident(name):
+    """Quote a table/column identifier with backticks (MariaDB; also accepted by SQLite)."""
+    return "`" + str(name).replace("`", "``") + "`"
+
+def is_healthy(conn):
+    """Cheap liveness check of a pooled connection."""
+    try:
+        if driver_name(conn) == "pymysql":
+            conn.ping(reconnect=False)
+        else:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchall()
+            finally:
+                cur.close()
+        return True
+    except Exception:
+        return False
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+@contextmanager
+def relaxed_checks(conn, enabled=True):
+    """Turn off unique_checks/foreign_key_checks for the session during a bulk load, restoring them after."""
+    if not enabled or is_sqlite(conn):
+        yield
+        return
+    cur = conn.cursor()
+    try:
+        cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+        yield
+    finally:
+        try:
+            cur.execute("SET SESSION unique_checks = 1, foreign_key_checks = 1")
+        finally:
+            cur.close()
+
+@contextmanager
+def named_lock(conn, name):
+    """Try to take a lock shared by every process using the database. Yields True if it was acquired.
+
+    MariaDB uses GET_LOCK (held by the session, so released if the process dies); SQLite
+    stand-ins fall back to an flock on a file under /tmp.
+    """
+    if is_sqlite(conn):
+        fd = os.open(os.path.join("/tmp", f"{name}.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+        return
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT GET_LOCK(%s, 0)", (name,))
+        acquired = cur.fetchone()[0] == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+                cur.fetchall()
+    finally:
+        cur.close()
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections with health checks and reconnect of stale connections."""
+
+    def __init__(self, connect, max_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT,
+                 health_check_interval=HEALTH_CHECK_INTERVAL):
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._idle = []  # (conn, returned_at), most recently returned last
+        self.in_use = 0
+        self.created = 0
+        self.reconnects = 0
+
+    def _checkout(self):
+        with self._lock:
+            conn, returned_at = self._idle.pop() if self._idle else (None, None)
+        if conn is not None and time.monotonic() - returned_at > self.health_check_interval:
+            if not is_healthy(conn):
+                logger.info("Replacing stale pooled connection")
+                _close_quietly(conn)
+                conn = None
+                with self._lock:
+                    self.reconnects += 1
+        if conn is None:
+            conn = self._connect()
+            with self._lock:
+                self.created += 1
+        return conn
+
+    def _checkin(self, conn, suspect):
+        try:
+            # Never hand out a connection with someone else's open transaction
+            conn.rollback()
+        except Exception:
+            suspect = True
+        if suspect and not is_healthy(conn):
+            _close_quietly(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block (autocommit off; commit explicitly)."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection free within {self.timeout}s (pool size {self.max_size})")
+        conn = None
+        suspect = False
+        try:
+            conn = self._checkout()
+            with self._lock:
+                self.in_use += 1
+            yield conn
+        except Exception:
+            suspect = True
+            raise
+        finally:
+            if conn is not None:
+                with self._lock:
+                    self.in_use -= 1
+                self._checkin(conn, suspect)
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {'max_size': self.max_size, 'in_use': self.in_use, 'idle': len(self._idle),
+                    'created': self.created, 'reconnects': self.reconnects}
+
+    def close(self):
+        """Close the idle connections; borrowed ones return to the pool as usual."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+def get_pool(config, max_size=None):
+    """Return the shared pool for a mariadb_config dict, creating it on first use."""
+    size = int(max_size or config.get('pool_size') or DEFAULT_POOL_SIZE)
+    key = json.dumps({**config, 'pool_size': size}, sort_keys=True, default=str)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            settings = dict(config)
+            pool = _pools[key] = ConnectionPool(lambda: connect_mariadb(settings), size)
+        return pool
+
+def test_connection(config, pings=3):
+    """Borrow a pooled connection and measure real round trips. Returns a dict of latency stats."""
+    pool = get_pool(config)
+    started = time.perf_counter()
+    with pool.connection() as conn:
+        checkout_ms = (time.perf_counter() - started) * 1000
+        cur = conn.cursor()
+        try:
+            timings = []
+            for _ in range(max(1, pings)):
+                t0 = time.perf_counter()
+                cur.execute("SELECT 1")
+                cur.fetchall()
+                timings.append((time.perf_counter() - t0) * 1000)
+            cur.execute("SELECT VERSION()")
+            version = cur.fetchone()[0]
+        finally:
+            cur.close()
+    return {
+        'version': version,
+        'checkout_ms': checkout_ms,
+        'min_ms': min(timings),
+        'avg_ms': sum(timings) / len(timings),
+        'pool': pool.stats(),
+    }
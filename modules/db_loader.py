@@ -0,0 +1,478 @@
+import logging
+import os
+import re
+import tempfile
+import weakref
+import numpy as np
+from .db import placeholder, quote_ident, driver_name, is_sqlite
+from .transformer import frame_to_rows
+from .schema_catalog import catalog_key, invalidate_catalog
+from .metrics import count, timed
+
+logger = logging.getLogger(__name__)
+
+LOAD_STRATEGIES = ["INSERT", "BULK LOAD / COPY", "MERGE (UPSERT)", "OVERWRITE"]
+
+# LOAD DATA source files are spooled here (the only writable path on Heroku)
+TEMP_DIR = "/tmp"
+# Bind parameters per statement: SQLite's limit, and a sane packet size for MariaDB
+MAX_BIND_PARAMS = 32766
+# Server errors meaning LOAD DATA LOCAL is disabled (MySQL 1148/3948, MariaDB 4166)
+LOCAL_INFILE_ERRORS = {1148, 3948, 4166}
+# Suffix of the per-object temporary table MERGE batches are staged in
+STAGING_SUFFIX = "__stage"
+# OVERWRITE loads into <target>__new and swaps it in; the replaced table is kept as <target>__old
+SHADOW_SUFFIX = "__new"
+RETIRED_SUFFIX = "__old"
+# DB-API error classes raised for the rows of a statement rather than the connection or the SQL
+ROW_ERRORS = ("IntegrityError", "DataError", "RowsRejected")
+# Savepoints of write_isolating are named <prefix>_<bisection depth>
+ISOLATION_SAVEPOINT = "etl_batch_rows"
+# Connections whose server refused LOAD DATA LOCAL once; they use multi-row INSERT from then on
+_no_local_infile = weakref.WeakSet()
+
+def insert_sql(conn, table, columns):
+    """Build a parameterized INSERT statement for the target columns."""
+    ph = placeholder(conn)
+    cols = ", ".join(quote_ident(c) for c in columns)
+    values = ", ".join([ph] * len(columns))
+    return f"INSERT INTO {quote_ident(table)} ({cols}) VALUES ({values})"
+
+def multi_insert_sql(conn, table, columns, row_count):
+    """Build one INSERT ... VALUES (...), (...) statement for row_count rows."""
+    ph = placeholder(conn)
+    cols = ", ".join(quote_ident(c) for c in columns)
+    row = "(" + ", ".join([ph] * len(columns)) + ")"
+    return f"INSERT INTO {quote_ident(table)} ({cols}) VALUES " + ", ".join([row] * row_count)
+
+def multi_row_insert(conn, table, columns, rows, rows_per_statement=None):
+    """Insert rows with as few multi-row INSERT statements as the bind limit allows (no commit)."""
+    limit = max(1, MAX_BIND_PARAMS // max(1, len(columns)))
+    step = min(rows_per_statement or len(rows), limit)
+    cur = conn.cursor()
+    try:
+        for i in range(0, len(rows), step):
+            chunk = rows[i:i + step]
+            cur.execute(multi_insert_sql(conn, table, columns, len(chunk)), [v for row in chunk for v in row])
+    finally:
+        cur.close()
+    return len(rows)
+
+def _escape_tsv(text):
+    return (text.str.replace("\\", "\\\\", regex=False)
+                .str.replace("\t", "\\t", regex=False)
+                .str.replace("\n", "\\n", regex=False)
+                .str.replace("\r", "\\r", regex=False))
+
+def _format_number(value):
+    if isinstance(value, float):
+        # 15 significant digits in positional notation: no 1e-05 or 0.30000000000000004 in DECIMAL columns
+        return np.format_float_positional(value, precision=15, unique=False, fractional=False, trim='-')
+    return str(value)
+
+def frame_to_tsv(frame, column_kinds=None):
+    """Encode a transformed frame as LOAD DATA text: tab-separated, backslash-escaped, \\N for NULL.
+
+    column_kinds ({column: 'number'|'temporal'|'text'}, from the schema catalog) lets
+    columns bound for numeric/date targets skip escaping unless a value actually needs it.
+    Floats, and any float values in columns bound for numeric targets, are written positionally.
+    """
+    if frame.shape[1] == 0:
+        return ""
+    column_kinds = column_kinds or {}
+    columns = []
+    for i in range(frame.shape[1]):
+        s = frame.iloc[:, i]
+        missing = s.isna()
+        kind = column_kinds.get(frame.columns[i], "text")
+        if s.dtype == object:
+            first = s[s.first_valid_index()] if not missing.all() else None
+            if isinstance(first, (bool, np.bool_)):
+                s = s.replace({True: 1, False: 0})
+            text = s.map(_format_number) if kind == "number" else s.astype(str)
+            if kind == "text" or text.str.contains(r"[\t\n\r\\]", regex=True).any():
+                text = _escape_tsv(text)
+        elif s.dtype.kind == "f":
+            text = s.map(_format_number, na_action='ignore')
+        else:
+            text = s.astype(str)
+        columns.append(text.mask(missing, "\\N"))
+    lines = columns[0].str.cat(columns[1:], sep="\t") if len(columns) > 1 else columns[0]
+    return "\n".join(lines.tolist()) + "\n"
+
+class RowsRejected(Exception):
+    """LOAD DATA skipped or altered rows; LOCAL implies IGNORE, so they only surface as warnings."""
+
+def supports_local_infile(conn):
+    """True if LOAD DATA LOCAL INFILE can be attempted on this connection."""
+    return (driver_name(conn) == "pymysql" and getattr(conn, '_local_infile', False)
+            and conn not in _no_local_infile)
+
+def load_data_infile(conn, table, columns, frame, column_kinds=None, reject_warnings=False):
+    """Load a frame through LOAD DATA LOCAL INFILE from a spooled /tmp file (no commit).
+
+    With reject_warnings, rows the server skipped or altered raise RowsRejected (with the
+    SHOW WARNINGS text) so write_isolating can set them aside; otherwise they are only logged.
+    """
+    fd, path = tempfile.mkstemp(dir=TEMP_DIR, prefix="etl_load_", suffix=".tsv")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(frame_to_tsv(frame, column_kinds))
+        cols = ", ".join(quote_ident(c) for c in columns)
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {quote_ident(table)} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({cols})",
+                (path,)
+            )
+            loaded = cur.rowcount
+            warnings = []
+            if reject_warnings:
+                cur.execute("SHOW WARNINGS")
+                warnings = [f"{level} {code}: {message}" for level, code, message in cur.fetchall()
+                            if level != "Note"]
+        finally:
+            cur.close()
+    finally:
+        os.remove(path)
+    if reject_warnings and (warnings or loaded != len(frame)):
+        raise RowsRejected(f"LOAD DATA loaded {loaded} of {len(frame)} rows; " + "; ".join(warnings))
+    if loaded != len(frame):
+        # LOCAL implies IGNORE: bad or duplicate rows become warnings instead of errors
+        logger.warning("%s: LOAD DATA loaded %d of %d rows (see SHOW WARNINGS).", table, loaded, len(frame))
+    return loaded
+
+def bulk_load(conn, table, columns, frame, column_kinds=None, reject_warnings=False):
+    """BULK LOAD / COPY: LOAD DATA LOCAL INFILE where allowed, otherwise one multi-row INSERT (no commit)."""
+    if supports_local_infile(conn):
+        try:
+            return load_data_infile(conn, table, columns, frame, column_kinds, reject_warnings)
+        except Exception as e:
+            if not (e.args and e.args[0] in LOCAL_INFILE_ERRORS):
+                raise
+            logger.warning("LOAD DATA LOCAL INFILE is disabled on the server (%s); using multi-row INSERT.", e)
+            _no_local_infile.add(conn)
+    return multi_row_insert(conn, table, columns, frame_to_rows(frame))
+
+def _execute(conn, sql, params=None):
+    cur = conn.cursor()
+    try:
+        if params is None:
+            cur.execute(sql)
+        else:
+            cur.execute(sql, params)
+        return cur.fetchall() if cur.description else None
+    finally:
+        cur.close()
+
+def max_packet_bytes(conn):
+    """The server's max_allowed_packet, or None (SQLite, or when it cannot be read)."""
+    if is_sqlite(conn):
+        return None
+    try:
+        rows = _execute(conn, "SELECT @@max_allowed_packet")
+        return int(rows[0][0]) if rows and rows[0][0] else None
+    except Exception as e:
+        logger.warning("Could not read max_allowed_packet: %s", e)
+        return None
+
+def unique_index_columns(conn, table):
+    """Return the column lists of the unique indexes (incl. primary key) of a table."""
+    indexes = []
+    if is_sqlite(conn):
+        for row in _execute(conn, f"PRAGMA index_list({quote_ident(table)})"):
+            if row[2]:
+                info = _execute(conn, f"PRAGMA index_info({quote_ident(row[1])})")
+                indexes.append([r[2] for r in sorted(info)])
+        return indexes
+    by_name = {}
+    # SHOW INDEX columns: Table, Non_unique, Key_name, Seq_in_index, Column_name, ...
+    for row in _execute(conn, f"SHOW INDEX FROM {quote_ident(table)}"):
+        if int(row[1]) == 0:
+            by_name.setdefault(row[2], []).append((int(row[3]), row[4]))
+    return [[col for _, col in sorted(cols)] for cols in by_name.values()]
+
+def match_index_name(table, match_key):
+    return f"ux_{table}_{match_key}"[:64]
+
+def ensure_match_index(conn, table, match_key, create=False):
+    """Make sure match_key alone is unique on the target, creating the index if allowed."""
+    if [match_key] in unique_index_columns(conn, table):
+        return False
+    if not create:
+        raise ValueError(
+            f"MERGE (UPSERT) needs a unique index on {table}.{match_key}. "
+            f"Enable 'Create unique index' in the Load tab or run: "
+            f"CREATE UNIQUE INDEX {quote_ident(match_index_name(table, match_key))} "
+            f"ON {quote_ident(table)} ({quote_ident(match_key)})"
+        )
+    logger.info("Creating unique index on %s.%s for MERGE (UPSERT)", table, match_key)
+    _execute(conn, f"CREATE UNIQUE INDEX {quote_ident(match_index_name(table, match_key))} "
+                   f"ON {quote_ident(table)} ({quote_ident(match_key)})")
+    conn.commit()
+    invalidate_catalog(catalog_key(conn))
+    return True
+
+def staging_table(table):
+    return f"{table}{STAGING_SUFFIX}"
+
+def create_staging_table(conn, table, columns):
+    """Create an index-free temporary copy of the target's columns for staging MERGE batches."""
+    drop_staging_table(conn, table)
+    cols = ", ".join(quote_ident(c) for c in columns)
+    temporary = "TEMP" if is_sqlite(conn) else "TEMPORARY"
+    _execute(conn, f"CREATE {temporary} TABLE {quote_ident(staging_table(table))} AS "
+                   f"SELECT {cols} FROM {quote_ident(table)} WHERE 1 = 0")
+
+def drop_staging_table(conn, table):
+    # DROP TEMPORARY TABLE does not commit the open transaction on MariaDB
+    temporary = "" if is_sqlite(conn) else "TEMPORARY "
+    _execute(conn, f"DROP {temporary}TABLE IF EXISTS {quote_ident(staging_table(table))}")
+
+def merge_sql(conn, table, columns, match_key):
+    """Build the set-based upsert from the staging table into the target."""
+    cols = ", ".join(quote_ident(c) for c in columns)
+    source = quote_ident(staging_table(table))
+    updates = [c for c in columns if c != match_key] or [match_key]
+    if is_sqlite(conn):
+        # WHERE true resolves SQLite's INSERT ... SELECT ... ON CONFLICT parsing ambiguity
+        assignments = ", ".join(f"{quote_ident(c)} = excluded.{quote_ident(c)}" for c in updates)
+        return (f"INSERT INTO {quote_ident(table)} ({cols}) SELECT {cols} FROM {source} WHERE true "
+                f"ON CONFLICT ({quote_ident(match_key)}) DO UPDATE SET {assignments}")
+    assignments = ", ".join(f"{quote_ident(c)} = VALUES({quote_ident(c)})" for c in updates)
+    return (f"INSERT INTO {quote_ident(table)} ({cols}) SELECT {cols} FROM {source} "
+            f"ON DUPLICATE KEY UPDATE {assignments}")
+
+def merge_batch(conn, table, columns, frame, match_key, column_kinds=None, reject_warnings=False):
+    """Stage a batch with the bulk path, then upsert it into the target in one statement (no commit)."""
+    _execute(conn, f"DELETE FROM {quote_ident(staging_table(table))}")
+    bulk_load(conn, staging_table(table), columns, frame, column_kinds, reject_warnings)
+    _execute(conn, merge_sql(conn, table, columns, match_key))
+    return len(frame)
+
+def shadow_table(table):
+    return f"{table}{SHADOW_SUFFIX}"
+
+def retired_table(table):
+    return f"{table}{RETIRED_SUFFIX}"
+
+def secondary_index_sql(conn, table):
+    """Return ADD INDEX clauses recreating every non-primary index of a MariaDB table."""
+    indexes = {}
+    # SHOW INDEX columns: Table, Non_unique, Key_name, Seq_in_index, Column_name, Collation,
+    # Cardinality, Sub_part, Packed, Null, Index_type, ...
+    for row in _execute(conn, f"SHOW INDEX FROM {quote_ident(table)}"):
+        if row[2] == "PRIMARY":
+            continue
+        index = indexes.setdefault(row[2], {'unique': int(row[1]) == 0, 'type': row[10], 'parts': []})
+        part = quote_ident(row[4]) + (f"({int(row[7])})" if row[7] else "")
+        index['parts'].append((int(row[3]), part))
+
+    clauses = []
+    for name, index in indexes.items():
+        kind = {"FULLTEXT": "FULLTEXT INDEX", "SPATIAL": "SPATIAL INDEX"}.get(
+            index['type'], "UNIQUE INDEX" if index['unique'] else "INDEX")
+        parts = ", ".join(p for _, p in sorted(index['parts']))
+        clauses.append(f"ADD {kind} {quote_ident(name)} ({parts})")
+    return list(indexes), clauses
+
+def create_shadow_table(conn, table):
+    """Create an empty copy of the target with only its primary key; secondary indexes are built after the load."""
+    shadow = shadow_table(table)
+    _execute(conn, f"DROP TABLE IF EXISTS {quote_ident(shadow)}")
+    _execute(conn, f"DROP TABLE IF EXISTS {quote_ident(retired_table(table))}")
+    if is_sqlite(conn):
+        # Same definition (incl. primary key) as the target; indexes are recreated at the swap
+        ddl = _execute(conn, "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))[0][0]
+        _execute(conn, re.sub(r'^CREATE TABLE\s+("[^"]+"|`[^`]+`|\[[^\]]+\]|[^\s(]+)',
+                              lambda m: f"CREATE TABLE {quote_ident(shadow)}", ddl, count=1))
+        return shadow
+    _execute(conn, f"CREATE TABLE {quote_ident(shadow)} LIKE {quote_ident(table)}")
+    names, _ = secondary_index_sql(conn, shadow)
+    if names:
+        _execute(conn, f"ALTER TABLE {quote_ident(shadow)} " + ", ".join(f"DROP INDEX {quote_ident(n)}" for n in names))
+    return shadow
+
+def swap_shadow_table(conn, table):
+    """Build the deferred indexes on the loaded shadow table and atomically swap it in for the target.
+
+    The replaced table is left as <target>__old for drop_tables(); readers only ever see the
+    complete old or the complete new table.
+    """
+    shadow, retired = quote_ident(shadow_table(table)), quote_ident(retired_table(table))
+    if is_sqlite(conn):
+        index_sql = [r[0] for r in _execute(
+            conn, "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+        # SQLite DDL is transactional: the renames, the drop and the index builds commit together
+        if not conn.in_transaction:
+            _execute(conn, "BEGIN")
+        _execute(conn, f"ALTER TABLE {quote_ident(table)} RENAME TO {retired}")
+        _execute(conn, f"ALTER TABLE {shadow} RENAME TO {quote_ident(table)}")
+        _execute(conn, f"DROP TABLE {retired}")
+        for sql in index_sql:
+            _execute(conn, sql)
+        conn.commit()
+        return None
+
+    _, clauses = secondary_index_sql(conn, table)
+    if clauses:
+        _execute(conn, f"ALTER TABLE {shadow} " + ", ".join(clauses))
+    _execute(conn, f"RENAME TABLE {quote_ident(table)} TO {retired}, {shadow} TO {quote_ident(table)}")
+    return retired_table(table)
+
+def drop_tables(conn, tables):
+    """Drop tables retired by OVERWRITE swaps (run after the loads, off the readers' path)."""
+    for table in tables:
+        try:
+            _execute(conn, f"DROP TABLE IF EXISTS {quote_ident(table)}")
+        except Exception:
+            logger.exception("Could not drop retired table %s", table)
+
+def table_exists(conn, table):
+    if is_sqlite(conn):
+        rows = _execute(conn, "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    else:
+        rows = _execute(conn, "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() "
+                              "AND TABLE_NAME = %s", (table,))
+    return bool(rows)
+
+def prepare_target(conn, table, strategy, columns=None, match_key=None, create_index=False, resume=False):
+    """Run the per-object preparation step of a load strategy before the first batch.
+
+    Returns the table batches should be loaded into (the shadow table for OVERWRITE). With
+    resume, an OVERWRITE continues filling the shadow table a checkpointed run left behind.
+    """
+    if strategy not in LOAD_STRATEGIES:
+        raise ValueError(f"Unknown load strategy: {strategy}")
+    if strategy == "MERGE (UPSERT)":
+        if not match_key or match_key not in (columns or []):
+            raise ValueError(f"MERGE (UPSERT) on {table} needs a match_key among the mapped columns.")
+        ensure_match_index(conn, table, match_key, create_index)
+        create_staging_table(conn, table, columns)
+    if strategy == "OVERWRITE":
+        if resume:
+            return shadow_table(table)
+        return create_shadow_table(conn, table)
+    return table
+
+def finish_target(conn, table, strategy, succeeded=True, keep_shadow=False):
+    """Complete an object's load after its last batch, or clean up when it failed.
+
+    keep_shadow leaves a failed OVERWRITE's shadow table in place for a resumed run.
+    Returns the name of a table to drop later (the old target replaced by OVERWRITE), or None.
+    """
+    if strategy == "MERGE (UPSERT)":
+        drop_staging_table(conn, table)
+    if strategy == "OVERWRITE":
+        if succeeded:
+            return swap_shadow_table(conn, table)
+        if not keep_shadow:
+            drop_tables(conn, [shadow_table(table)])
+    return None
+
+def is_row_error(e):
+    """True for driver errors caused by the rows written (constraint violations, bad values)."""
+    return any(cls.__name__ in ROW_ERRORS for cls in type(e).__mro__)
+
+def write_batch(conn, table, columns, frame, strategy="INSERT", match_key=None, column_kinds=None,
+                reject_warnings=False):
+    """Write one batch with the strategy's statement(s), without committing. Returns rows written.
+
+    reject_warnings makes rows LOAD DATA would silently skip or alter raise RowsRejected.
+    """
+    if frame.empty:
+        return 0
+    if strategy == "MERGE (UPSERT)":
+        return merge_batch(conn, table, columns, frame, match_key, column_kinds, reject_warnings)
+    if strategy in ("BULK LOAD / COPY", "OVERWRITE"):
+        # OVERWRITE batches go to the shadow table, which no reader sees until the swap
+        return bulk_load(conn, table, columns, frame, column_kinds, reject_warnings)
+    rows = frame_to_rows(frame)
+    cur = conn.cursor()
+    try:
+        cur.executemany(insert_sql(conn, table, columns), rows)
+    finally:
+        cur.close()
+    return len(rows)
+
+def write_isolating(conn, write, frame, rejected, depth=0):
+    """write(frame) under a savepoint; on a row-level error, bisect the frame to set the bad rows aside.
+
+    Each failing row is appended to rejected as (index label, reason). Returns rows written.
+    Every bisection level has its own savepoint, released once its rows are written.
+    """
+    if depth == 0 and is_sqlite(conn) and not conn.in_transaction:
+        # Outside a transaction a SQLite savepoint starts one and its RELEASE commits it, which
+        # would commit the rows apart from the checkpoint and dead letters written before_commit
+        _execute(conn, "BEGIN")
+    savepoint = f"{ISOLATION_SAVEPOINT}_{depth}"
+    _execute(conn, f"SAVEPOINT {savepoint}")
+    try:
+        written = write(frame)
+    except Exception as e:
+        if not is_row_error(e):
+            raise
+        _execute(conn, f"ROLLBACK TO SAVEPOINT {savepoint}")
+        if len(frame) == 1:
+            rejected.append((frame.index[0], f"{type(e).__name__}: {e}"))
+            written = 0
+        else:
+            half = len(frame) // 2
+            written = (write_isolating(conn, write, frame.iloc[:half], rejected, depth + 1) +
+                       write_isolating(conn, write, frame.iloc[half:], rejected, depth + 1))
+    _execute(conn, f"RELEASE SAVEPOINT {savepoint}")
+    return written
+
+def load_batch(conn, table, columns, frame, strategy="INSERT", match_key=None, column_kinds=None,
+               before_commit=None, rejected=None):
+    """Insert (or upsert) one transformed batch (a DataFrame of target columns) and commit it.
+
+    before_commit(conn) runs inside the batch's transaction, e.g. to write a run checkpoint.
+    If a rejected list is given, rows the database refuses are isolated and appended to it as
+    (index label, reason) instead of failing the whole batch. This includes rows LOAD DATA only
+    reports as warnings, so loaded never counts a row that was skipped or altered.
+    """
+    if frame.empty and before_commit is None:
+        return 0
+    try:
+        with timed("db_write", strategy=strategy):
+            write = lambda part: write_batch(conn, table, columns, part, strategy, match_key, column_kinds,
+                                             reject_warnings=rejected is not None)
+            if rejected is None or frame.empty:
+                loaded = write(frame)
+            else:
+                before = len(rejected)
+                loaded = write_isolating(conn, write, frame, rejected)
+                count("rows_rejected", len(rejected) - before, stage="load")
+        if before_commit is not None:
+            before_commit(conn)
+        with timed("db_commit"):
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    count("rows_written", loaded, strategy=strategy)
+    return loaded
+
+def delete_rows(conn, table, key_column, keys, chunk_size=1000):
+    """Delete rows whose key_column is in keys (e.g. propagated Salesforce deletes)."""
+    ph = placeholder(conn)
+    deleted = 0
+    cur = conn.cursor()
+    try:
+        keys = list(keys)
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            cur.execute(
+                f"DELETE FROM {quote_ident(table)} WHERE {quote_ident(key_column)} IN ({', '.join([ph] * len(chunk))})",
+                chunk
+            )
+            deleted += cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return deleted
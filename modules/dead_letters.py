@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from .db import placeholder
+
+# Rows rejected by a transform rule or by the database, kept next to the other ETL state (see state_store).
+# Only the Salesforce Id is stored; replay re-extracts the current record.
+DEAD_LETTER_TABLE = "etl_dead_letters"
+REASON_LENGTH = 1000
+ID_CHUNK = 500
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def ensure_dead_letter_table(conn):
+    """Create the dead-letter table if it does not exist."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {DEAD_LETTER_TABLE} (
+                object_name VARCHAR(255) NOT NULL,
+                source_id VARCHAR(32) NOT NULL,
+                stage VARCHAR(16) NOT NULL,
+                reason TEXT,
+                rejected_at VARCHAR(32) NOT NULL,
+                PRIMARY KEY (object_name, source_id)
+            )
+        """)
+        conn.commit()
+    finally:
+        cur.close()
+
+def _delete_ids(cur, ph, obj_name, source_ids):
+    for i in range(0, len(source_ids), ID_CHUNK):
+        chunk = source_ids[i:i + ID_CHUNK]
+        cur.execute(f"DELETE FROM {DEAD_LETTER_TABLE} WHERE object_name = {ph} "
+                    f"AND source_id IN ({', '.join([ph] * len(chunk))})", [obj_name] + chunk)
+
+def record_dead_letters(conn, obj_name, rejects):
+    """Store rejected rows [(source_id, stage, reason)], replacing earlier entries (no commit)."""
+    if not rejects:
+        return
+    ph = placeholder(conn)
+    now = _now()
+    rows = {str(source_id or ""): (obj_name, str(source_id or ""), stage, str(reason)[:REASON_LENGTH], now)
+            for source_id, stage, reason in rejects}
+    cur = conn.cursor()
+    try:
+        _delete_ids(cur, ph, obj_name, list(rows))
+        cur.executemany(f"INSERT INTO {DEAD_LETTER_TABLE} (object_name, source_id, stage, reason, rejected_at) "
+                        f"VALUES ({ph}, {ph}, {ph}, {ph}, {ph})", list(rows.values()))
+    finally:
+        cur.close()
+
+def delete_dead_letters(conn, obj_name, source_ids=None, before=None, commit=True):
+    """Remove an object's entries: the given Ids, those rejected before a timestamp, or all of them."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        if source_ids is not None:
+            _delete_ids(cur, ph, obj_name, [str(i) for i in source_ids])
+        elif before is not None:
+            cur.execute(f"DELETE FROM {DEAD_LETTER_TABLE} WHERE object_name = {ph} AND rejected_at < {ph}",
+                        (obj_name, before))
+        else:
+            cur.execute(f"DELETE FROM {DEAD_LETTER_TABLE} WHERE object_name = {ph}", (obj_name,))
+        if commit:
+            conn.commit()
+    finally:
+        cur.close()
+
+def dead_letter_summary(conn):
+    """Rejected rows per object and stage: [{'object', 'stage', 'rows', 'last_rejected'}]."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT object_name, stage, COUNT(*), MAX(rejected_at) FROM {DEAD_LETTER_TABLE} "
+                    f"GROUP BY object_name, stage ORDER BY object_name, stage")
+        return [{'object': o, 'stage': s, 'rows': n, 'last_rejected': t} for o, s, n, t in cur.fetchall()]
+    finally:
+        cur.close()
+
+def load_dead_letters(conn, obj_name, limit=None):
+    """An object's entries, newest first, as dicts."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT source_id, stage, reason, rejected_at FROM {DEAD_LETTER_TABLE} "
+                    f"WHERE object_name = {ph} ORDER BY rejected_at DESC, source_id"
+                    f"{f' LIMIT {int(limit)}' if limit else ''}", (obj_name,))
+        return [{'source_id': i, 'stage': s, 'reason': r, 'rejected_at': t} for i, s, r, t in cur.fetchall()]
+    finally:
+        cur.close()
@@ -0,0 +1,715 @@
+import hashlib
+import json
+import logging
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from .sf_extract import (
+    DEFAULT_BULK_THRESHOLD, open_record_stream, iter_batches, extraction_fields,
+    build_delta_where, advance_watermark, iter_deleted_ids, build_soql, iter_rest_records
+)
+from .transformer import get_target_columns, compile_transformations, apply_plan_checked
+from .flattener import build_layout, flatten_records
+from .sf_metadata import describe_object
+from .db import relaxed_checks
+from .db_loader import (
+    prepare_target, finish_target, load_batch, delete_rows, drop_tables, shadow_table, table_exists, max_packet_bytes
+)
+from .schema_catalog import target_column_kinds
+from .state_store import (
+    ensure_state_tables, get_watermark, save_watermark, get_checkpoint, save_checkpoint, clear_checkpoint,
+    get_batch_sizes, save_batch_sizes,
+)
+from .api_budget import ApiBudget, DEFAULT_API_CONCURRENCY
+from .dead_letters import ensure_dead_letter_table, record_dead_letters, delete_dead_letters, load_dead_letters
+from .run_history import (
+    ensure_history_tables, start_run, record_object, record_profile, record_chunks, finish_run,
+)
+from .pk_chunking import DEFAULT_CHUNK_WORKERS, open_chunked_stream
+from .metrics import count, observe, timed
+from .profiler import stage
+from .pipeline import DEFAULT_PIPELINE_DEPTH, pipelined
+from .api_limits import ApiGovernor, DEFAULT_API_RESERVE_PCT, headroom
+from .batch_sizing import batch_sizers, learned_batch_sizes, frame_bytes
+from .staging import STAGING_FORMATS, SnapshotWriter, latest_snapshot, iter_snapshot, staging_available
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# Dead-lettered Ids re-extracted per SOQL query on replay (keeps the IN list within the query length limit)
+REPLAY_CHUNK = 200
+TEMP_DIR = "/tmp"
+
+def get_run_plan(etl_config, objects=None):
+    """Return the (mapping, transformation) pairs to run, following load_order."""
+    mappings = {m['object']: m for m in etl_config.get('mappings', [])}
+    transformations = etl_config.get('transformations', {})
+
+    order = list(etl_config.get('load_order', []))
+    # Objects with a target table but missing from load_order run last, in mapping order
+    order += [name for name in mappings if name not in order]
+
+    plan = []
+    for obj_name in order:
+        if objects and obj_name not in objects:
+            continue
+        mapping = mappings.get(obj_name)
+        transformation = transformations.get(obj_name, {})
+        if not mapping or not transformation.get('target_table'):
+            logger.warning("Skipping %s: no mapping or target table configured.", obj_name)
+            continue
+        if not any(transformation.get('field_map', {}).values()):
+            logger.warning("Skipping %s: no fields mapped to target columns.", obj_name)
+            continue
+        plan.append((mapping, transformation))
+    return plan
+
+def run_options(etl_config, fresh=False, budget=None, profiler=None, from_staging=False):
+    """Per-run settings shared by every object of a run, read from etl_config.
+
+    - batch_size, bulk_threshold: rows per extracted batch; row count from which Auto uses Bulk API 2.0
+    - workers: parallel_workers; objects extracted concurrently (loads still commit in load_order)
+    - checkpoints: each batch commits with a checkpoint and an interrupted object resumes after
+      its last committed batch (on unless etl_config['checkpoints'] is off); fresh discards them
+    - staging: a STAGING_FORMATS entry to extract into a staged snapshot under /tmp first;
+      from_staging loads the latest snapshots instead of calling the API
+    - pipeline_depth: chunks queued between the overlapped extract / transform / load stages (0 = off)
+    - budget (ApiBudget), profiler (StageProfiler): shared by every object
+    - sizers: {object: BatchSizer}, filled in by run_etl when adaptive_batch_size is on
+    - retired: tables replaced by OVERWRITE swaps, dropped once every object is loaded
+    """
+    staging = (etl_config.get('staging_format') or STAGING_FORMATS[0]) if etl_config.get('staging') else None
+    if (staging or from_staging) and not staging_available():
+        if from_staging:
+            raise RuntimeError("Loading staged snapshots needs pyarrow (pip install pyarrow)")
+        logger.warning("Staging is enabled but pyarrow is not installed; extracting without staging")
+        staging = None
+    return {
+        'batch_size': int(etl_config.get('batch_size') or DEFAULT_BATCH_SIZE),
+        'bulk_threshold': int(etl_config.get('bulk_threshold') or DEFAULT_BULK_THRESHOLD),
+        'workers': int(etl_config.get('parallel_workers') or 1),
+        'checkpoints': bool(etl_config.get('checkpoints', True)),
+        'fresh': fresh,
+        'staging': staging,
+        'from_staging': from_staging,
+        'pipeline_depth': int(etl_config.get('pipeline_depth', DEFAULT_PIPELINE_DEPTH) or 0),
+        'budget': budget,
+        'profiler': profiler,
+        'sizers': {},
+        'retired': [],
+    }
+
+def run_fingerprint(mapping, transformation):
+    """Hash of the settings a checkpoint depends on; a changed mapping cannot resume an old run."""
+    settings = [{k: v for k, v in mapping.items() if k not in ('schedule', 'batch_size')}, transformation]
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()
+
+def _resume_checkpoint(conn, obj_name, fingerprint, table, strategy, fresh):
+    """The usable checkpoint of an interrupted run of an object, discarding stale ones."""
+    checkpoint = get_checkpoint(conn, obj_name)
+    if checkpoint is None:
+        return None
+    reason = None
+    if fresh:
+        reason = "fresh run requested"
+    elif checkpoint['fingerprint'] != fingerprint:
+        reason = "mapping or transformation changed"
+    elif strategy == "OVERWRITE" and (checkpoint['load_table'] != shadow_table(table)
+                                      or not table_exists(conn, checkpoint['load_table'])):
+        reason = "shadow table is gone"
+    if reason:
+        logger.warning("%s: discarding checkpoint at batch %d (%s)", obj_name, checkpoint['batch_no'], reason)
+        clear_checkpoint(conn, obj_name)
+        return None
+    logger.info("%s: resuming after batch %d (%d rows loaded)", obj_name, checkpoint['batch_no'], checkpoint['loaded'])
+    return checkpoint
+
+def plan_object(conn, mapping, transformation, plan, options=None):
+    """Resolve the target and the incremental window of one object (reads DB state).
+
+    options is a run_options() dict (defaults: no checkpoints, staging or pipelining). A
+    checkpointed object records a resumable cursor with every batch, and an interrupted earlier
+    run continues after its last committed batch. The object's sizer (BatchSizer), if any, picks
+    the size of each extracted batch from the measured load latency of the previous ones.
+    """
+    options = options or {}
+    checkpoints, staging, from_staging = (options.get('checkpoints', False), options.get('staging'),
+                                          options.get('from_staging', False))
+    obj_name = mapping['object']
+    strategy = transformation.get('load_strategy', "INSERT")
+
+    # OVERWRITE always reloads the full object, so it ignores incremental mode
+    incremental = bool(mapping.get('incremental')) and strategy != "OVERWRITE"
+    watermark_field = mapping.get('watermark_field', "SystemModstamp")
+    watermark = get_watermark(conn, obj_name) if incremental else None
+    if watermark and watermark['field'] != watermark_field:
+        logger.warning("%s: watermark field changed to %s, running a full extract.", obj_name, watermark_field)
+        watermark = None
+
+    # Merged PK chunks arrive out of Id order, so they have no single cursor to resume from;
+    # a staged snapshot is itself the restart point of an interrupted load
+    resumable = checkpoints and not mapping.get('pk_chunk_size') and not staging and not from_staging
+    fingerprint = run_fingerprint(mapping, transformation) if resumable else None
+    checkpoint = None
+    if resumable:
+        checkpoint = _resume_checkpoint(conn, obj_name, fingerprint, transformation['target_table'], strategy,
+                                        options.get('fresh', False))
+
+    return {
+        'object': obj_name,
+        'mapping': mapping,
+        'transformation': transformation,
+        'plan': plan,
+        'table': transformation['target_table'],
+        'strategy': strategy,
+        'columns': get_target_columns(transformation)[1],
+        'match_key': transformation.get('match_key'),
+        'create_match_index': bool(transformation.get('create_match_index')),
+        # Session-level unique/foreign key checks can be switched off for bulk-style loads
+        'relax_checks': bool(transformation.get('relax_checks')) and strategy in ("BULK LOAD / COPY", "OVERWRITE"),
+        'incremental': incremental,
+        'watermark_field': watermark_field,
+        'watermark': watermark,
+        'where': build_delta_where(watermark) if watermark else None,
+        'resumable': resumable,
+        'fingerprint': fingerprint,
+        'checkpoint': checkpoint,
+        # Wall time per stage and rows out of the transform, filled in while the object runs
+        'stats': {'extract_seconds': 0.0, 'transform_seconds': 0.0, 'load_seconds': 0.0,
+                  'transformed': 0, 'rejected': 0},
+        'profiler': options.get('profiler'),
+        'staging': staging,
+        'from_staging': from_staging,
+        'snapshot': None,
+        # Chunk states of a PK-chunked extract, updated as the chunks stream in
+        'chunks': None,
+        'pipeline_depth': options.get('pipeline_depth', 0),
+        'sizer': (options.get('sizers') or {}).get(obj_name),
+        'started_at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+@contextmanager
+def _stage(job, name):
+    """Time one stage of an object into its stats and the metrics registry (and the profiler, if any)."""
+    started = time.monotonic()
+    try:
+        with stage(job['profiler'], name):
+            yield
+    finally:
+        elapsed = time.monotonic() - started
+        job['stats'][f'{name}_seconds'] += elapsed
+        observe("stage", elapsed, stage=name, object=job['object'])
+
+def object_layout(sf, mapping):
+    """Flattening layout of a mapping from (cached) describe metadata; plain paths if describe fails."""
+    try:
+        describe, _ = describe_object(sf, mapping['object'])
+    except Exception as e:
+        logger.warning("%s: describe unavailable, compound fields are kept as JSON (%s)", mapping['object'], e)
+        describe = None
+    return build_layout(describe, extraction_fields(mapping))
+
+def extract_object(sf, job, batch_size, bulk_threshold=DEFAULT_BULK_THRESHOLD):
+    """Start extracting one object. Returns (method, iterator of (frame, record_count, watermark, cursor, rejects)).
+
+    frame is indexed by Salesforce Id and holds the rows that passed their transform rules;
+    rejects lists the others as (Id, "transform", reason). cursor is where extraction stands
+    after the batch (None unless the job is resumable).
+    """
+    if job['from_staging'] or job['staging']:
+        job['snapshot'] = find_snapshot(job) if job['from_staging'] else stage_object(sf, job, batch_size, bulk_threshold)
+        return job['snapshot']['method'], snapshot_batches(job, job['snapshot'])
+
+    obj_name = job['object']
+    method, layout, stream, position = _open_stream(sf, job, bulk_threshold)
+
+    # The plan is compiled once per config; every batch reuses the same column ops
+    plan = job['plan']
+    sources = [step['source'] for step in plan]
+
+    def extracted():
+        watermark = job['checkpoint']['watermark'] if job['checkpoint'] else job['watermark']
+        record_batches = iter_batches(stream, job['sizer'].current if job['sizer'] else batch_size)
+        while True:
+            with _stage(job, "extract"):
+                records = next(record_batches, None)
+            if records is None:
+                return
+            count("rows_extracted", len(records), object=obj_name)
+            if job['incremental']:
+                watermark = advance_watermark(watermark, records, job['watermark_field'])
+            cursor = None
+            if position is not None:
+                position['id'] = records[-1]['Id']
+                cursor = dict(position)
+            yield records, watermark, cursor
+
+    def transform(item):
+        records, watermark, cursor = item
+        with _stage(job, "transform"):
+            frame, rejects = _transform_records(plan, records, layout, sources)
+        job['stats']['transformed'] += len(frame)
+        return frame, len(records), watermark, cursor, rejects
+
+    return method, pipelined(extracted(), transform, job['pipeline_depth'])
+
+def _open_stream(sf, job, bulk_threshold):
+    """Open the record stream of an object. Returns (method, layout, stream, resumable position or None)."""
+    with _stage(job, "extract"):
+        layout = object_layout(sf, job['mapping'])
+        mapping = {**job['mapping'], 'fields': layout['select']}
+        # Id labels the rows of every batch (dead letters, resumable keyset cursor)
+        if 'Id' not in mapping['fields']:
+            mapping['fields'] = mapping['fields'] + ['Id']
+        position = None
+        if job['resumable']:
+            position = dict(job['checkpoint']['cursor']) if job['checkpoint'] else {}
+        if mapping.get('pk_chunk_size'):
+            workers = int(mapping.get('pk_chunk_workers') or DEFAULT_CHUNK_WORKERS)
+            method, stream = open_chunked_stream(sf, mapping, bulk_threshold, job['where'], workers,
+                                                 progress=lambda states: job.update(chunks=states))
+        else:
+            method, stream = open_record_stream(sf, mapping, bulk_threshold, job['where'], position=position)
+    return method, layout, stream, position
+
+def _source_frame(records, layout, sources):
+    with timed("flatten"):
+        source_frame = flatten_records(records, layout, sources)
+    source_frame.index = [r.get('Id') for r in records]
+    return source_frame
+
+def _transform_frame(plan, source_frame):
+    """Apply a plan to a source frame. Returns (frame, rejects as (Id, "transform", reason))."""
+    frame, reasons = apply_plan_checked(plan, source_frame)
+    rejects = [(source_id, "transform", reason) for source_id, reason in reasons.items()]
+    if rejects:
+        count("rows_rejected", len(rejects), stage="transform")
+    return frame, rejects
+
+def _transform_records(plan, records, layout, sources):
+    return _transform_frame(plan, _source_frame(records, layout, sources))
+
+# --- Staged snapshots ---
+
+def stage_object(sf, job, batch_size, bulk_threshold=DEFAULT_BULK_THRESHOLD):
+    """Extract one object into a staged snapshot of its flattened source columns. Returns its manifest.
+
+    Ids deleted since the watermark are fetched now too, so loading the snapshot needs no API call.
+    """
+    obj_name = job['object']
+    method, layout, stream, _ = _open_stream(sf, job, bulk_threshold)
+    sources = [step['source'] for step in job['plan']]
+    writer = SnapshotWriter(obj_name, job['staging'])
+    watermark = job['watermark']
+    try:
+        record_batches = iter_batches(stream, batch_size)
+        while True:
+            with _stage(job, "extract"):
+                records = next(record_batches, None)
+                if records is None:
+                    break
+                count("rows_extracted", len(records), object=obj_name)
+                writer.write(_source_frame(records, layout, sources))
+            if job['incremental']:
+                watermark = advance_watermark(watermark, records, job['watermark_field'])
+        with _stage(job, "extract"):
+            deleted_ids = list(iter_deleted_ids(sf, obj_name, job['watermark'], bulk_threshold)) if job['watermark'] else []
+    except BaseException:
+        writer.abort()
+        raise
+    snapshot = writer.commit(method=method, where=job['where'], base_watermark=job['watermark'],
+                             watermark=watermark, deleted_ids=deleted_ids)
+    logger.info("%s: staged %d rows in %d %s parts at %s", obj_name, snapshot['rows'], len(snapshot['parts']),
+                snapshot['format'], snapshot['path'])
+    return snapshot
+
+def find_snapshot(job):
+    """The latest staged snapshot an object can be loaded from without calling the API."""
+    obj_name = job['object']
+    snapshot = latest_snapshot(obj_name, [step['source'] for step in job['plan']])
+    if snapshot is None:
+        raise ValueError(f"No staged snapshot of {obj_name} holds the mapped fields; run with staging enabled first.")
+    if job['incremental'] and snapshot.get('base_watermark') != job['watermark']:
+        # Loading it would move the watermark over changes the snapshot never saw
+        raise ValueError(f"The staged snapshot of {obj_name} was extracted from another watermark; stage it again.")
+    logger.info("%s: loading staged snapshot %s (%d rows)", obj_name, snapshot['snapshot_id'], snapshot['rows'])
+    return snapshot
+
+def snapshot_batches(job, snapshot):
+    """Transformed batches of a staged snapshot, in the shape extract_object yields them."""
+    plan = job['plan']
+
+    def staged():
+        parts = iter_snapshot(snapshot, [step['source'] for step in plan])
+        while True:
+            with _stage(job, "extract"):
+                source_frame = next(parts, None)
+            if source_frame is None:
+                return
+            yield source_frame
+
+    def transform(source_frame):
+        with _stage(job, "transform"):
+            frame, rejects = _transform_frame(plan, source_frame)
+        job['stats']['transformed'] += len(frame)
+        return frame, len(source_frame), snapshot['watermark'], None, rejects
+
+    return pipelined(staged(), transform, job['pipeline_depth'])
+
+def load_object(sf, conn, job, batches, bulk_threshold=DEFAULT_BULK_THRESHOLD, retired=None):
+    """Load transformed batches into the target table, then propagate deletes and save the watermark.
+
+    Tables replaced by an OVERWRITE swap are appended to retired (dropped right away if None).
+    """
+    obj_name = job['object']
+    checkpoint = job['checkpoint']
+    load_table = prepare_target(conn, job['table'], job['strategy'], job['columns'], job['match_key'],
+                                job['create_match_index'], resume=checkpoint is not None)
+
+    # Cached target column types pick the cheapest value encoding for bulk loads
+    column_kinds = target_column_kinds(conn, job['table'], job['columns'])
+
+    watermark = checkpoint['watermark'] if checkpoint else job['watermark']
+    extracted = loaded = count = 0
+    if checkpoint:
+        extracted, loaded, count = checkpoint['extracted'], checkpoint['loaded'], checkpoint['batch_no']
+        # Rows of the committed batches were transformed by the interrupted run
+        job['stats']['transformed'] += loaded
+    try:
+        with relaxed_checks(conn, job['relax_checks']):
+            for frame, record_count, watermark, cursor, rejects in batches:
+                load_rejects = []
+
+                def before_commit(c):
+                    # Dead letters and the checkpoint commit together with the batch's rows
+                    record_dead_letters(c, obj_name, rejects + [(i, "load", r) for i, r in load_rejects])
+                    if job['resumable']:
+                        save_checkpoint(c, obj_name, {
+                            'fingerprint': job['fingerprint'], 'load_table': load_table, 'batch_no': count + 1,
+                            'extracted': extracted + record_count, 'loaded': loaded + len(frame) - len(load_rejects),
+                            'cursor': cursor, 'watermark': watermark,
+                        })
+
+                load_started = time.perf_counter()
+                with _stage(job, "load"):
+                    loaded += load_batch(conn, load_table, job['columns'], frame, job['strategy'],
+                                         job['match_key'], column_kinds, before_commit, load_rejects)
+                if job['sizer'] is not None:
+                    job['sizer'].observe(len(frame), frame_bytes(frame), time.perf_counter() - load_started)
+                job['stats']['rejected'] += len(rejects) + len(load_rejects)
+                extracted += record_count
+                count += 1
+                logger.info("%s: batch %d loaded (%d rows total)", obj_name, count, loaded)
+    except Exception:
+        # A resumable OVERWRITE keeps its shadow table; the next run continues filling it
+        finish_target(conn, job['table'], job['strategy'], succeeded=False, keep_shadow=job['resumable'])
+        raise
+    old_table = finish_target(conn, job['table'], job['strategy'])
+    if old_table:
+        if retired is None:
+            drop_tables(conn, [old_table])
+        else:
+            retired.append(old_table)
+
+    deleted = 0
+    if job['watermark']:
+        deleted = _propagate_deletes(sf, conn, job, bulk_threshold)
+    if job['incremental'] and watermark:
+        save_watermark(conn, obj_name, watermark, commit=not job['resumable'])
+    if job['resumable']:
+        # Commits the new watermark and the end of the run together
+        clear_checkpoint(conn, obj_name)
+    if not job['incremental'] and not checkpoint:
+        # A complete full extract re-checked every row; older dead letters are obsolete
+        delete_dead_letters(conn, obj_name, before=job['started_at'])
+
+    return {'batches': count, 'extracted': extracted, 'loaded': loaded, 'deleted': deleted}
+
+def _propagate_deletes(sf, conn, job, bulk_threshold):
+    """Remove rows deleted in Salesforce since the watermark from the target table."""
+    id_column = job['transformation'].get('field_map', {}).get('Id')
+    if not id_column:
+        logger.warning("%s: Id is not mapped to a target column, deletes are not propagated.", job['object'])
+        return 0
+    if job['snapshot'] is not None:
+        deleted_ids = job['snapshot']['deleted_ids']
+    else:
+        deleted_ids = list(iter_deleted_ids(sf, job['object'], job['watermark'], bulk_threshold))
+    if not deleted_ids:
+        return 0
+    return delete_rows(conn, job['table'], id_column, deleted_ids)
+
+def _result(job, method, counters, budget=None, **timings):
+    result = {
+        'object': job['object'],
+        'target_table': job['table'],
+        'strategy': job['strategy'],
+        'extract_method': method,
+        'mode': "incremental" if job['where'] else "full",
+    }
+    if job['checkpoint']:
+        result['resumed_after_batch'] = job['checkpoint']['batch_no']
+    result.update(counters)
+    stats = job['stats']
+    result['transformed'] = stats['transformed']
+    result['rejected'] = stats['rejected']
+    if budget is not None:
+        result.update(budget.usage.get(job['object'], {'api_calls': 0, 'bytes': 0}))
+    for key in ('extract_seconds', 'transform_seconds', 'load_seconds'):
+        result[key] = round(stats[key], 3)
+    if job['sizer'] is not None and job['sizer'].converged:
+        result['batch_size'] = job['sizer'].size
+    if job['chunks']:
+        result['chunks'] = [dict(chunk) for chunk in job['chunks']]
+    result.update({k: round(v, 3) for k, v in timings.items()})
+    return result
+
+def run_object(sf, conn, mapping, transformation, options, transform_plan=None):
+    """Stream one object from Salesforce through its transforms into the target table (options: run_options())."""
+    started = time.monotonic()
+    if transform_plan is None:
+        transform_plan = compile_transformations({mapping['object']: transformation})[mapping['object']]
+    job = plan_object(conn, mapping, transformation, transform_plan, options)
+    budget = options['budget']
+    with budget.track(job['object']) if budget else nullcontext():
+        method, batches = extract_object(sf, job, options['batch_size'], options['bulk_threshold'])
+        try:
+            counters = load_object(sf, conn, job, batches, options['bulk_threshold'], options['retired'])
+        finally:
+            # Stops extract/transform threads still running ahead of a failed load
+            batches.close()
+    return _result(job, method, counters, budget, seconds=time.monotonic() - started)
+
+# --- Parallel extraction ---
+
+def spool_batches(batches):
+    """Buffer transformed batches in a /tmp spool file so extraction can run ahead of loading."""
+    spool = tempfile.TemporaryFile(dir=TEMP_DIR, prefix="etl_spool_")
+    try:
+        for item in batches:
+            pickle.dump(item, spool, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+def iter_spool(spool):
+    """Read spooled batches back in order, closing (and deleting) the spool at the end."""
+    try:
+        while True:
+            try:
+                yield pickle.load(spool)
+            except EOFError:
+                return
+    finally:
+        spool.close()
+
+def _extract_to_spool(sf, job, options):
+    started = time.monotonic()
+    budget = options['budget']
+    with budget.track(job['object']) if budget else nullcontext():
+        method, batches = extract_object(sf, job, options['batch_size'], options['bulk_threshold'])
+        # A staged snapshot is already on disk; only live extracts need spooling
+        if job['snapshot'] is None:
+            batches = iter_spool(spool_batches(batches))
+    return method, batches, time.monotonic() - started
+
+def _run_parallel(sf, conn, run_plan, transform_plans, options):
+    """Extract objects concurrently; load them one by one in load_order as they become ready."""
+    results = []
+    budget = options['budget']
+    jobs = [plan_object(conn, mapping, transformation, transform_plans[mapping['object']], options)
+            for mapping, transformation in run_plan]
+    pool = ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix="sf-extract")
+    futures = [pool.submit(_extract_to_spool, sf, job, options) for job in jobs]
+    try:
+        for job, future in zip(jobs, futures):
+            started = time.monotonic()
+            try:
+                method, batches, extract_seconds = future.result()
+                waited = time.monotonic() - started
+                load_started = time.monotonic()
+                with budget.track(job['object']) if budget else nullcontext():
+                    counters = load_object(sf, conn, job, batches, options['bulk_threshold'], options['retired'])
+                results.append(_result(
+                    job, method, counters, budget,
+                    wait_seconds=waited,
+                    seconds=extract_seconds + time.monotonic() - load_started,
+                ))
+            except Exception as e:
+                logger.exception("Load failed for %s", job['object'])
+                results.append({'object': job['object'], 'error': str(e)})
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Release spools (and snapshot readers) of objects that were extracted but never loaded
+        for future in futures[len(results):]:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                future.result()[1].close()
+    return results
+
+def _drop_retired(conn, pool, retired):
+    if not retired:
+        return
+    if pool is None:
+        drop_tables(conn, retired)
+        return
+
+    def drop():
+        with pool.connection() as drop_conn:
+            drop_tables(drop_conn, retired)
+
+    # Dropping a large InnoDB table can take a while; do it on its own pooled connection
+    threading.Thread(target=drop, name="drop-retired-tables").start()
+
+def _start_history(conn, source):
+    try:
+        ensure_history_tables(conn)
+        return start_run(conn, source)
+    except Exception as e:
+        logger.warning("Run history unavailable: %s", e)
+        return None
+
+def _finish_history(conn, run_id, results, budget, seconds, profiler=None):
+    if run_id is None:
+        return
+    try:
+        for result in results:
+            record_object(conn, run_id, result)
+            if result.get('chunks'):
+                record_chunks(conn, run_id, result['object'], result['chunks'])
+        if profiler is not None:
+            record_profile(conn, run_id, profiler.hotspots())
+        finish_run(conn, run_id, results, budget.calls, budget.bytes, seconds)
+    except Exception as e:
+        logger.warning("Could not record run %s: %s", run_id, e)
+
+def run_etl(etl_config, sf, conn, objects=None, pool=None, budget=None, fresh=False, source="manual",
+            profiler=None, from_staging=False):
+    """Run every configured object in load_order. Returns a list of per-object results.
+
+    A failed object stops the run, since later objects may depend on it; invalid transformation
+    rules raise TransformConfigError before anything is extracted. run_options() lists the
+    settings read from etl_config. Every run and its per-object metrics (and the hotspots of
+    profiler, a StageProfiler) are recorded in the run history under source. If conn was
+    borrowed from pool, tables retired by OVERWRITE swaps are dropped on another pooled
+    connection. The budget's governor (from api_reserve_pct unless the budget has one) stops
+    calling the API once the org's daily allocation is down to the reserve. Batch sizes tuned
+    by adaptive_batch_size are stored in etl_batch_sizes, where the next run starts.
+    """
+    started = time.monotonic()
+    budget = budget or ApiBudget(
+        etl_config.get('api_concurrency') or DEFAULT_API_CONCURRENCY,
+        etl_config.get('api_calls_per_second')
+    )
+    if budget.governor is None:
+        reserve_pct = etl_config.get('api_reserve_pct')
+        budget.governor = ApiGovernor(DEFAULT_API_RESERVE_PCT if reserve_pct is None else reserve_pct)
+    governor = budget.governor
+    budget.install(sf)
+    options = run_options(etl_config, fresh, budget, profiler, from_staging)
+    if not from_staging:
+        governor.refresh(sf, force=True)
+        if not governor.allow_bulk():
+            logger.warning("Bulk API 2.0 query jobs are down to the reserve; extracting through REST")
+            options['bulk_threshold'] = sys.maxsize
+
+    transform_plans = compile_transformations(etl_config.get('transformations', {}))
+    ensure_state_tables(conn)
+    ensure_dead_letter_table(conn)
+    run_plan = get_run_plan(etl_config, objects)
+    learned = get_batch_sizes(conn) if etl_config.get('adaptive_batch_size') else None
+    options['sizers'] = batch_sizers(etl_config, run_plan, options['batch_size'], max_packet_bytes(conn),
+                                     learned) or {}
+    run_id = _start_history(conn, source)
+    if profiler is not None:
+        profiler.start()
+    results = []
+    try:
+        if options['workers'] > 1 and len(run_plan) > 1:
+            results = _run_parallel(sf, conn, run_plan, transform_plans, options)
+            return results
+
+        for mapping, transformation in run_plan:
+            try:
+                if not from_staging:
+                    governor.refresh(sf)
+                results.append(run_object(sf, conn, mapping, transformation, options,
+                                          transform_plan=transform_plans[mapping['object']]))
+            except Exception as e:
+                logger.exception("Load failed for %s", mapping['object'])
+                results.append({'object': mapping['object'], 'error': str(e)})
+                break
+        return results
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        _drop_retired(conn, pool, options['retired'])
+        # The next run of an object starts from the batch size this one converged to
+        try:
+            save_batch_sizes(conn, learned_batch_sizes(results))
+        except Exception as e:
+            logger.warning("Could not record learned batch sizes: %s", e)
+        _finish_history(conn, run_id, results, budget, time.monotonic() - started, profiler)
+        for row in headroom(governor.limits):
+            logger.info("Salesforce %s: %s of %s left", row['limit'], f"{row['remaining']:,}", f"{row['max']:,}")
+
+def replay_dead_letters(sf, conn, etl_config, obj_name):
+    """Re-extract an object's dead-lettered rows by Id and load them with the current configuration.
+
+    Rows that load leave the dead-letter table, rows still rejected get their new reason, and
+    rows deleted in Salesforce since are dropped. OVERWRITE and BULK objects replay into the
+    live table (as MERGE when a match key is set). Returns {'replayed', 'loaded', 'rejected', 'gone'}.
+    """
+    mapping = next((m for m in etl_config.get('mappings', []) if m['object'] == obj_name), None)
+    transformation = etl_config.get('transformations', {}).get(obj_name, {})
+    if not mapping or not transformation.get('target_table'):
+        raise ValueError(f"{obj_name} has no mapping or target table configured")
+    plan = compile_transformations({obj_name: transformation})[obj_name]
+    strategy = transformation.get('load_strategy', "INSERT")
+    if strategy in ("OVERWRITE", "BULK LOAD / COPY"):
+        strategy = "MERGE (UPSERT)" if transformation.get('match_key') else "INSERT"
+    table, match_key = transformation['target_table'], transformation.get('match_key')
+    columns = get_target_columns(transformation)[1]
+
+    layout = object_layout(sf, mapping)
+    fields = layout['select'] + ([] if 'Id' in layout['select'] else ['Id'])
+    sources = [step['source'] for step in plan]
+    ids = [row['source_id'] for row in load_dead_letters(conn, obj_name)]
+    totals = {'replayed': len(ids), 'loaded': 0, 'rejected': 0, 'gone': 0}
+
+    prepare_target(conn, table, strategy, columns, match_key, bool(transformation.get('create_match_index')))
+    try:
+        column_kinds = target_column_kinds(conn, table, columns)
+        for i in range(0, len(ids), REPLAY_CHUNK):
+            chunk = [source_id for source_id in ids[i:i + REPLAY_CHUNK] if source_id.isalnum()]
+            if not chunk:
+                continue
+            where = "Id IN (" + ", ".join(f"'{source_id}'" for source_id in chunk) + ")"
+            records = list(iter_rest_records(sf, build_soql(obj_name, fields, where=where)))
+            frame, reasons = apply_plan_checked(plan, _source_frame(records, layout, sources))
+            load_rejects = []
+
+            def before_commit(c):
+                rejected = {source_id for source_id, _ in load_rejects}
+                loaded_ids = [source_id for source_id in frame.index if source_id not in rejected]
+                found = {r.get('Id') for r in records}
+                delete_dead_letters(c, obj_name, loaded_ids + [s for s in chunk if s not in found], commit=False)
+                record_dead_letters(c, obj_name, [(s, "transform", r) for s, r in reasons.items()] +
+                                    [(s, "load", r) for s, r in load_rejects])
+
+            totals['loaded'] += load_batch(conn, table, columns, frame, strategy, match_key, column_kinds,
+                                           before_commit, load_rejects)
+            totals['rejected'] += len(reasons) + len(load_rejects)
+            totals['gone'] += len(chunk) - len(records)
+    finally:
+        finish_target(conn, table, strategy)
+    logger.info("%s: replayed %d dead letters (%d loaded, %d still rejected, %d gone)",
+                obj_name, totals['replayed'], totals['loaded'], totals['rejected'], totals['gone'])
+    return totals
@@ -1,6 +1,11 @@
+import time
 import streamlit as st
 import pandas as pd
 from .config_manager import save_app_config
+from .sf_extract import EXTRACT_METHODS, WATERMARK_FIELDS
+from .pk_chunking import DEFAULT_CHUNK_WORKERS
+from .staging import staging_available, latest_snapshot, read_head
+from .sf_metadata import list_objects, describe_object, prefetch_describes, clear_metadata_cache
 
 def render_extract_tab():
     if not st.session_state.get('is_connected'):
@@ -29,7 +34,8 @@ def render_extract_tab():
             for i, m in enumerate(mappings):
                 col1, col2, col3 = st.columns([6, 1, 1])
                 with col1:
-                    st.write(f"**{i+1}. {m['object']}** ({len(m['fields'])} fields)")
+                    mode_label = "incremental" if m.get('incremental') else "full"
+                    st.write(f"**{i+1}. {m['object']}** ({len(m['fields'])} fields) · {m.get('extract_method', 'Auto')} · {mode_label}")
                 with col2:
                     if st.button("✏️", key=f"edit_map_{i}", help="Edit"):
                         st.session_state['extract_editor_mode'] = 'edit'
@@ -52,6 +58,22 @@ def render_extract_tab():
                                 del st.session_state['editor_selected_fields_display']
                         st.rerun()
 
+            meta_col1, meta_col2 = st.columns(2)
+            with meta_col1:
+                if st.button("⚡ Prefetch All Mapped Objects", use_container_width=True,
+                             help="매핑된 모든 객체의 describe 메타데이터를 병렬로 받아 공용 캐시(/tmp)에 저장합니다."):
+                    started = time.monotonic()
+                    with st.spinner("Describing mapped objects..."):
+                        outcome = prefetch_describes(sf, [m['object'] for m in mappings])
+                    st.dataframe(pd.DataFrame([{'Object': k, 'Result': v} for k, v in outcome.items()]),
+                                 use_container_width=True, hide_index=True)
+                    st.caption(f"{len(outcome)} objects in {time.monotonic() - started:.1f}s")
+            with meta_col2:
+                if st.button("🔄 Refresh Metadata Cache", use_container_width=True,
+                             help="이 조직의 캐시된 객체 목록과 describe 결과를 지우고 다시 조회합니다."):
+                    clear_metadata_cache(sf)
+                    st.rerun()
+
     st.divider()
 
     # --- EDITOR SECTION ---
@@ -59,28 +81,15 @@ def render_extract_tab():
     header_text = "➕ Add New Mapping" if mode == 'add' else f"✏️ Edit Mapping #{st.session_state['extract_editor_idx']+1}"
     st.subheader(header_text)
 
-    # 1. Fetch Objects
-    if 'sf_objects_list' not in st.session_state:
+    # 1. Fetch Objects (process-wide + /tmp cache per org, revalidated via describeGlobal)
+    try:
         with st.spinner("Fetching Salesforce Objects..."):
-            try:
-                query = """
-                    SELECT QualifiedApiName, Label
-                    FROM EntityDefinition
-                    WHERE IsApexTriggerable = true
-                      AND IsCustomizable = true
-                      AND IsProcessEnabled = true
-                    ORDER BY Label
-                """
-                results = sf.query_all(query)
-                st.session_state['sf_objects_list'] = [
-                    {'label': rec['Label'], 'name': rec['QualifiedApiName']} 
-                    for rec in results['records']
-                ]
-            except Exception as e:
-                st.error(f"Failed to fetch objects: {e}")
-                st.session_state['sf_objects_list'] = []
+            sf_objects = list_objects(sf)
+    except Exception as e:
+        st.error(f"Failed to fetch objects: {e}")
+        sf_objects = []
 
-    obj_map = {f"{x['label']} ({x['name']})": x['name'] for x in st.session_state['sf_objects_list']}
+    obj_map = {f"{x['label']} ({x['name']})": x['name'] for x in sf_objects}
     obj_options = list(obj_map.keys())
 
     # --- Population Logic (Object) ---
@@ -92,6 +101,11 @@ def render_extract_tab():
                 found_disp = next((k for k, v in obj_map.items() if v == m['object']), None)
                 if found_disp:
                     st.session_state['editor_selected_obj_display'] = found_disp
+                    st.session_state['editor_extract_method'] = m.get('extract_method', "Auto")
+                    st.session_state['editor_incremental'] = m.get('incremental', False)
+                    st.session_state['editor_watermark_field'] = m.get('watermark_field', "SystemModstamp")
+                    st.session_state['editor_pk_chunk_size'] = int(m.get('pk_chunk_size', 0))
+                    st.session_state['editor_pk_chunk_workers'] = int(m.get('pk_chunk_workers', DEFAULT_CHUNK_WORKERS))
                     st.session_state['_need_field_sync'] = True
         st.session_state['_populate_editor'] = False
 
@@ -108,20 +122,15 @@ def render_extract_tab():
     selected_fields_api = []
 
     if selected_obj_api:
-        # Fetch Fields
-        cache_key = f"meta_fields_{selected_obj_api}"
-        if cache_key in st.session_state:
-            fields_data = st.session_state[cache_key]
-        else:
-            try:
-                with st.spinner(f"Fetching fields for {selected_obj_api}..."):
-                    obj_desc = getattr(sf, selected_obj_api).describe()
-                    fields_data = [{'label': f['label'], 'name': f['name']} for f in obj_desc['fields']]
-                    fields_data.sort(key=lambda x: x['name'])
-                    st.session_state[cache_key] = fields_data
-            except Exception as e:
-                st.error(f"Error fetching fields: {e}")
-                fields_data = []
+        # Fetch Fields (cached describe, revalidated with If-Modified-Since)
+        try:
+            with st.spinner(f"Fetching fields for {selected_obj_api}..."):
+                obj_desc, _ = describe_object(sf, selected_obj_api)
+            fields_data = [{'label': f['label'], 'name': f['name']} for f in obj_desc['fields']]
+            fields_data.sort(key=lambda x: x['name'])
+        except Exception as e:
+            st.error(f"Error fetching fields: {e}")
+            fields_data = []
 
         field_map = {f"{f['name']} ({f['label']})": f['name'] for f in fields_data}
         field_options = list(field_map.keys())
@@ -144,6 +153,47 @@ def render_extract_tab():
         )
         selected_fields_api = [field_map[d] for d in selected_fields_display]
 
+        st.selectbox(
+            "Extraction API",
+            options=EXTRACT_METHODS,
+            key='editor_extract_method',
+            help="Auto: SELECT COUNT()로 건수를 추정하여 대용량 객체는 Bulk API 2.0, 그 외는 REST로 추출합니다."
+        )
+
+        inc_col1, inc_col2 = st.columns(2)
+        with inc_col1:
+            st.checkbox(
+                "Incremental (delta) extraction",
+                key='editor_incremental',
+                help="마지막 적재 이후 변경된 레코드만 추출하고, 삭제된 레코드(IsDeleted)는 타겟에서도 삭제합니다. "
+                     "MERGE (UPSERT) 적재 방식과 함께 사용하세요. OVERWRITE는 항상 전체 추출합니다."
+            )
+        with inc_col2:
+            if st.session_state.get('editor_incremental'):
+                st.selectbox("Watermark Field", options=WATERMARK_FIELDS, key='editor_watermark_field')
+
+        if 'editor_pk_chunk_workers' not in st.session_state:
+            st.session_state['editor_pk_chunk_workers'] = DEFAULT_CHUNK_WORKERS
+        pk_col1, pk_col2 = st.columns(2)
+        with pk_col1:
+            st.number_input(
+                "PK Chunk Size (rows, 0 = off)",
+                min_value=0,
+                max_value=10000000,
+                step=100000,
+                key='editor_pk_chunk_size',
+                help="대용량 객체를 Id 범위(PK chunk)로 나누어 병렬 추출합니다. 예: 1,000,000 → 3천만 건을 30개 청크로 분할. "
+                     "청크별 추출 건수는 Runs 탭의 실행 기록에서 확인할 수 있습니다."
+            )
+        with pk_col2:
+            st.number_input(
+                "Chunk Workers",
+                min_value=1,
+                max_value=16,
+                key='editor_pk_chunk_workers',
+                disabled=not st.session_state.get('editor_pk_chunk_size')
+            )
+
     else:
         st.info("👈 Select an object to choose fields.")
 
@@ -156,10 +206,20 @@ def render_extract_tab():
             if not selected_obj_api or not selected_fields_api:
                 st.error("Please select an object and at least one field.")
             else:
-                new_mapping = {'object': selected_obj_api, 'fields': selected_fields_api}
+                new_mapping = {
+                    'object': selected_obj_api,
+                    'fields': selected_fields_api,
+                    'extract_method': st.session_state.get('editor_extract_method', "Auto"),
+                    'incremental': st.session_state.get('editor_incremental', False),
+                    'watermark_field': st.session_state.get('editor_watermark_field', "SystemModstamp"),
+                    'pk_chunk_size': int(st.session_state.get('editor_pk_chunk_size', 0)),
+                    'pk_chunk_workers': int(st.session_state.get('editor_pk_chunk_workers', DEFAULT_CHUNK_WORKERS))
+                }
                 
                 if mode == 'edit':
-                    mappings[st.session_state['extract_editor_idx']] = new_mapping
+                    # Keep per-mapping settings that are not part of the editor form
+                    idx = st.session_state['extract_editor_idx']
+                    mappings[idx] = {**mappings[idx], **new_mapping}
                     st.success("Mapping updated!")
                     st.session_state['extract_editor_mode'] = 'add'
                     st.session_state['extract_editor_idx'] = None
@@ -204,13 +264,19 @@ def render_extract_tab():
     if selected_obj_api and selected_fields_api:
         if st.button("🔍 Preview Data (Current Selection)", type="secondary"):
             try:
-                q = f"SELECT {','.join(selected_fields_api)} FROM {selected_obj_api} LIMIT 5"
-                with st.spinner("Querying..."):
-                    res = sf.query(q)
-                    recs = [ {k:v for k,v in r.items() if k!='attributes'} for r in res['records'] ]
-                    if recs:
-                        st.dataframe(pd.DataFrame(recs))
-                    else:
-                        st.info("No records found.")
+                # A staged snapshot holding these fields answers without an API call
+                snapshot = latest_snapshot(selected_obj_api, selected_fields_api) if staging_available() else None
+                if snapshot is not None:
+                    st.caption(f"📦 Staged snapshot · {snapshot['created_at']} UTC · {snapshot['rows']:,} rows")
+                    st.dataframe(read_head(snapshot, 5, selected_fields_api))
+                else:
+                    q = f"SELECT {','.join(selected_fields_api)} FROM {selected_obj_api} LIMIT 5"
+                    with st.spinner("Querying..."):
+                        res = sf.query(q)
+                        recs = [ {k:v for k,v in r.items() if k!='attributes'} for r in res['records'] ]
+                        if recs:
+                            st.dataframe(pd.DataFrame(recs))
+                        else:
+                            st.info("No records found.")
             except Exception as e:
-                st.error(f"Preview failed: {e}")
\ No newline at end of file
+                st.error(f"Preview failed: {e}")
@@ -0,0 +1,117 @@
+import json
+import logging
+import pandas as pd
+from .transformer import get_path
+
+logger = logging.getLogger(__name__)
+
+COMPOUND_TYPES = {"address", "location"}
+
+def component_key(compound_name, component_name):
+    """Key of a component inside the compound value REST returns.
+
+    BillingAddress/BillingStreet -> 'street', Location__c/Location__Latitude__s -> 'latitude'.
+    """
+    if component_name.endswith("__s"):
+        suffix = component_name[:-3].rsplit("__", 1)[-1]
+    else:
+        prefix = compound_name[:-len("Address")] if compound_name.endswith("Address") else compound_name
+        suffix = component_name[len(prefix):] if component_name.startswith(prefix) else component_name
+    return suffix[:1].lower() + suffix[1:]
+
+def compound_components(describe, field_name):
+    """Component fields of a compound field, e.g. BillingAddress -> [BillingStreet, BillingCity, ...]."""
+    if not describe:
+        return []
+    return [f['name'] for f in describe['fields'] if f.get('compoundFieldName') == field_name]
+
+def is_compound(describe, field_name):
+    if not describe:
+        return False
+    return any(f['name'] == field_name and f.get('type') in COMPOUND_TYPES for f in describe['fields'])
+
+def expand_fields(describe, fields):
+    """Source fields a mapping offers after flattening: each compound is followed by its components."""
+    expanded = []
+    for field in fields:
+        expanded.append(field)
+        if is_compound(describe, field):
+            expanded.extend(compound_components(describe, field))
+    return list(dict.fromkeys(expanded))
+
+def build_layout(describe, fields):
+    """Precompute how an object's fields are queried and flattened into columns.
+
+    Compound fields are queried as their component fields (which Bulk API 2.0 also
+    supports); relationship paths are split once here instead of on every record.
+    Returns {'select': [SOQL fields], 'paths': {column: path tuple}, 'compounds': {name: [(component, key)]}}.
+    """
+    select, paths, compounds = [], {}, {}
+    for field in fields:
+        if is_compound(describe, field):
+            components = compound_components(describe, field)
+            compounds[field] = [(c, component_key(field, c)) for c in components]
+            for c in components:
+                select.append(c)
+                paths[c] = (c,)
+        else:
+            select.append(field)
+            paths[field] = tuple(field.split('.'))
+    return {'select': list(dict.fromkeys(select)), 'paths': paths, 'compounds': compounds}
+
+def _column_values(records, path, cache):
+    """Values of one (possibly nested) path; shared prefixes (Owner, Owner.Profile) are walked once."""
+    if path in cache:
+        return cache[path]
+    if len(path) == 1:
+        values = [r.get(path[0]) for r in records]
+    else:
+        flat_key = '.'.join(path)
+        if flat_key in records[0]:
+            # Bulk API CSV results are already flat ("Owner.Name" columns)
+            values = [r.get(flat_key) for r in records]
+        else:
+            parents = _column_values(records, path[:-1], cache)
+            key = path[-1]
+            values = [p.get(key) if isinstance(p, dict) else None for p in parents]
+    cache[path] = values
+    return values
+
+def _compound_json(frame_columns, components, index):
+    # Legacy mappings of the compound itself get the same JSON text the passthrough op used to produce
+    parts = pd.DataFrame({key: frame_columns[c] for c, key in components}, index=index)
+    empty = parts.isna().all(axis=1)
+    text = pd.Series([json.dumps(row, default=str) for row in parts.astype(object).where(parts.notna(), None)
+                     .to_dict('records')], index=index, dtype=object)
+    return text.mask(empty, None)
+
+def flatten_records(records, layout, sources):
+    """Build a column-oriented DataFrame of the source fields from a batch of records using a layout."""
+    cache = {}
+    columns = {}
+    index = pd.RangeIndex(len(records))
+    for field in dict.fromkeys(sources):
+        if field in layout['paths'] and records:
+            columns[field] = pd.Series(_column_values(records, layout['paths'][field], cache), dtype=object)
+        elif field in layout['compounds']:
+            continue
+        else:
+            columns[field] = pd.Series([get_path(r, field) for r in records], dtype=object)
+    for field in dict.fromkeys(sources):
+        if field in layout['compounds']:
+            components = layout['compounds'][field]
+            for c, _ in components:
+                if c not in columns:
+                    columns[c] = pd.Series(_column_values(records, (c,), cache) if records else [], dtype=object)
+            columns[field] = _compound_json(columns, components, index)
+    return pd.DataFrame({f: columns[f] for f in dict.fromkeys(sources)}, index=index)
+
+def resolve_field(describe_fn, describe, field_name):
+    """Describe entry of a field, following relationship paths (Owner.Profile.Name) through describe_fn."""
+    parts = field_name.split('.')
+    for rel in parts[:-1]:
+        ref = next((f for f in describe['fields'] if f.get('relationshipName') == rel), None)
+        if not ref or not ref.get('referenceTo'):
+            return None
+        describe = describe_fn(ref['referenceTo'][0])
+    return next((f for f in describe['fields'] if f['name'] == parts[-1]), None)
@@ -1,5 +1,21 @@
 import streamlit as st
 from .config_manager import save_app_config
+from .db_loader import LOAD_STRATEGIES
+from .api_budget import DEFAULT_API_CONCURRENCY
+from .api_limits import DEFAULT_API_RESERVE_PCT
+from .staging import STAGING_FORMATS, staging_available
+from .pipeline import DEFAULT_PIPELINE_DEPTH
+from .batch_sizing import DEFAULT_MIN_BATCH_SIZE, DEFAULT_MAX_BATCH_SIZE, DEFAULT_TARGET_SECONDS
+from .db import get_pool
+from .state_store import get_batch_sizes, reset_batch_sizes
+
+def load_learned_batch_sizes():
+    """Batch sizes adaptive sizing converged to, from the target database ({} if none are recorded yet)."""
+    try:
+        with get_pool(st.session_state['mariadb_config']).connection() as conn:
+            return get_batch_sizes(conn)
+    except Exception:
+        return {}
 
 def render_load_tab():
     st.subheader("🚀 Data Load Order Settings")
@@ -58,7 +74,7 @@ def render_load_tab():
                 st.caption(f"📍 {field_count} fields mapped")
 
             with col_strategy:
-                strategies = ["INSERT", "BULK LOAD / COPY", "MERGE (UPSERT)", "OVERWRITE"]
+                strategies = LOAD_STRATEGIES
                 current_strategy = transformations[obj_name].get('load_strategy', "INSERT")
                 if current_strategy not in strategies: current_strategy = "INSERT"
                 
@@ -90,10 +106,26 @@ def render_load_tab():
                             help="UPSERT 수행 시 중복 체크의 기준이 되는 컬럼을 선택하세요."
                         )
                         transformations[obj_name]['match_key'] = match_key
-                elif new_strategy == "BULK LOAD / COPY":
-                    st.info("🚀 High-speed loading enabled.")
-                elif new_strategy == "OVERWRITE":
-                    st.warning("⚠️ Truncates table before load.")
+                        transformations[obj_name]['create_match_index'] = st.checkbox(
+                            "Create unique index if missing",
+                            value=transformations[obj_name].get('create_match_index', False),
+                            key=f"match_index_{obj_name}",
+                            help="UPSERT는 매칭 키 단독 UNIQUE 인덱스가 필요합니다. 없으면 첫 실행 시 생성합니다 (해제 시 오류로 중단)."
+                        )
+                        st.caption("배치마다 임시 스테이징 테이블에 적재 후 한 번의 INSERT ... ON DUPLICATE KEY UPDATE로 병합합니다.")
+                elif new_strategy in ("BULK LOAD / COPY", "OVERWRITE"):
+                    if new_strategy == "BULK LOAD / COPY":
+                        st.info("🚀 LOAD DATA LOCAL INFILE (falls back to multi-row INSERT).")
+                        st.caption("서버의 `local_infile` 설정이 필요합니다.")
+                    else:
+                        st.info("🔁 Loads into a shadow table and swaps it in atomically.")
+                        st.caption("`<target>__new`에 적재 후 인덱스를 생성하고 `RENAME TABLE`로 교체합니다. 적재 중에도 기존 데이터가 조회됩니다.")
+                    transformations[obj_name]['relax_checks'] = st.checkbox(
+                        "Disable unique/FK checks during load",
+                        value=transformations[obj_name].get('relax_checks', False),
+                        key=f"relax_{obj_name}",
+                        help="적재하는 동안 세션의 unique_checks / foreign_key_checks를 끕니다. 원본 데이터의 중복/참조 무결성이 보장될 때만 사용하세요."
+                    )
                 else:
                     st.caption("Standard row-by-row insertion.")
 
@@ -101,7 +133,7 @@ def render_load_tab():
 
     # Global Load Settings
     st.subheader("⚙️ Global Load Settings")
-    col_batch, _ = st.columns([0.3, 0.7])
+    col_batch, col_workers, col_api = st.columns(3)
     with col_batch:
         batch_size = st.number_input(
             "Batch Size",
@@ -112,6 +144,111 @@ def render_load_tab():
             help="한 번에 처리할 레코드 수를 설정합니다. (MariaDB 성능에 영향)"
         )
         st.session_state['etl_config']['batch_size'] = batch_size
+    with col_workers:
+        parallel_workers = st.number_input(
+            "Parallel Workers",
+            min_value=1,
+            max_value=16,
+            value=int(etl_config.get('parallel_workers', 1)),
+            help="동시에 추출할 객체 수입니다. 적재(commit)는 항상 위의 로드 순서대로 진행됩니다."
+        )
+        st.session_state['etl_config']['parallel_workers'] = parallel_workers
+    with col_api:
+        api_concurrency = st.number_input(
+            "Salesforce API Concurrency",
+            min_value=1,
+            max_value=25,
+            value=int(etl_config.get('api_concurrency', DEFAULT_API_CONCURRENCY)),
+            help="모든 워커가 공유하는 Salesforce API 동시 호출 한도입니다."
+        )
+        st.session_state['etl_config']['api_concurrency'] = api_concurrency
+        st.session_state['etl_config']['api_reserve_pct'] = st.number_input(
+            "API Reserve (%)",
+            min_value=0,
+            max_value=90,
+            value=int(etl_config.get('api_reserve_pct', DEFAULT_API_RESERVE_PCT)),
+            help="일일 API 요청/Bulk 작업 한도 중 다른 연동을 위해 남겨둘 비율입니다. 남은 한도가 이 선에 닿으면 실행이 멈추고, "
+                 "가까워질수록 호출 속도를 낮춥니다. 현재 여유는 Connection 탭에서 확인할 수 있습니다."
+        )
+    adaptive = st.checkbox(
+        "Adaptive batch size (per object)",
+        value=bool(etl_config.get('adaptive_batch_size', False)),
+        help="객체별로 행당 바이트, 배치 쓰기+커밋 시간, MariaDB `max_allowed_packet`을 측정해 실행 중 배치 크기를 조정합니다. "
+             "위의 Batch Size는 시작값이며, 수렴한 크기는 타겟 DB의 `etl_batch_sizes` 테이블에 저장되어 다음 실행이 그 크기로 시작합니다."
+    )
+    st.session_state['etl_config']['adaptive_batch_size'] = adaptive
+    if adaptive:
+        col_min, col_max, col_target = st.columns(3)
+        with col_min:
+            batch_size_min = st.number_input(
+                "Min Batch Size", min_value=1, max_value=100000,
+                value=int(etl_config.get('batch_size_min', DEFAULT_MIN_BATCH_SIZE)), step=100
+            )
+        with col_max:
+            batch_size_max = st.number_input(
+                "Max Batch Size", min_value=int(batch_size_min), max_value=100000,
+                value=max(int(batch_size_min), int(etl_config.get('batch_size_max', DEFAULT_MAX_BATCH_SIZE))), step=1000
+            )
+        with col_target:
+            batch_target_seconds = st.number_input(
+                "Target Load Time per Batch (s)", min_value=0.1, max_value=60.0,
+                value=float(etl_config.get('batch_target_seconds', DEFAULT_TARGET_SECONDS)), step=0.5,
+                help="배치 하나의 쓰기+커밋이 이 시간 정도 걸리도록 크기를 맞춥니다."
+            )
+        st.session_state['etl_config'].update({
+            'batch_size_min': int(batch_size_min),
+            'batch_size_max': int(batch_size_max),
+            'batch_target_seconds': float(batch_target_seconds),
+        })
+        learned = load_learned_batch_sizes()
+        if learned:
+            st.caption("Learned batch sizes: " + ", ".join(f"**{obj}** {size:,}" for obj, size in learned.items()))
+            if st.button("↺ Reset Learned Batch Sizes"):
+                try:
+                    with get_pool(st.session_state['mariadb_config']).connection() as conn:
+                        reset_batch_sizes(conn)
+                except Exception as e:
+                    st.error(f"Failed to reset learned batch sizes: {e}")
+                else:
+                    # Sizes older versions recorded on the mappings would otherwise still apply
+                    for m in mappings:
+                        m.pop('batch_size', None)
+                    save_app_config()
+                    st.rerun()
+
+    st.session_state['etl_config']['pipeline_depth'] = st.number_input(
+        "Pipeline Depth (chunks in flight)",
+        min_value=0,
+        max_value=16,
+        value=int(etl_config.get('pipeline_depth', DEFAULT_PIPELINE_DEPTH)),
+        help="추출(다음 페이지 요청)·변환·적재(이전 청크 쓰기)를 각각의 스레드에서 동시에 진행하며, 단계 사이에 "
+             "대기할 수 있는 청크 수의 상한입니다. 느린 단계가 앞 단계를 멈추게 하여 메모리를 제한합니다. 0이면 순차 실행."
+    )
+    st.session_state['etl_config']['checkpoints'] = st.checkbox(
+        "Resumable runs (checkpoints)",
+        value=bool(etl_config.get('checkpoints', True)),
+        help="배치마다 추출 커서(Bulk locator 또는 마지막 Id)와 배치 번호를 같은 트랜잭션으로 `etl_checkpoints`에 기록합니다. "
+             "중단된 실행은 다음 실행에서 마지막 커밋 배치 이후부터 이어집니다 (PK Chunking 객체는 처음부터)."
+    )
+    col_stage, col_format = st.columns([2, 1])
+    with col_stage:
+        st.session_state['etl_config']['staging'] = st.checkbox(
+            "Stage extracts (Arrow/Parquet under /tmp)",
+            value=bool(etl_config.get('staging', False)) and staging_available(),
+            disabled=not staging_available(),
+            help="객체별 추출 결과를 변환/적재 전에 `/tmp/sf_etl_staging`에 배치 단위 파일로 저장합니다. "
+                 "API를 다시 호출하지 않고 `python run_etl.py --from-staging`으로 변환·적재만 재실행할 수 있습니다."
+                 + ("" if staging_available() else " (pyarrow 설치 필요)")
+        )
+    with col_format:
+        staging_format = etl_config.get('staging_format', STAGING_FORMATS[0])
+        st.session_state['etl_config']['staging_format'] = st.selectbox(
+            "Staging Format",
+            STAGING_FORMATS,
+            index=STAGING_FORMATS.index(staging_format) if staging_format in STAGING_FORMATS else 0,
+            disabled=not st.session_state['etl_config']['staging'],
+            help="Arrow IPC는 압축 없이 memory-map으로 읽고, Parquet은 더 작게 저장됩니다."
+        )
 
     # Visual representation of the flow
     st.markdown("### 🔄 Planned Execution Flow")
@@ -1,5 +1,6 @@
 import streamlit as st
 from .config_manager import save_app_config
+from .db import DEFAULT_POOL_SIZE, test_connection
 
 def render_mariadb_tab():
     st.subheader("🗄️ MariaDB Connection Settings")
@@ -24,6 +25,10 @@ def render_mariadb_tab():
     with col2:
         password = st.text_input("Password", value=config.get('password', ''), type="password")
         database = st.text_input("Database Name", value=config.get('database', ''), placeholder="my_database")
+        pool_size = st.number_input(
+            "Connection Pool Size", value=int(config.get('pool_size', DEFAULT_POOL_SIZE)), min_value=1, max_value=32,
+            help="Streamlit 세션과 적재 작업이 함께 사용하는 MariaDB 연결 수의 상한입니다."
+        )
 
     # Update session state
     st.session_state['mariadb_config'] = {
@@ -31,7 +36,8 @@ def render_mariadb_tab():
         'port': port,
         'user': user,
         'password': password,
-        'database': database
+        'database': database,
+        'pool_size': pool_size
     }
 
     if st.button("Save MariaDB Configuration", type="primary"):
@@ -39,12 +45,22 @@ def render_mariadb_tab():
         st.success("MariaDB configuration saved successfully!")
         st.toast("Configuration saved to config.json", icon="💾")
 
-    # Placeholder for test connection logic
-    if st.button("Test Connection (Demo)"):
-        st.info("Connection testing is currently a placeholder. Ensure 'mysql-connector-python' is installed to implement actual connectivity.")
-        if host and user and database:
-            st.write(f"Connecting to {user}@{host}:{port}/{database}...")
-            # Simulate success
-            st.success("Connection parameters look valid (UI test only).")
-        else:
+    if st.button("🔌 Test Connection"):
+        if not (host and user and database):
             st.error("Please fill in Host, Username, and Database name.")
+        else:
+            try:
+                with st.spinner(f"Connecting to {user}@{host}:{port}/{database}..."):
+                    result = test_connection(st.session_state['mariadb_config'])
+                st.success(
+                    f"✅ Connected to MariaDB {result['version']} — round trip "
+                    f"{result['min_ms']:.1f} ms (min) / {result['avg_ms']:.1f} ms (avg)"
+                )
+                stats = result['pool']
+                st.caption(
+                    f"Checkout {result['checkout_ms']:.1f} ms (includes connect on first use) · "
+                    f"🔗 Pool: {stats['in_use']} in use / {stats['idle']} idle (max {stats['max_size']}), "
+                    f"{stats['created']} opened, {stats['reconnects']} stale reconnects"
+                )
+            except Exception as e:
+                st.error(f"Connection failed: {e}")
@@ -0,0 +1,134 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Every metric is exported as sf_etl_<name>
+METRIC_PREFIX = "sf_etl_"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+class MetricsRegistry:
+    """In-process counters and timers, keyed by name and a small set of labels.
+
+    Timers keep count/sum/max of their observations (seconds); both are cheap enough to
+    wrap every HTTP call, parse, transform op and DB write of a run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            stat = self._timers.get(key)
+            if stat is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2] = max(stat[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the body of a with block into the named timer."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        """Current values as rows: {'metric', 'labels', 'kind', 'count', 'total', 'max'}."""
+        with self._lock:
+            counters = list(self._counters.items())
+            timers = [(key, list(stat)) for key, stat in self._timers.items()]
+        rows = [{'metric': name, 'labels': dict(labels), 'kind': "counter", 'count': None,
+                 'total': value, 'max': None} for (name, labels), value in counters]
+        rows += [{'metric': name, 'labels': dict(labels), 'kind': "timer", 'count': count,
+                  'total': round(total, 6), 'max': round(peak, 6)} for (name, labels), (count, total, peak) in timers]
+        return sorted(rows, key=lambda r: (r['metric'], sorted(r['labels'].items())))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+def to_openmetrics(registry=None):
+    """Render the registry in the OpenMetrics text format (timers as summaries plus a _max gauge)."""
+    rows = (registry or REGISTRY).snapshot()
+    lines = []
+    for kind in ("counter", "timer"):
+        seen = set()
+        for row in (r for r in rows if r['kind'] == kind):
+            name = METRIC_PREFIX + row['metric']
+            if kind == "counter":
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}_total{_labels(row['labels'])} {row['total']}")
+            else:
+                name += "_seconds"
+                if name not in seen:
+                    lines.append(f"# TYPE {name} summary")
+                    lines.append(f"# UNIT {name} seconds")
+                lines.append(f"{name}_count{_labels(row['labels'])} {row['count']}")
+                lines.append(f"{name}_sum{_labels(row['labels'])} {row['total']}")
+            seen.add(name)
+    seen = set()
+    for row in (r for r in rows if r['kind'] == "timer"):
+        name = f"{METRIC_PREFIX}{row['metric']}_seconds_max"
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lines.append(f"{name}{_labels(row['labels'])} {row['max']}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+# Process-wide registry shared by the Streamlit session, run_etl.py and the worker
+REGISTRY = MetricsRegistry()
+
+def timed(name, **labels):
+    return REGISTRY.timer(name, **labels)
+
+def count(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+def observe(name, seconds, **labels):
+    REGISTRY.observe(name, seconds, **labels)
+
+def serve_metrics(port, registry=None):
+    """Serve the registry as OpenMetrics text on http://0.0.0.0:port/metrics from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = to_openmetrics(registry).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,93 @@
+import contextvars
+import queue
+import threading
+import time
+from .metrics import observe
+
+# Chunks each stage may queue ahead of the next one; 0 runs extract, transform and load in turn
+DEFAULT_PIPELINE_DEPTH = 2
+PIPELINE_STAGES = ("extract", "transform", "load")
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+def prefetch(items, depth=DEFAULT_PIPELINE_DEPTH, name="prefetch"):
+    """Iterate items on a background thread, at most depth of them queued ahead of the consumer.
+
+    The producer blocks while the queue is full, so a slow consumer caps memory instead of
+    letting the producer run away. Errors are re-raised to the consumer, and closing the
+    generator stops the producer. The thread starts on the first next() and runs in a copy
+    of the caller's context (e.g. the object its API calls are attributed to).
+    """
+    buffer = queue.Queue(maxsize=max(1, int(depth)))
+    stop = threading.Event()
+
+    def put(item):
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            observe("pipeline_wait", time.perf_counter() - started, stage=name, side="put")
+            return True
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(items, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(produce,), name=f"etl-{name}",
+                              daemon=True)
+    thread.start()
+    try:
+        while True:
+            started = time.perf_counter()
+            item = buffer.get()
+            observe("pipeline_wait", time.perf_counter() - started, stage=name, side="get")
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+def pipelined(items, transform, depth=DEFAULT_PIPELINE_DEPTH):
+    """transform(item) for each item, with extraction and transformation on their own threads.
+
+    The caller's loop is the third (load) stage. With depth 0 everything runs on the caller's thread.
+    """
+    if not depth:
+        return _mapped(items, transform)
+    return prefetch(_mapped(prefetch(items, depth, "extract"), transform), depth, "transform")
+
+def _mapped(items, transform):
+    try:
+        for item in items:
+            yield transform(item)
+    finally:
+        items.close()
+
+def stage_utilization(result):
+    """Share of an object's wall time each stage was busy: {'extract': 0.93, ...} (empty without timings).
+
+    In a pipelined run the stages overlap, so the one closest to 1.0 is the bottleneck.
+    """
+    seconds = result.get('seconds') or 0
+    if seconds <= 0:
+        return {}
+    return {name: min(1.0, result.get(f'{name}_seconds', 0) / seconds) for name in PIPELINE_STAGES}
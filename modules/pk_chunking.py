@@ -0,0 +1,165 @@
+import contextvars
+import logging
+import math
+import queue
+import threading
+from .sf_extract import DEFAULT_BULK_THRESHOLD, build_soql, open_record_stream, estimate_count
+
+logger = logging.getLogger(__name__)
+
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+MAX_CHUNKS = 200
+DEFAULT_CHUNK_WORKERS = 4
+# Records handed from a chunk worker to the merged stream at a time
+HANDOFF_SIZE = 2000
+
+def id_to_int(sf_id):
+    """Decode the 12 base62 characters after the 3-char key prefix of a Salesforce Id."""
+    value = 0
+    for ch in sf_id[3:15]:
+        value = value * 62 + BASE62.index(ch)
+    return value
+
+def int_to_id(prefix, value):
+    """Encode a decoded Id number back into a 15-char Salesforce Id with the given key prefix."""
+    chars = []
+    for _ in range(12):
+        value, rem = divmod(value, 62)
+        chars.append(BASE62[rem])
+    return prefix + "".join(reversed(chars))
+
+def get_id_bounds(sf, obj_name, where=None):
+    """Return the lowest and highest Id of an object (two cheap indexed SOQL queries)."""
+    bounds = []
+    for direction in ("ASC", "DESC"):
+        soql = build_soql(obj_name, ["Id"], where) + f" ORDER BY Id {direction} LIMIT 1"
+        records = sf.query(soql)['records']
+        if not records:
+            return None, None
+        bounds.append(records[0]['Id'])
+    return bounds[0], bounds[1]
+
+def plan_id_chunks(min_id, max_id, num_chunks):
+    """Split [min_id, max_id] into num_chunks Id ranges. Returns a list of (lower, upper) Ids.
+
+    The first range is open below and the last open above, so rows created during the
+    run with Ids past max_id are still picked up.
+    """
+    if not min_id or num_chunks <= 1:
+        return [(None, None)]
+    low, high = id_to_int(min_id), id_to_int(max_id)
+    prefix = min_id[:3]
+    step = (high - low) / num_chunks
+    edges = sorted({int_to_id(prefix, int(low + step * i)) for i in range(1, num_chunks)})
+    edges = [e for e in edges if min_id[:15] < e <= max_id[:15]]
+    bounds = [None] + edges + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def chunk_where(lower, upper):
+    """SOQL filter for one Id range (lower inclusive, upper exclusive)."""
+    parts = []
+    if lower:
+        parts.append(f"Id >= '{lower}'")
+    if upper:
+        parts.append(f"Id < '{upper}'")
+    return " AND ".join(parts)
+
+def combine_where(*clauses):
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return " AND ".join(f"({c})" for c in clauses)
+
+def plan_object_chunks(sf, obj_name, chunk_size, where=None):
+    """Estimate the row count and split an object into Id ranges of about chunk_size rows."""
+    count = estimate_count(sf, obj_name, where)
+    num_chunks = min(MAX_CHUNKS, max(1, math.ceil(count / chunk_size))) if chunk_size else 1
+    if num_chunks == 1:
+        return count, [(None, None)]
+    min_id, max_id = get_id_bounds(sf, obj_name, where)
+    return count, plan_id_chunks(min_id, max_id, num_chunks)
+
+def open_chunked_stream(sf, mapping, bulk_threshold=DEFAULT_BULK_THRESHOLD, where=None,
+                        workers=DEFAULT_CHUNK_WORKERS, progress=None):
+    """Extract an object as parallel Id-range chunks merged into one record stream.
+
+    Returns (method, record iterator). progress, if given, is called from the consuming
+    thread as progress(chunk_states) where chunk_states is a list of
+    {'range': (lower, upper), 'rows': n, 'done': bool}.
+    """
+    obj_name = mapping['object']
+    count, chunks = plan_object_chunks(sf, obj_name, int(mapping['pk_chunk_size']), where)
+    if len(chunks) == 1:
+        return open_record_stream(sf, mapping, bulk_threshold, where)
+
+    # Decide REST vs Bulk once for the whole object rather than per chunk
+    method = mapping.get('extract_method', "Auto")
+    if method == "Auto":
+        method = "Bulk API 2.0" if count >= bulk_threshold else "REST"
+    logger.info("%s: ~%d rows in %d Id-range chunks via %s", obj_name, count, len(chunks), method)
+    chunk_mapping = {**mapping, 'extract_method': method}
+
+    return method, _iter_merged_chunks(sf, chunk_mapping, chunks, bulk_threshold, where, workers, progress)
+
+def _iter_merged_chunks(sf, mapping, chunks, bulk_threshold, where, workers, progress):
+    states = [{'range': chunk, 'rows': 0, 'done': False} for chunk in chunks]
+    handoff = queue.Queue(maxsize=max(2, workers * 2))
+    pending = queue.Queue()
+    for i in range(len(chunks)):
+        pending.put(i)
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            try:
+                i = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                chunk_filter = combine_where(where, chunk_where(*chunks[i]))
+                _, stream = open_record_stream(sf, mapping, bulk_threshold, chunk_filter)
+                buf = []
+                for record in stream:
+                    buf.append(record)
+                    if len(buf) >= HANDOFF_SIZE:
+                        handoff.put((i, buf, None))
+                        buf = []
+                    if stop.is_set():
+                        return
+                handoff.put((i, buf, None))
+                handoff.put((i, None, None))
+            except Exception as e:
+                handoff.put((i, None, e))
+                return
+
+    # Each worker runs in its own copy of the caller's context so its calls are attributed by ApiBudget.track
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(worker,), name=f"pk-chunk-{n}",
+                                daemon=True)
+               for n in range(min(workers, len(chunks)))]
+    for t in threads:
+        t.start()
+
+    try:
+        finished = 0
+        while finished < len(chunks):
+            i, records, error = handoff.get()
+            if error is not None:
+                raise error
+            if records is None:
+                states[i]['done'] = True
+                finished += 1
+            else:
+                states[i]['rows'] += len(records)
+                yield from records
+            if progress:
+                progress(states)
+    finally:
+        stop.set()
+        # Unblock workers waiting on a full queue so they can observe the stop flag
+        while any(t.is_alive() for t in threads):
+            try:
+                handoff.get(timeout=0.1)
+            except queue.Empty:
+                pass
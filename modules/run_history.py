@@ -0,0 +1,220 @@
+import uuid
+from datetime import datetime, timezone
+from .db import placeholder
+
+# Run history lives in the target database next to the other ETL state (see state_store)
+RUNS_TABLE = "etl_runs"
+RUN_OBJECTS_TABLE = "etl_run_objects"
+# Sampled hotspots of profiled runs (run_etl.py / worker.py --profile)
+RUN_PROFILES_TABLE = "etl_run_profiles"
+# Rows per Id-range chunk of PK-chunked extracts
+RUN_CHUNKS_TABLE = "etl_run_chunks"
+
+# Per-object metrics stored for every run, in column order
+OBJECT_METRICS = (
+    'extracted', 'transformed', 'loaded', 'rejected', 'deleted', 'batches', 'api_calls', 'bytes',
+    'extract_seconds', 'transform_seconds', 'load_seconds', 'seconds',
+)
+_FLOAT_METRICS = {'extract_seconds', 'transform_seconds', 'load_seconds', 'seconds'}
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def ensure_history_tables(conn):
+    """Create the run history tables if they do not exist."""
+    metric_columns = ",\n".join(
+        f"                {m} {'DOUBLE' if m in _FLOAT_METRICS else 'BIGINT'} NOT NULL DEFAULT 0"
+        for m in OBJECT_METRICS
+    )
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+                run_id CHAR(32) NOT NULL PRIMARY KEY,
+                source VARCHAR(64) NOT NULL,
+                started_at VARCHAR(32) NOT NULL,
+                finished_at VARCHAR(32),
+                status VARCHAR(16) NOT NULL,
+                objects INT NOT NULL DEFAULT 0,
+                api_calls BIGINT NOT NULL DEFAULT 0,
+                bytes BIGINT NOT NULL DEFAULT 0,
+                seconds DOUBLE NOT NULL DEFAULT 0
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {RUN_OBJECTS_TABLE} (
+                run_id CHAR(32) NOT NULL,
+                object_name VARCHAR(255) NOT NULL,
+                finished_at VARCHAR(32) NOT NULL,
+                target_table VARCHAR(255),
+                strategy VARCHAR(32),
+                extract_method VARCHAR(32),
+                mode VARCHAR(16),
+                status VARCHAR(16) NOT NULL,
+                error TEXT,
+{metric_columns},
+                PRIMARY KEY (run_id, object_name)
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {RUN_PROFILES_TABLE} (
+                run_id CHAR(32) NOT NULL,
+                stage VARCHAR(16) NOT NULL,
+                rank_no INT NOT NULL,
+                function_name VARCHAR(512) NOT NULL,
+                own_seconds DOUBLE NOT NULL,
+                total_seconds DOUBLE NOT NULL,
+                own_pct DOUBLE NOT NULL,
+                PRIMARY KEY (run_id, stage, rank_no)
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {RUN_CHUNKS_TABLE} (
+                run_id CHAR(32) NOT NULL,
+                object_name VARCHAR(255) NOT NULL,
+                chunk_no INT NOT NULL,
+                id_from VARCHAR(18),
+                id_to VARCHAR(18),
+                rows_extracted BIGINT NOT NULL DEFAULT 0,
+                done INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, object_name, chunk_no)
+            )
+        """)
+        conn.commit()
+    finally:
+        cur.close()
+
+def start_run(conn, source):
+    """Record the start of a run and return its run_id."""
+    run_id = uuid.uuid4().hex
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"INSERT INTO {RUNS_TABLE} (run_id, source, started_at, status) VALUES ({ph}, {ph}, {ph}, {ph})",
+                    (run_id, source, _now(), "running"))
+        conn.commit()
+    finally:
+        cur.close()
+    return run_id
+
+def record_object(conn, run_id, result):
+    """Store one per-object result dict from run_etl (successful or with 'error')."""
+    ph = placeholder(conn)
+    columns = ('run_id', 'object_name', 'finished_at', 'target_table', 'strategy', 'extract_method', 'mode',
+               'status', 'error') + OBJECT_METRICS
+    values = (run_id, result['object'], _now(), result.get('target_table'), result.get('strategy'),
+              result.get('extract_method'), result.get('mode'), "failed" if 'error' in result else "ok",
+              result.get('error')) + tuple(result.get(m) or 0 for m in OBJECT_METRICS)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"INSERT INTO {RUN_OBJECTS_TABLE} ({', '.join(columns)}) VALUES ({', '.join([ph] * len(columns))})",
+                    values)
+        conn.commit()
+    finally:
+        cur.close()
+
+def record_profile(conn, run_id, hotspots):
+    """Store StageProfiler.hotspots() of a run."""
+    ph = placeholder(conn)
+    rows = [
+        (run_id, stage, rank, spot['function'][:512], spot['own_seconds'], spot['total_seconds'], spot['own_pct'])
+        for stage, spots in hotspots.items()
+        for rank, spot in enumerate(spots, 1)
+    ]
+    if not rows:
+        return
+    cur = conn.cursor()
+    try:
+        cur.executemany(f"INSERT INTO {RUN_PROFILES_TABLE} (run_id, stage, rank_no, function_name, own_seconds, "
+                        f"total_seconds, own_pct) VALUES ({', '.join([ph] * 7)})", rows)
+        conn.commit()
+    finally:
+        cur.close()
+
+def record_chunks(conn, run_id, obj_name, chunks):
+    """Store the chunk states open_chunked_stream reported for one object of a run."""
+    ph = placeholder(conn)
+    rows = [(run_id, obj_name, n, c['range'][0], c['range'][1], c['rows'], int(c['done']))
+            for n, c in enumerate(chunks, 1)]
+    if not rows:
+        return
+    cur = conn.cursor()
+    try:
+        cur.executemany(f"INSERT INTO {RUN_CHUNKS_TABLE} (run_id, object_name, chunk_no, id_from, id_to, "
+                        f"rows_extracted, done) VALUES ({', '.join([ph] * 7)})", rows)
+        conn.commit()
+    finally:
+        cur.close()
+
+def finish_run(conn, run_id, results, api_calls, bytes_read, seconds):
+    """Close a run with its totals."""
+    ph = placeholder(conn)
+    status = "failed" if any('error' in r for r in results) else "ok"
+    cur = conn.cursor()
+    try:
+        cur.execute(f"UPDATE {RUNS_TABLE} SET finished_at = {ph}, status = {ph}, objects = {ph}, api_calls = {ph}, "
+                    f"bytes = {ph}, seconds = {ph} WHERE run_id = {ph}",
+                    (_now(), status, len(results), api_calls, bytes_read, round(seconds, 3), run_id))
+        conn.commit()
+    finally:
+        cur.close()
+
+def load_runs(conn, since, limit=500):
+    """Runs started at or after since ('YYYY-MM-DD HH:MM:SS'), newest first, as dicts."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT run_id, source, started_at, finished_at, status, objects, api_calls, bytes, seconds "
+                    f"FROM {RUNS_TABLE} WHERE started_at >= {ph} ORDER BY started_at DESC LIMIT {int(limit)}",
+                    (since,))
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+def load_object_history(conn, since):
+    """Per-object run metrics finished at or after since, oldest first, as dicts."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT run_id, object_name, finished_at, target_table, strategy, extract_method, mode, "
+                    f"status, error, {', '.join(OBJECT_METRICS)} FROM {RUN_OBJECTS_TABLE} "
+                    f"WHERE finished_at >= {ph} ORDER BY finished_at", (since,))
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+def load_profiles(conn, run_ids):
+    """Hotspots of the given runs: {run_id: {stage: [{'function', 'own_seconds', 'total_seconds', 'own_pct'}]}}."""
+    if not run_ids:
+        return {}
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT run_id, stage, function_name, own_seconds, total_seconds, own_pct "
+                    f"FROM {RUN_PROFILES_TABLE} WHERE run_id IN ({', '.join([ph] * len(run_ids))}) "
+                    f"ORDER BY run_id, stage, rank_no", list(run_ids))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    profiles = {}
+    for run_id, stage, function, own_seconds, total_seconds, own_pct in rows:
+        profiles.setdefault(run_id, {}).setdefault(stage, []).append(
+            {'function': function, 'own_seconds': own_seconds, 'total_seconds': total_seconds, 'own_pct': own_pct})
+    return profiles
+
+def load_chunks(conn, run_ids):
+    """Per-chunk rows of the given runs, as dicts ordered by run, object and chunk."""
+    if not run_ids:
+        return []
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT run_id, object_name, chunk_no, id_from, id_to, rows_extracted, done "
+                    f"FROM {RUN_CHUNKS_TABLE} WHERE run_id IN ({', '.join([ph] * len(run_ids))}) "
+                    f"ORDER BY run_id, object_name, chunk_no", list(run_ids))
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+    finally:
+        cur.close()
@@ -0,0 +1,183 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from .db import get_pool
+from .run_history import ensure_history_tables, load_runs, load_object_history, load_profiles, load_chunks
+from .dead_letters import ensure_dead_letter_table, dead_letter_summary, load_dead_letters, delete_dead_letters
+from .etl_runner import replay_dead_letters
+
+HISTORY_DAYS = [1, 7, 30, 90]
+DEAD_LETTER_PREVIEW = 200
+
+def load_history(days):
+    """(runs, per-object rows, profiles, chunks) of the last N days; None if the database is unreachable."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        with get_pool(st.session_state['mariadb_config']).connection() as conn:
+            ensure_history_tables(conn)
+            runs = load_runs(conn, since)
+            objects = load_object_history(conn, since)
+            profiles = load_profiles(conn, [r['run_id'] for r in runs])
+            chunks = load_chunks(conn, [r['run_id'] for r in runs])
+    except Exception as e:
+        st.warning(f"⚠️ Could not read run history from MariaDB: {e}")
+        return None
+    return pd.DataFrame(runs), pd.DataFrame(objects), profiles, pd.DataFrame(chunks)
+
+def render_hotspots(runs, profiles):
+    """Top sampled functions per stage of a profiled run."""
+    if not profiles:
+        st.caption("🔬 Profile a run with `python run_etl.py --profile` (or `worker.py --profile`) "
+                   "to see where each stage spends its time.")
+        return
+    started = dict(zip(runs['run_id'], runs['started_at']))
+    with st.expander(f"🔬 Profiled runs ({len(profiles)})"):
+        run_id = st.selectbox("Run", list(profiles), format_func=lambda r: f"{started.get(r, '')} · {r[:8]}")
+        stages = profiles[run_id]
+        for col, (stage, spots) in zip(st.columns(len(stages)), sorted(stages.items())):
+            with col:
+                st.write(f"**{stage}**")
+                st.dataframe(pd.DataFrame(spots).rename(columns={
+                    'function': "Function", 'own_seconds': "Own (s)", 'total_seconds': "Total (s)", 'own_pct': "Own %",
+                }), use_container_width=True, hide_index=True)
+
+def render_chunks(runs, chunks):
+    """Rows extracted per Id-range chunk of PK-chunked objects, to spot skewed chunks."""
+    if chunks.empty:
+        return
+    started = dict(zip(runs['run_id'], runs['started_at']))
+    keys = list(dict.fromkeys(zip(chunks['run_id'], chunks['object_name'])))
+    with st.expander(f"🧩 PK-chunked extracts ({len(keys)})"):
+        run_id, obj_name = st.selectbox("Object run", keys,
+                                        format_func=lambda k: f"{started.get(k[0], '')} · {k[1]} · {k[0][:8]}")
+        rows = chunks[(chunks['run_id'] == run_id) & (chunks['object_name'] == obj_name)]
+        st.bar_chart(rows.set_index('chunk_no')['rows_extracted'])
+        st.dataframe(rows.assign(
+            id_from=rows['id_from'].fillna("(start)"), id_to=rows['id_to'].fillna("(end)"),
+            done=rows['done'].map({1: "✅ Done", 0: "❌ Unfinished"}),
+        )[['chunk_no', 'id_from', 'id_to', 'rows_extracted', 'done']].rename(columns={
+            'chunk_no': "Chunk", 'id_from': "Id From", 'id_to': "Id To", 'rows_extracted': "Rows", 'done': "Status",
+        }), use_container_width=True, hide_index=True)
+
+def render_dead_letters():
+    """Rejected rows per object, with replay through the current configuration."""
+    st.subheader("Dead Letters")
+    st.caption("변환 규칙(Reject Row)이나 DB 제약 조건에 걸린 행은 배치를 멈추지 않고 `etl_dead_letters`에 "
+               "Salesforce Id와 사유가 기록됩니다. 설정을 고친 뒤 Replay하면 해당 Id를 다시 추출해 적재합니다.")
+    pool = get_pool(st.session_state['mariadb_config'])
+    try:
+        with pool.connection() as conn:
+            ensure_dead_letter_table(conn)
+            summary = dead_letter_summary(conn)
+    except Exception as e:
+        st.warning(f"⚠️ Could not read dead letters from MariaDB: {e}")
+        return
+    if not summary:
+        st.success("No rejected rows. 🎉")
+        return
+
+    st.dataframe(pd.DataFrame(summary).rename(columns={
+        'object': "Object", 'stage': "Stage", 'rows': "Rows", 'last_rejected': "Last Rejected (UTC)",
+    }), use_container_width=True, hide_index=True)
+    obj_name = st.selectbox("Object", sorted({row['object'] for row in summary}), key="dlq_object")
+    with pool.connection() as conn:
+        rows = load_dead_letters(conn, obj_name, limit=DEAD_LETTER_PREVIEW)
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    col_replay, col_discard, _ = st.columns([1, 1, 2])
+    with col_replay:
+        connected = st.session_state.get('is_connected') and st.session_state.get('sf_client') is not None
+        if st.button("🔁 Replay", type="primary", disabled=not connected, use_container_width=True,
+                     help=None if connected else "Login in the 'Connection' tab first."):
+            try:
+                with st.spinner(f"Replaying {obj_name} dead letters..."):
+                    with pool.connection() as conn:
+                        outcome = replay_dead_letters(st.session_state['sf_client'], conn,
+                                                      st.session_state['etl_config'], obj_name)
+                st.success(f"✅ {outcome['loaded']} loaded · {outcome['rejected']} still rejected · "
+                           f"{outcome['gone']} deleted in Salesforce")
+            except Exception as e:
+                st.error(f"❌ Replay failed: {e}")
+    with col_discard:
+        if st.button("🗑️ Discard", use_container_width=True):
+            with pool.connection() as conn:
+                delete_dead_letters(conn, obj_name)
+            st.rerun()
+
+def render_runs_tab():
+    render_run_history()
+    st.divider()
+    render_dead_letters()
+
+def render_run_history():
+    st.subheader("Run History")
+    st.caption("`run_etl.py`(cli)와 worker(schedule) 실행마다 객체별 추출·변환·적재 건수, API 호출, 단계별 소요 시간이 "
+               "`etl_runs` / `etl_run_objects` 테이블에 기록됩니다.")
+
+    col_days, col_obj = st.columns([1, 3])
+    with col_days:
+        days = st.selectbox("Period", HISTORY_DAYS, index=1, format_func=lambda d: f"Last {d} day(s)")
+    history = load_history(days)
+    if history is None:
+        return
+    runs, objects, profiles, chunks = history
+    if runs.empty:
+        st.info("No runs recorded in this period yet.")
+        return
+
+    with col_obj:
+        names = sorted(objects['object_name'].unique()) if not objects.empty else []
+        selected = st.multiselect("Objects", names, default=names)
+
+    st.write("**Recent Runs**")
+    st.dataframe(runs.rename(columns={
+        'run_id': "Run", 'source': "Source", 'started_at': "Started (UTC)", 'finished_at': "Finished (UTC)",
+        'status': "Status", 'objects': "Objects", 'api_calls': "API Calls", 'bytes': "Bytes", 'seconds': "Seconds",
+    }), use_container_width=True, hide_index=True)
+
+    render_hotspots(runs, profiles)
+    render_chunks(runs, chunks)
+
+    objects = objects[objects['object_name'].isin(selected)] if not objects.empty else objects
+    if objects.empty:
+        return
+    objects = objects.assign(finished_at=pd.to_datetime(objects['finished_at']))
+    ok = objects[objects['status'] == "ok"]
+
+    col_tp, col_dur = st.columns(2)
+    with col_tp:
+        st.write("**Throughput (rows loaded / s)**")
+        throughput = ok.assign(rows_per_second=ok['loaded'] / ok['seconds'].where(ok['seconds'] > 0))
+        st.line_chart(throughput.pivot_table(index='finished_at', columns='object_name',
+                                             values='rows_per_second', aggfunc='mean'))
+    with col_dur:
+        st.write("**Wall time per object run (s)**")
+        st.line_chart(ok.pivot_table(index='finished_at', columns='object_name', values='seconds', aggfunc='sum'))
+
+    stage_columns = {'extract_seconds': "extract", 'transform_seconds': "transform", 'load_seconds': "load"}
+    col_stage, col_busy = st.columns(2)
+    with col_stage:
+        st.write("**Average stage time per object (s)**")
+        st.bar_chart(ok.groupby('object_name')[list(stage_columns)].mean().rename(columns=stage_columns))
+    with col_busy:
+        st.write("**Stage utilization (% of wall time)**")
+        busy = ok[list(stage_columns)].div(ok['seconds'].where(ok['seconds'] > 0), axis=0).clip(upper=1) * 100
+        st.bar_chart(busy.assign(object_name=ok['object_name']).groupby('object_name').mean()
+                     .rename(columns=stage_columns))
+    st.caption("파이프라인 실행에서는 세 단계가 겹쳐 진행되므로 100%에 가까운 단계가 병목입니다 "
+               "(extract = Salesforce API, load = MariaDB).")
+
+    st.write("**Per-object totals**")
+    totals = objects.groupby('object_name').agg(
+        runs=('run_id', 'count'), failed=('status', lambda s: int((s != "ok").sum())),
+        extracted=('extracted', 'sum'), transformed=('transformed', 'sum'), loaded=('loaded', 'sum'),
+        rejected=('rejected', 'sum'), api_calls=('api_calls', 'sum'), bytes=('bytes', 'sum'),
+        avg_seconds=('seconds', 'mean'),
+    ).round({'avg_seconds': 2})
+    st.dataframe(totals, use_container_width=True)
+
+    failures = objects[objects['status'] != "ok"]
+    if not failures.empty:
+        with st.expander(f"❌ Failed object runs ({len(failures)})"):
+            st.dataframe(failures[['finished_at', 'object_name', 'run_id', 'error']],
+                         use_container_width=True, hide_index=True)
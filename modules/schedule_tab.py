@@ -1,44 +1,238 @@
 import streamlit as st
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from .config_manager import save_app_config
+from .db import get_pool
+from .scheduler import (
+    FREQUENCIES, OBJECT_FREQUENCIES, WEEKDAYS, DEFAULT_CRON, DEFAULT_INTERVAL_MINUTES, DEFAULT_MAX_DB_WRITERS,
+    DEFAULT_DAILY_API_BUDGET, JOB_ID, OBJECT_JOB_PREFIX, POLL_INTERVAL, USAGE_HISTORY_DAYS,
+    next_run_times, parse_ts, estimate_api_calls, plan_daily_usage, saved_schedules,
+)
+from .state_store import (
+    ensure_state_tables, get_schedule_state, get_api_usage, get_schedule_configs, save_schedule_configs,
+)
+
+DISPLAY_TZ = ZoneInfo("Asia/Seoul")
+
+def load_worker_state(job_ids):
+    """Bookkeeping written by the scheduler worker per job, plus API usage: (states, today's calls, averages).
+
+    Returns None if the database is unreachable or the worker has not created its tables yet.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        with get_pool(st.session_state['mariadb_config']).connection() as conn:
+            states = {job_id: get_schedule_state(conn, job_id) for job_id in job_ids}
+            today = get_api_usage(conn, now.strftime("%Y-%m-%d"))
+            history = get_api_usage(conn, (now - timedelta(days=USAGE_HISTORY_DAYS)).strftime("%Y-%m-%d"))
+    except Exception:
+        return None
+    return states, sum(calls for _, calls in today.values()), estimate_api_calls(history)
+
+def load_saved_schedules():
+    """Replace the session's schedules with the ones saved in the database, if it is reachable."""
+    try:
+        with get_pool(st.session_state['mariadb_config']).connection() as conn:
+            saved = get_schedule_configs(conn)
+    except Exception:
+        return
+    if JOB_ID in saved:
+        schedule_config = dict(saved[JOB_ID])
+        try:
+            schedule_config['run_time'] = datetime.strptime(schedule_config.get('run_time') or "", "%H:%M:%S").time()
+        except ValueError:
+            schedule_config.pop('run_time', None)
+        st.session_state['schedule_config'].update(schedule_config)
+    for mapping in st.session_state['etl_config'].get('mappings', []):
+        if OBJECT_JOB_PREFIX + mapping['object'] in saved:
+            mapping['schedule'] = saved[OBJECT_JOB_PREFIX + mapping['object']]
+
+def save_schedules():
+    """Store the global and per-object schedules in the database, where the worker reads them."""
+    config = {'schedule_config': st.session_state['schedule_config'], 'etl_config': st.session_state['etl_config']}
+    with get_pool(st.session_state['mariadb_config']).connection() as conn:
+        ensure_state_tables(conn)
+        save_schedule_configs(conn, saved_schedules(config))
+
+def render_object_schedule(mapping):
+    """Per-object schedule editor; 'Inherit' keeps the object on the global schedule."""
+    obj_name = mapping['object']
+    schedule = mapping.setdefault('schedule', {'frequency': "Inherit"})
+    freq = schedule.get('frequency', "Inherit")
+    col_freq, col_when, col_prio = st.columns([1, 1, 1])
+    with col_freq:
+        freq = st.selectbox("Frequency", OBJECT_FREQUENCIES, key=f"sch_freq_{obj_name}",
+                            index=OBJECT_FREQUENCIES.index(freq) if freq in OBJECT_FREQUENCIES else 0)
+        schedule['frequency'] = freq
+    if freq == "Inherit":
+        return
+    run_time = schedule.get('run_time') or "09:00:00"
+    run_time = datetime.strptime(run_time, "%H:%M:%S").time() if isinstance(run_time, str) else run_time
+    with col_when:
+        if freq == "Every N Minutes":
+            schedule['interval_minutes'] = int(st.number_input(
+                "Every (minutes)", min_value=1, max_value=1440, key=f"sch_int_{obj_name}",
+                value=int(schedule.get('interval_minutes') or DEFAULT_INTERVAL_MINUTES)))
+        elif freq == "Cron Expression":
+            schedule['cron'] = st.text_input("Cron (UTC)", value=schedule.get('cron', DEFAULT_CRON),
+                                             key=f"sch_cron_{obj_name}").strip()
+        elif freq == "Hourly":
+            minute = st.number_input("Minute past the hour", min_value=0, max_value=59,
+                                     value=run_time.minute, key=f"sch_min_{obj_name}")
+            schedule['run_time'] = run_time.replace(minute=int(minute)).strftime("%H:%M:%S")
+        else:
+            if freq == "Weekly":
+                day = schedule.get('day_of_week', "mon")
+                schedule['day_of_week'] = st.selectbox(
+                    "Day of Week", WEEKDAYS, index=WEEKDAYS.index(day) if day in WEEKDAYS else 0,
+                    format_func=str.capitalize, key=f"sch_dow_{obj_name}")
+            schedule['run_time'] = st.time_input("Run Time (UTC)", value=run_time,
+                                                 key=f"sch_time_{obj_name}").strftime("%H:%M:%S")
+    with col_prio:
+        schedule['priority'] = int(st.number_input(
+            "Priority", min_value=0, max_value=100, value=int(schedule.get('priority') or 0),
+            key=f"sch_prio_{obj_name}", help="API 예산/동시 적재 한도에 걸리면 높은 값부터 실행합니다."))
 
 def render_schedule_tab():
     if not st.session_state['is_connected']:
         st.warning("🔒 Please login in the 'Connection' tab to access schedule settings.")
     else:
         st.subheader("Job Scheduler")
-        
+        if not st.session_state.get('schedule_loaded'):
+            st.session_state['schedule_loaded'] = True
+            load_saved_schedules()
+        schedule_config = st.session_state['schedule_config']
+
         col_sch1, col_sch2 = st.columns([1, 2])
-        
+
         with col_sch1:
             st.write("Schedule Configuration")
-            st.session_state['schedule_config']['is_active'] = st.toggle(
-                "Activate Schedule", 
-                value=st.session_state['schedule_config']['is_active']
+            schedule_config['is_active'] = st.toggle(
+                "Activate Schedule",
+                value=schedule_config['is_active']
             )
-            
+
+            current_freq = schedule_config.get('frequency', "Daily")
             freq = st.selectbox(
-                "Frequency", 
-                ["Daily", "Hourly", "Weekly", "Cron Expression"],
-                index=0
+                "Frequency",
+                FREQUENCIES,
+                index=FREQUENCIES.index(current_freq) if current_freq in FREQUENCIES else 0
             )
-            st.session_state['schedule_config']['frequency'] = freq
-            
-            if freq == "Daily":
-                run_time = st.time_input("Run Time (UTC)", value=st.session_state['schedule_config']['run_time'])
-                st.session_state['schedule_config']['run_time'] = run_time
+            schedule_config['frequency'] = freq
+
+            if freq in ("Daily", "Weekly"):
+                if freq == "Weekly":
+                    day = schedule_config.get('day_of_week', "mon")
+                    schedule_config['day_of_week'] = st.selectbox(
+                        "Day of Week", WEEKDAYS, index=WEEKDAYS.index(day) if day in WEEKDAYS else 0,
+                        format_func=str.capitalize
+                    )
+                run_time = st.time_input("Run Time (UTC)", value=schedule_config['run_time'])
+                schedule_config['run_time'] = run_time
+            elif freq == "Hourly":
+                minute = st.number_input("Minute past the hour", min_value=0, max_value=59,
+                                         value=schedule_config['run_time'].minute)
+                schedule_config['run_time'] = schedule_config['run_time'].replace(minute=int(minute))
             elif freq == "Cron Expression":
-                st.text_input("Cron Expression", value="0 9 * * *")
-            
-            if st.button("💾 Save Schedule", type="primary"):
-                save_app_config()
-                st.success("Schedule saved!")
-                
+                schedule_config['cron'] = st.text_input(
+                    "Cron Expression", value=schedule_config.get('cron', DEFAULT_CRON),
+                    help="minute hour day month day_of_week (UTC)"
+                ).strip()
+
+            schedule_config['daily_api_budget'] = int(st.number_input(
+                "Daily Salesforce API Budget", min_value=0, step=1000,
+                value=int(schedule_config.get('daily_api_budget') or DEFAULT_DAILY_API_BUDGET),
+                help="스케줄 실행이 하루(UTC)에 사용할 API 호출 한도입니다. 0이면 제한하지 않습니다."
+            ))
+            schedule_config['max_db_writers'] = int(st.number_input(
+                "Max Concurrent DB Writers", min_value=1, max_value=8,
+                value=int(schedule_config.get('max_db_writers') or DEFAULT_MAX_DB_WRITERS),
+                help="MariaDB에 동시에 적재하는 스케줄 실행 수의 상한입니다."
+            ))
+
+            try:
+                upcoming = next_run_times(schedule_config, count=3)
+                schedule_error = None
+            except ValueError as e:
+                upcoming, schedule_error = [], str(e)
+            if schedule_error:
+                st.error(f"❌ Invalid schedule: {schedule_error}")
+
+            if st.button("💾 Save Schedule", type="primary", disabled=schedule_error is not None):
+                try:
+                    save_schedules()
+                except Exception as e:
+                    st.error(f"Failed to save the schedule to the database: {e}")
+                else:
+                    save_app_config()
+                    st.success("Schedule saved! The worker picks it up within "
+                               f"{POLL_INTERVAL}s.")
+
+        mappings = st.session_state['etl_config'].get('mappings', [])
+        job_ids = [JOB_ID] + [OBJECT_JOB_PREFIX + m['object'] for m in mappings]
+        worker_state = load_worker_state(job_ids)
+
         with col_sch2:
+            if upcoming:
+                next_runs = "\n".join(
+                    f"  - {t.strftime('%Y-%m-%d %H:%M')} UTC ({t.astimezone(DISPLAY_TZ).strftime('%m-%d %H:%M')} KST)"
+                    for t in upcoming
+                )
+            else:
+                next_runs = "  - -"
             st.info(f"""
             **Current Schedule Status:**
-            - Active: {'✅ Yes' if st.session_state['schedule_config']['is_active'] else '❌ No'}
-            - Frequency: {st.session_state['schedule_config']['frequency']}
-            - Next Run: (Calculated based on timezone)
+            - Active: {'✅ Yes' if schedule_config['is_active'] else '❌ No'}
+            - Frequency: {schedule_config['frequency']}
+            - Next Runs:
+{next_runs}
             """)
-            
-            st.warning("Heroku Free/Eco Dynos sleep after 30 mins of inactivity. For reliable scheduling, use 'Heroku Scheduler' add-on or a dedicated worker dyno.")
+
+            if not worker_state:
+                st.caption("🛰️ Worker has not reported yet. Start it with `python worker.py` (Procfile `worker`).")
+            else:
+                states = worker_state[0]
+                beats = [parse_ts(state.get('heartbeat_at')) for state in states.values() if state.get('heartbeat_at')]
+                age = (datetime.now(timezone.utc) - max(beats)).total_seconds() if beats else None
+                alive = age is not None and age <= POLL_INTERVAL * 3
+                st.write(f"**Worker:** {'🟢 running' if alive else '🔴 not seen'}"
+                         f"{f' (heartbeat {int(age)}s ago)' if age is not None else ''}")
+                for job_id, state in states.items():
+                    if state:
+                        st.caption(
+                            f"`{job_id}` next run: {state.get('next_run') or '-'} UTC · "
+                            f"Last run: {state.get('last_started') or '-'} → {state.get('last_finished') or '-'} · "
+                            f"Status: {state.get('last_status') or '-'}"
+                        )
+
+            st.warning("Heroku Free/Eco Dynos sleep after 30 mins of inactivity. Scale the `worker` process "
+                       "(`heroku ps:scale worker=1`); runs missed while it was down are coalesced into one catch-up run.")
+
+        st.divider()
+        st.subheader("Per-Object Schedules")
+        st.caption("객체별로 주기/우선순위를 지정합니다. 같은 객체의 실행은 겹치지 않습니다. 'Inherit' 객체는 위의 전체 스케줄로 함께 실행됩니다.")
+        for mapping in mappings:
+            own_schedule = mapping.get('schedule', {}).get('frequency', "Inherit") != "Inherit"
+            with st.expander(f"📦 {mapping['object']}", expanded=own_schedule):
+                render_object_schedule(mapping)
+
+        # Projected API usage of the next 24h against the daily budget
+        averages = worker_state[2] if worker_state else {}
+        config = {'schedule_config': {**schedule_config, 'is_active': True},
+                  'etl_config': st.session_state['etl_config']}
+        usage = plan_daily_usage(config, averages)
+        if usage:
+            st.write("**Projected API usage (next 24h)**")
+            st.dataframe([
+                {'Job': job_id, 'Runs': runs, 'Calls / Run': round(per_run, 1), 'Calls': int(total)}
+                for job_id, (runs, per_run, total) in usage.items()
+            ], use_container_width=True, hide_index=True)
+            projected = int(sum(total for _, _, total in usage.values()))
+            budget = schedule_config.get('daily_api_budget') or 0
+            used_today = worker_state[1] if worker_state else 0
+            if budget and projected > budget:
+                st.warning(f"⚠️ Projected {projected:,} calls exceed the daily budget of {budget:,}; "
+                           "lower-priority runs will be deferred to the next day.")
+            else:
+                st.caption(f"Projected {projected:,} calls/day · used today {used_today:,}"
+                           f"{f' of {budget:,}' if budget else ''}")
@@ -0,0 +1,363 @@
+import json
+import logging
+import threading
+from datetime import datetime, time, timedelta, timezone
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from .api_budget import ApiBudget, DEFAULT_API_CONCURRENCY
+from .db import named_lock
+from .state_store import (
+    ensure_state_tables, get_schedule_state, save_schedule_state, record_api_usage, get_api_usage,
+    get_schedule_configs, get_etl_config,
+)
+
+logger = logging.getLogger(__name__)
+
+# Job of the global schedule_config; objects with their own schedule run as "object:<name>"
+JOB_ID = "etl"
+OBJECT_JOB_PREFIX = "object:"
+# Database-wide lock: a scheduled run is skipped while another run (any process) holds it
+RUN_LOCK = "sf_etl_run"
+# Seconds between schedule re-reads / heartbeats of the worker
+POLL_INTERVAL = 30
+FREQUENCIES = ["Daily", "Hourly", "Weekly", "Cron Expression"]
+# Per-object schedules may also follow the global schedule or run every N minutes
+OBJECT_FREQUENCIES = ["Inherit", "Every N Minutes"] + FREQUENCIES
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+DEFAULT_CRON = "0 9 * * *"
+DEFAULT_INTERVAL_MINUTES = 15
+# Concurrent object runs writing to MariaDB, and daily Salesforce API calls (0 = unlimited)
+DEFAULT_MAX_DB_WRITERS = 2
+DEFAULT_DAILY_API_BUDGET = 0
+# API calls assumed per run of a job that has no usage history yet
+DEFAULT_RUN_API_CALLS = 10
+USAGE_HISTORY_DAYS = 7
+# Upper bound on fire times scanned when looking for missed runs (e.g. a per-minute cron after a long outage)
+MAX_MISSED_SCAN = 100000
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Interval schedules are aligned to this instant so their fire times do not depend on when the worker started
+INTERVAL_ANCHOR = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+def _run_time(value):
+    if isinstance(value, time):
+        return value
+    try:
+        return datetime.strptime(value or "09:00:00", "%H:%M:%S").time()
+    except ValueError:
+        return time(9, 0)
+
+def build_trigger(schedule_config):
+    """APScheduler trigger (UTC) for a schedule_config. Raises ValueError for a bad cron expression."""
+    freq = schedule_config.get('frequency', "Daily")
+    run_time = _run_time(schedule_config.get('run_time'))
+    if freq == "Every N Minutes":
+        minutes = int(schedule_config.get('interval_minutes') or DEFAULT_INTERVAL_MINUTES)
+        if minutes < 1:
+            raise ValueError("interval must be at least 1 minute")
+        return IntervalTrigger(minutes=minutes, start_date=INTERVAL_ANCHOR, timezone=timezone.utc)
+    if freq == "Hourly":
+        return CronTrigger(minute=run_time.minute, timezone=timezone.utc)
+    if freq == "Weekly":
+        return CronTrigger(day_of_week=schedule_config.get('day_of_week', "mon"),
+                           hour=run_time.hour, minute=run_time.minute, timezone=timezone.utc)
+    if freq == "Cron Expression":
+        return CronTrigger.from_crontab(schedule_config.get('cron') or DEFAULT_CRON, timezone=timezone.utc)
+    return CronTrigger(hour=run_time.hour, minute=run_time.minute, timezone=timezone.utc)
+
+def next_run_times(schedule_config, count=3, now=None):
+    """The next count fire times (UTC datetimes) of a schedule."""
+    trigger = build_trigger(schedule_config)
+    now = now or datetime.now(timezone.utc)
+    times, previous = [], None
+    while len(times) < count:
+        fire = trigger.get_next_fire_time(previous, previous + timedelta(microseconds=1) if previous else now)
+        if fire is None:
+            break
+        times.append(fire)
+        previous = fire
+    return times
+
+def runs_per_day(schedule_config, now=None):
+    """Number of times a schedule fires in the next 24 hours."""
+    now = now or datetime.now(timezone.utc)
+    trigger = build_trigger(schedule_config)
+    count, fire = 0, trigger.get_next_fire_time(None, now)
+    while fire is not None and fire < now + timedelta(days=1) and count < MAX_MISSED_SCAN:
+        count += 1
+        fire = trigger.get_next_fire_time(fire, fire + timedelta(microseconds=1))
+    return count
+
+def missed_fire_time(schedule_config, since, now=None):
+    """Latest fire time after since and up to now, or None. All missed runs coalesce into this one."""
+    trigger = build_trigger(schedule_config)
+    now = now or datetime.now(timezone.utc)
+    latest = None
+    fire = trigger.get_next_fire_time(None, since + timedelta(microseconds=1))
+    for _ in range(MAX_MISSED_SCAN):
+        if fire is None or fire > now:
+            break
+        latest = fire
+        fire = trigger.get_next_fire_time(fire, fire + timedelta(microseconds=1))
+    return latest
+
+def format_ts(dt):
+    return dt.astimezone(timezone.utc).strftime(TS_FORMAT) if dt else None
+
+def parse_ts(value):
+    return datetime.strptime(value, TS_FORMAT).replace(tzinfo=timezone.utc) if value else None
+
+def saved_schedules(config):
+    """{job_id: schedule} of a config's global and per-object schedules, as stored in etl_schedule_config."""
+    schedule_config = dict(config.get('schedule_config', {}))
+    if hasattr(schedule_config.get('run_time'), 'strftime'):
+        schedule_config['run_time'] = schedule_config['run_time'].strftime("%H:%M:%S")
+    schedules = {JOB_ID: schedule_config}
+    for mapping in config.get('etl_config', {}).get('mappings', []):
+        schedules[OBJECT_JOB_PREFIX + mapping['object']] = mapping.get('schedule') or {'frequency': "Inherit"}
+    return schedules
+
+def apply_saved_schedules(config, saved):
+    """Copy of config with the schedules saved in the database in place of its own (see saved_schedules)."""
+    etl_config = config.get('etl_config', {})
+    mappings = [{**m, 'schedule': saved[OBJECT_JOB_PREFIX + m['object']]}
+                if OBJECT_JOB_PREFIX + m['object'] in saved else m
+                for m in etl_config.get('mappings', [])]
+    return {**config, 'schedule_config': saved.get(JOB_ID, config.get('schedule_config', {})),
+            'etl_config': {**etl_config, 'mappings': mappings}}
+
+def schedule_jobs(config):
+    """Jobs the worker schedules: {job_id: {'schedule', 'objects', 'priority'}}.
+
+    Mappings with their own schedule (frequency other than 'Inherit') get a job each; the others
+    run together on the global schedule_config. Nothing is scheduled while the schedule is inactive.
+    """
+    schedule_config = config.get('schedule_config', {})
+    if not schedule_config.get('is_active'):
+        return {}
+    jobs, inherited = {}, []
+    for mapping in config.get('etl_config', {}).get('mappings', []):
+        own = mapping.get('schedule') or {}
+        if own.get('frequency', "Inherit") == "Inherit":
+            inherited.append(mapping['object'])
+            continue
+        jobs[OBJECT_JOB_PREFIX + mapping['object']] = {
+            'schedule': own,
+            'objects': [mapping['object']],
+            'priority': int(own.get('priority') or 0),
+        }
+    if inherited:
+        jobs[JOB_ID] = {
+            'schedule': schedule_config,
+            'objects': inherited if jobs else None,
+            'priority': int(schedule_config.get('priority') or 0),
+        }
+    return jobs
+
+def estimate_api_calls(usage):
+    """Average API calls per run of each job from {job_id: (runs, api_calls)} usage history."""
+    return {job_id: calls / runs for job_id, (runs, calls) in usage.items() if runs}
+
+def plan_daily_usage(config, averages):
+    """Projected Salesforce API calls per job over the next 24h: {job_id: (runs, calls per run, total)}."""
+    plan = {}
+    for job_id, job in schedule_jobs(config).items():
+        try:
+            runs = runs_per_day(job['schedule'])
+        except ValueError:
+            continue
+        per_run = averages.get(job_id, DEFAULT_RUN_API_CALLS)
+        plan[job_id] = (runs, per_run, runs * per_run)
+    return plan
+
+class ScheduleWorker:
+    """Runs the ETL on the schedules saved in the database, in its own process (see worker.py).
+
+    run_fn(config, conn, pool, objects, budget) performs one ETL run. Fired jobs queue up
+    (one pending run per job) and are dispatched by priority while the number of runs writing
+    to MariaDB stays under max_db_writers and the day's Salesforce API calls plus the job's
+    expected calls fit into daily_api_budget. Runs held back by the budget wait for the next UTC
+    day. The etl_config and schedules saved from the app (etl_saved_config, etl_schedule_config)
+    are re-read every poll_interval seconds; config_path supplies the credentials, and its own
+    etl_config and schedules apply only until the app has saved them to the database. A job never
+    runs twice at once (checkpoints, watermarks and OVERWRITE shadow tables are kept per
+    object): overlapping runs are skipped via a database lock per job, and runs missed while
+    the worker was asleep or down are coalesced into a single catch-up run.
+    """
+
+    def __init__(self, config_path, pool, run_fn, poll_interval=POLL_INTERVAL):
+        self.config_path = config_path
+        self.pool = pool
+        self.run_fn = run_fn
+        self.poll_interval = poll_interval
+        self.scheduler = BlockingScheduler(timezone=timezone.utc, job_defaults={
+            'coalesce': True,            # several missed fire times -> one run
+            'max_instances': 1,
+            'misfire_grace_time': None,  # run late rather than drop a fire time missed during a sleep
+        })
+        self._config = {}
+        self._jobs = {}
+        self._signature = None
+        self._caught_up = False
+        self._lock = threading.Lock()
+        self._pending = {}   # job_id -> scheduled_for
+        self._running = {}   # job_id -> number of runs in progress
+        self._deferred = set()
+        self._warned_local_config = False
+
+    def _read_config(self, conn):
+        with open(self.config_path, 'r') as f:
+            config = json.load(f)
+        etl_config = get_etl_config(conn)
+        if etl_config is None:
+            if not self._warned_local_config:
+                self._warned_local_config = True
+                logger.warning("No etl_config saved in the database yet; running the mappings in %s. "
+                               "Save the settings once from the app so the worker follows them.", self.config_path)
+        else:
+            config = {**config, 'etl_config': etl_config}
+        return apply_saved_schedules(config, get_schedule_configs(conn))
+
+    def _limits(self):
+        schedule_config = self._config.get('schedule_config', {})
+        return (max(1, int(schedule_config.get('max_db_writers') or DEFAULT_MAX_DB_WRITERS)),
+                int(schedule_config.get('daily_api_budget') or DEFAULT_DAILY_API_BUDGET))
+
+    def sync(self):
+        """Pick up schedule changes from the database, catch up on missed runs and write heartbeats."""
+        try:
+            with self.pool.connection() as conn:
+                config = self._read_config(conn)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read the schedule (%s): %s", self.config_path, e)
+            return
+        jobs = schedule_jobs(config)
+        signature = json.dumps([config.get('schedule_config', {}), jobs], sort_keys=True, default=str)
+        with self._lock:
+            self._config = config
+        if signature != self._signature:
+            self._signature = signature
+            self._reschedule(jobs)
+
+        now = datetime.now(timezone.utc)
+        with self.pool.connection() as conn:
+            states = {job_id: get_schedule_state(conn, job_id) for job_id in jobs}
+            for job_id in jobs:
+                scheduled = self.scheduler.get_job(job_id)
+                save_schedule_state(conn, job_id, heartbeat_at=format_ts(now),
+                                    next_run=format_ts(getattr(scheduled, 'next_run_time', None)))
+        if not self._caught_up:
+            # Only on startup; pausing and re-activating the schedule does not backfill
+            self._caught_up = True
+            for job_id, job in jobs.items():
+                since = parse_ts(states[job_id].get('last_started'))
+                try:
+                    missed = missed_fire_time(job['schedule'], since) if since else None
+                except ValueError:
+                    missed = None
+                if missed:
+                    logger.info("%s missed its run at %s UTC; queueing it now", job_id, format_ts(missed))
+                    self.request(job_id, missed)
+        self.dispatch()
+
+    def _reschedule(self, jobs):
+        for scheduled in self.scheduler.get_jobs():
+            if scheduled.id != "sync":
+                scheduled.remove()
+        with self._lock:
+            self._jobs = jobs
+            self._pending = {job_id: at for job_id, at in self._pending.items() if job_id in jobs}
+        if not jobs:
+            logger.info("Schedule is inactive")
+        for job_id, job in jobs.items():
+            try:
+                trigger = build_trigger(job['schedule'])
+            except ValueError as e:
+                logger.error("Invalid schedule for %s: %s", job_id, e)
+                continue
+            self.scheduler.add_job(self.request, trigger, args=[job_id], id=job_id)
+            logger.info("Scheduled %s (%s, priority %s)", job_id,
+                        job['schedule'].get('frequency'), job['priority'])
+
+    def request(self, job_id, scheduled_for=None):
+        """Queue a run of a job (coalesced with one already pending) and dispatch what fits."""
+        with self._lock:
+            if job_id in self._jobs:
+                self._pending.setdefault(job_id, scheduled_for or datetime.now(timezone.utc))
+        self.dispatch()
+
+    def dispatch(self):
+        """Start pending runs by priority while the write-concurrency cap and API budget allow."""
+        max_writers, daily_budget = self._limits()
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        used, averages = 0, {}
+        if daily_budget:
+            with self.pool.connection() as conn:
+                used = sum(calls for _, calls in get_api_usage(conn, today).values())
+                since = (datetime.now(timezone.utc) - timedelta(days=USAGE_HISTORY_DAYS)).strftime("%Y-%m-%d")
+                averages = estimate_api_calls(get_api_usage(conn, since))
+        started = []
+        with self._lock:
+            order = sorted(self._pending, key=lambda j: (-self._jobs[j]['priority'], self._pending[j]))
+            for job_id in order:
+                job = self._jobs[job_id]
+                if sum(self._running.values()) >= max_writers:
+                    break
+                if self._running.get(job_id):
+                    continue
+                expected = averages.get(job_id, DEFAULT_RUN_API_CALLS)
+                if daily_budget and used + expected > daily_budget:
+                    if job_id not in self._deferred:
+                        logger.warning("Deferring %s: %d of %d API calls used today, run needs ~%d",
+                                       job_id, used, daily_budget, expected)
+                        self._deferred.add(job_id)
+                    continue
+                used += expected
+                self._deferred.discard(job_id)
+                self._running[job_id] = self._running.get(job_id, 0) + 1
+                started.append((job_id, self._pending.pop(job_id)))
+        for job_id, scheduled_for in started:
+            threading.Thread(target=self.run, args=(job_id, scheduled_for), name=f"etl-{job_id}").start()
+
+    def run(self, job_id, scheduled_for=None):
+        """One run of a job, skipped if another process still runs it."""
+        started = datetime.now(timezone.utc)
+        scheduled_for = scheduled_for or started
+        with self._lock:
+            config, job = self._config, self._jobs.get(job_id)
+        try:
+            if job is None:
+                return
+            with self.pool.connection() as conn, named_lock(conn, f"{RUN_LOCK}:{job_id}") as acquired:
+                if not acquired:
+                    logger.warning("Skipping %s scheduled for %s UTC: previous run still in progress",
+                                   job_id, format_ts(scheduled_for))
+                    save_schedule_state(conn, job_id, last_status="skipped: previous run still in progress")
+                    return
+                save_schedule_state(conn, job_id, last_scheduled=format_ts(scheduled_for),
+                                    last_started=format_ts(started), last_status="running")
+                etl_config = config.get('etl_config', {})
+                budget = ApiBudget(etl_config.get('api_concurrency') or DEFAULT_API_CONCURRENCY,
+                                   etl_config.get('api_calls_per_second'))
+                try:
+                    results = self.run_fn(config, conn, self.pool, job['objects'], budget)
+                    failed = [r['object'] for r in results if 'error' in r]
+                    status = f"failed: {', '.join(failed)}" if failed else f"ok ({len(results)} objects)"
+                except Exception as e:
+                    logger.exception("Scheduled run of %s failed", job_id)
+                    status = f"failed: {e}"
+                record_api_usage(conn, job_id, budget.calls)
+                save_schedule_state(conn, job_id, last_finished=format_ts(datetime.now(timezone.utc)),
+                                    last_status=status[:255])
+        finally:
+            with self._lock:
+                self._running[job_id] = self._running.get(job_id, 1) - 1
+            self.dispatch()
+
+    def start(self):
+        """Block, running the schedules until the process is stopped."""
+        with self.pool.connection() as conn:
+            ensure_state_tables(conn)
+        self.scheduler.add_job(self.sync, 'interval', seconds=self.poll_interval, id="sync",
+                               next_run_time=datetime.now(timezone.utc))
+        self.scheduler.start()
@@ -0,0 +1,132 @@
+import threading
+import time
+from .db import is_sqlite, quote_ident
+
+# Seconds a catalog snapshot is reused before information_schema is read again
+CATALOG_TTL = 300
+# ETL bookkeeping and transient OVERWRITE/MERGE tables are not mapping targets
+INTERNAL_TABLES = {"etl_watermarks", "etl_schedule_state", "etl_schedule_config", "etl_saved_config",
+                   "etl_api_usage", "etl_checkpoints", "etl_batch_sizes", "etl_runs", "etl_run_objects",
+                   "etl_run_profiles", "etl_run_chunks", "etl_dead_letters"}
+INTERNAL_SUFFIXES = ("__new", "__old", "__stage")
+
+NUMERIC_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint", "decimal", "numeric",
+                 "float", "double", "real", "bit", "year"}
+TEMPORAL_TYPES = {"date", "datetime", "timestamp", "time"}
+
+# Snapshots keyed by catalog_key(): {'loaded_at': monotonic, 'tables': {table: [column, ...]}}
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def config_key(config):
+    """Catalog key of a mariadb_config dict."""
+    return f"mariadb://{config.get('host')}:{int(config.get('port', 3306))}/{config.get('database')}"
+
+def catalog_key(conn):
+    """Catalog key of an open connection (same format as config_key for MariaDB)."""
+    if is_sqlite(conn):
+        cur = conn.cursor()
+        try:
+            cur.execute("PRAGMA database_list")
+            path = next((row[2] for row in cur.fetchall() if row[1] == "main"), "")
+        finally:
+            cur.close()
+        return f"sqlite://{path or ':memory:' + str(id(conn))}"
+    db = conn.db.decode() if isinstance(conn.db, bytes) else conn.db
+    return f"mariadb://{conn.host}:{int(conn.port)}/{db}"
+
+def column_kind(data_type):
+    """Classify a column's DATA_TYPE as 'number', 'temporal' or 'text' (drives value encoding)."""
+    base = (data_type or "").lower().split("(")[0].strip()
+    if base in NUMERIC_TYPES:
+        return "number"
+    if base in TEMPORAL_TYPES:
+        return "temporal"
+    return "text"
+
+def _is_internal(table):
+    return table in INTERNAL_TABLES or table.endswith(INTERNAL_SUFFIXES)
+
+def read_catalog(conn):
+    """Read every table's columns (name, type, nullability, key) from the live database."""
+    tables = {}
+    cur = conn.cursor()
+    try:
+        if is_sqlite(conn):
+            cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+            for (table,) in cur.fetchall():
+                cur.execute(f"PRAGMA table_info({quote_ident(table)})")
+                # table_info rows: cid, name, type, notnull, dflt_value, pk
+                tables[table] = [{
+                    'name': row[1],
+                    'column_type': row[2] or "",
+                    'data_type': (row[2] or "").lower().split("(")[0].strip(),
+                    'nullable': not row[3],
+                    'key': "PRI" if row[5] else "",
+                } for row in cur.fetchall()]
+        else:
+            cur.execute(
+                "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, DATA_TYPE, IS_NULLABLE, COLUMN_KEY "
+                "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+                "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+            )
+            for table, name, column_type, data_type, nullable, key in cur.fetchall():
+                tables.setdefault(table, []).append({
+                    'name': name,
+                    'column_type': column_type,
+                    'data_type': data_type.lower(),
+                    'nullable': nullable == "YES",
+                    'key': key or "",
+                })
+    finally:
+        cur.close()
+    return {t: cols for t, cols in tables.items() if not _is_internal(t)}
+
+def peek_catalog(key, max_age=CATALOG_TTL):
+    """Return the cached {table: columns} snapshot for a key if it is fresh enough, else None."""
+    with _catalogs_lock:
+        entry = _catalogs.get(key)
+    if entry and time.monotonic() - entry['loaded_at'] <= max_age:
+        return entry['tables']
+    return None
+
+def catalog_age(key):
+    """Seconds since the cached snapshot for a key was read, or None."""
+    with _catalogs_lock:
+        entry = _catalogs.get(key)
+    return None if entry is None else time.monotonic() - entry['loaded_at']
+
+def get_catalog(conn, max_age=CATALOG_TTL):
+    """Return {table: [column, ...]} for the connection's database, reading it at most once per max_age."""
+    key = catalog_key(conn)
+    tables = peek_catalog(key, max_age)
+    if tables is None:
+        tables = read_catalog(conn)
+        with _catalogs_lock:
+            _catalogs[key] = {'loaded_at': time.monotonic(), 'tables': tables}
+    return tables
+
+def invalidate_catalog(key=None):
+    """Drop one cached snapshot (or all of them), e.g. after DDL or on the user's request."""
+    with _catalogs_lock:
+        if key is None:
+            _catalogs.clear()
+        else:
+            _catalogs.pop(key, None)
+
+def target_column_kinds(conn, table, columns):
+    """Return {column: kind} for the target columns found in the catalog (missing ones are left out)."""
+    catalog = get_catalog(conn)
+    known = {c['name'].lower(): column_kind(c['data_type']) for c in catalog.get(table, [])}
+    return {col: known[col.lower()] for col in columns if col.lower() in known}
+
+def describe_column(column):
+    """Short label of a catalog column for selectboxes, e.g. 'amount · decimal(18,2) · PK'."""
+    parts = [column['name'], column['column_type'] or column['data_type']]
+    if column['key'] == "PRI":
+        parts.append("PK")
+    elif column['key'] == "UNI":
+        parts.append("UNIQUE")
+    if not column['nullable']:
+        parts.append("NOT NULL")
+    return " · ".join(parts)
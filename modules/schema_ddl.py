@@ -0,0 +1,276 @@
+import json
+import logging
+import re
+from .db import quote_ident
+from .schema_catalog import get_catalog, catalog_key, invalidate_catalog
+from .sf_metadata import describe_object
+from .flattener import expand_fields, is_compound, resolve_field
+
+logger = logging.getLogger(__name__)
+
+TABLE_PREFIX = "stg_sf_"
+ID_TYPE = "CHAR(18)"
+DEFAULT_VARCHAR = 255
+# Longest text kept inline as VARCHAR; longer text areas become TEXT/MEDIUMTEXT
+MAX_VARCHAR = 4000
+# InnoDB rejects rows whose VARCHAR columns could exceed ~64KB; stay under it with utf8mb4 (4 bytes/char)
+ROW_BYTE_BUDGET = 60000
+BYTES_PER_CHAR = 4
+
+STRING_TYPES = {"string", "picklist", "phone", "url", "email", "combobox", "encryptedstring", "textarea"}
+DECIMAL_TYPES = {"currency", "double", "percent"}
+
+def default_table_name(obj_name):
+    """Target table used when the Transform tab has not assigned one (stg_sf_account, ...)."""
+    return TABLE_PREFIX + re.sub(r'__c$', '', obj_name).lower()
+
+def default_column_name(field_name):
+    """snake_case column for a Salesforce field (Account.Name -> account_name, Id -> sf_id)."""
+    if field_name == "Id":
+        return "sf_id"
+    name = re.sub(r'__(c|r)\b', '', field_name).replace('.', '_')
+    name = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', name)
+    return name.lower()
+
+def _text_type(length):
+    if length <= MAX_VARCHAR:
+        return f"VARCHAR({max(1, length)})"
+    return "TEXT" if length <= 65535 // BYTES_PER_CHAR else "MEDIUMTEXT"
+
+def field_column_type(field, transform=None):
+    """MariaDB column type for a described field, adjusted for its Transform tab rule."""
+    t_type = (transform or {}).get('type', "None")
+    if t_type == "To Boolean":
+        return "TINYINT(1)"
+    if t_type == "To Date":
+        return "DATE"
+    if t_type == "To DateTime":
+        return "DATETIME(3)"
+    if t_type == "To Number":
+        places = int(transform.get('decimal_places', 0))
+        precision = max(int(field.get('precision') or 18), places + 1)
+        return "BIGINT" if places == 0 else f"DECIMAL({min(precision, 65)},{places})"
+    if t_type == "Enum Mapping":
+        enum_map = transform.get('enum_map', '{}')
+        try:
+            values = (json.loads(enum_map) if isinstance(enum_map, str) else enum_map).values()
+        except (ValueError, AttributeError):
+            values = []
+        longest = max([len(str(v)) for v in values] + [int(field.get('length') or DEFAULT_VARCHAR)])
+        return _text_type(longest)
+
+    sf_type = field.get('type')
+    if sf_type in ("id", "reference"):
+        return ID_TYPE
+    if sf_type == "boolean":
+        return "TINYINT(1)"
+    if sf_type in DECIMAL_TYPES:
+        precision, scale = int(field.get('precision') or 18), int(field.get('scale') or 0)
+        return f"DECIMAL({min(max(precision, scale, 1), 65)},{min(scale, 30)})"
+    if sf_type == "int":
+        return "INT" if int(field.get('digits') or 9) <= 9 else "BIGINT"
+    if sf_type == "long":
+        return "BIGINT"
+    if sf_type == "date":
+        return "DATE"
+    if sf_type == "datetime":
+        return "DATETIME(3)"
+    if sf_type == "time":
+        return "TIME(3)"
+    if sf_type in STRING_TYPES:
+        return _text_type(int(field.get('length') or DEFAULT_VARCHAR))
+    # multipicklist, address/location (stored as JSON text), base64, anyType, ...
+    return "TEXT"
+
+def _varchar_bytes(col_type):
+    m = re.match(r'(VAR)?CHAR\((\d+)\)', col_type)
+    return int(m.group(2)) * BYTES_PER_CHAR if m else 0
+
+def _fit_row_size(columns):
+    """Turn the widest VARCHARs into TEXT until the row fits InnoDB's row size limit."""
+    total = sum(_varchar_bytes(c['type']) for c in columns)
+    for col in sorted(columns, key=lambda c: -_varchar_bytes(c['type'])):
+        if total <= ROW_BYTE_BUDGET:
+            break
+        if col['type'].startswith("VARCHAR"):
+            total -= _varchar_bytes(col['type'])
+            col['type'] = "TEXT"
+
+def plan_table(describe, mapping, transformation, describe_fn=None):
+    """Return (table, columns) for one mapped object; columns are {'source', 'name', 'type', 'primary'}.
+
+    Compound fields contribute their flattened components; the compound itself only gets a
+    (JSON text) column when it is explicitly mapped. describe_fn(object) resolves the
+    types of relationship paths such as Owner.Name.
+    """
+    transformation = transformation or {}
+    field_map = transformation.get('field_map', {})
+    field_configs = transformation.get('field_configs', {})
+    columns = []
+    for src in expand_fields(describe, mapping['fields']):
+        if src in field_map and not field_map[src]:
+            continue  # explicitly skipped in the Transform tab
+        if is_compound(describe, src) and not field_map.get(src):
+            continue
+        field = None
+        if describe_fn and '.' in src:
+            try:
+                field = resolve_field(describe_fn, describe, src)
+            except Exception as e:
+                logger.warning("Could not resolve %s.%s: %s", mapping['object'], src, e)
+        elif '.' not in src:
+            field = next((f for f in describe['fields'] if f['name'] == src), None)
+        field = field or {'type': "string", 'length': DEFAULT_VARCHAR}
+        columns.append({
+            'source': src,
+            'name': field_map.get(src) or default_column_name(src),
+            'type': field_column_type(field, field_configs.get(src)),
+            'primary': src == "Id",
+        })
+    _fit_row_size(columns)
+    table = transformation.get('target_table') or default_table_name(mapping['object'])
+    return table, columns
+
+def create_table_sql(table, columns):
+    """CREATE TABLE statement with right-sized types and the Salesforce Id as primary key."""
+    lines = [f"  {quote_ident(c['name'])} {c['type']}{' NOT NULL' if c['primary'] else ''}" for c in columns]
+    pk = [c['name'] for c in columns if c['primary']]
+    if pk:
+        lines.append(f"  PRIMARY KEY ({quote_ident(pk[0])})")
+    return (f"CREATE TABLE {quote_ident(table)} (\n" + ",\n".join(lines) +
+            "\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+
+def normalize_type(col_type):
+    """Comparable form of a column type (drops MariaDB integer display widths)."""
+    t = col_type.lower().replace(" ", "")
+    if t != "tinyint(1)":
+        t = re.sub(r'^(tinyint|smallint|mediumint|int|integer|bigint)\(\d+\)', r'\1', t)
+    return t.replace("integer", "int").replace("unsigned", "")
+
+# Digits of the integer types, so they compare with DECIMAL(p,s) as DECIMAL(digits,0)
+_INT_DIGITS = {"tinyint": 3, "smallint": 5, "mediumint": 8, "int": 10, "bigint": 19}
+# Characters the TEXT types hold in utf8mb4
+_TEXT_CHARS = {name: size // BYTES_PER_CHAR for name, size in
+               {"tinytext": 255, "text": 65535, "mediumtext": 16777215, "longtext": 4294967295}.items()}
+
+def _type_shape(col_type):
+    """(family, size, scale) of a column type, or None for types the diff does not compare.
+
+    Families are text (size in characters), number (integer digits, scale), temporal
+    (0 for DATE, 1 for DATETIME/TIMESTAMP, scale = fractional digits) and time.
+    """
+    m = re.match(r'([a-z]+)(?:\((\d+)(?:,(\d+))?\))?$', normalize_type(col_type))
+    if not m:
+        return None
+    name, size, scale = m.group(1), m.group(2), m.group(3)
+    if name in ("char", "varchar"):
+        return "text", int(size or 1), 0
+    if name in _TEXT_CHARS:
+        return "text", _TEXT_CHARS[name], 0
+    if name in _INT_DIGITS:
+        return "number", _INT_DIGITS[name], 0
+    if name in ("decimal", "numeric"):
+        precision, scale = int(size or 10), int(scale or 0)
+        return "number", precision - scale, scale
+    if name == "date":
+        return "temporal", 0, 0
+    if name in ("datetime", "timestamp"):
+        return "temporal", 1, int(size or 0)
+    if name == "time":
+        return "time", 0, int(size or 0)
+    return None
+
+def _text_width(shape):
+    """Characters needed to hold any value of a non-text shape as text."""
+    family, size, scale = shape
+    if family == "number":
+        return size + scale + 2  # sign and decimal point
+    if family == "temporal":
+        return 19 + (scale + 1 if scale else 0) if size else 10
+    return 10 + (scale + 1 if scale else 0)
+
+def is_widening(current_type, new_type):
+    """True if changing a column from current_type to new_type cannot truncate or round stored values."""
+    have, want = _type_shape(current_type), _type_shape(new_type)
+    if have is None or want is None:
+        return False
+    if want[0] == "text":
+        return want[1] >= (have[1] if have[0] == "text" else _text_width(have))
+    if have[0] != want[0]:
+        return False
+    return want[1] >= have[1] and want[2] >= have[2]
+
+def diff_table(table, columns, existing):
+    """ALTER statements bringing an existing table's columns in line with the generated ones.
+
+    Returns (statements, notes, warnings). Only widening type changes are applied; narrowing
+    or incompatible ones (VARCHAR(255) -> VARCHAR(40), lost DECIMAL digits, ...) are left to
+    be made by hand and reported in warnings. Columns only present in the database are
+    reported in notes and never dropped.
+    """
+    current = {c['name'].lower(): c for c in existing}
+    clauses, notes, warnings = [], [], []
+    previous = None
+    for col in columns:
+        have = current.get(col['name'].lower())
+        definition = f"{quote_ident(col['name'])} {col['type']}{' NOT NULL' if col['primary'] else ''}"
+        if have is None:
+            position = f" AFTER {quote_ident(previous)}" if previous else " FIRST"
+            clauses.append(f"ADD COLUMN {definition}{position}")
+        elif normalize_type(have['column_type']) != normalize_type(col['type']):
+            if is_widening(have['column_type'], col['type']):
+                clauses.append(f"MODIFY COLUMN {definition}")
+                notes.append(f"{col['name']}: {have['column_type']} -> {col['type']}")
+            else:
+                warnings.append(f"{col['name']}: {have['column_type']} -> {col['type']} not applied, since it could "
+                                f"truncate existing values; change it manually after checking the data")
+        previous = col['name']
+    generated = {c['name'].lower() for c in columns}
+    extra = [c['name'] for c in existing if c['name'].lower() not in generated]
+    if extra:
+        notes.append(f"kept columns not in the mapping: {', '.join(extra)}")
+    if any(c['primary'] for c in columns) and not any(c['key'] == "PRI" for c in existing):
+        notes.append("table has no primary key; add one on the Id column manually after checking for duplicates")
+    statements = [f"ALTER TABLE {quote_ident(table)}\n  " + ",\n  ".join(clauses)] if clauses else []
+    return statements, notes, warnings
+
+def plan_schema(sf, conn, etl_config):
+    """Build the DDL plan for every mapped object. Returns a list of per-object plans.
+
+    Each plan is {'object', 'table', 'action' ('create'|'alter'|'none'), 'statements', 'notes',
+    'warnings', 'columns'}.
+    """
+    catalog = get_catalog(conn, max_age=0)
+    transformations = etl_config.get('transformations', {})
+    plans = []
+    for mapping in etl_config.get('mappings', []):
+        describe, _ = describe_object(sf, mapping['object'])
+        table, columns = plan_table(describe, mapping, transformations.get(mapping['object']),
+                                    lambda name: describe_object(sf, name)[0])
+        if table in catalog:
+            statements, notes, warnings = diff_table(table, columns, catalog[table])
+            action = "alter" if statements else "none"
+        else:
+            statements, notes, warnings, action = [create_table_sql(table, columns)], [], [], "create"
+        if not any(c['primary'] for c in columns):
+            notes.append("Id is not mapped, so the table gets no primary key")
+        plans.append({'object': mapping['object'], 'table': table, 'action': action,
+                      'statements': statements, 'notes': notes, 'warnings': warnings, 'columns': columns})
+    return plans
+
+def apply_schema(conn, plans):
+    """Execute the planned DDL (MariaDB commits each DDL statement implicitly). Returns tables changed."""
+    changed = []
+    cur = conn.cursor()
+    try:
+        for plan in plans:
+            for sql in plan['statements']:
+                logger.info("Applying DDL for %s:\n%s", plan['object'], sql)
+                cur.execute(sql)
+            if plan['statements']:
+                changed.append(plan['table'])
+        conn.commit()
+    finally:
+        cur.close()
+        invalidate_catalog(catalog_key(conn))
+    return changed
@@ -0,0 +1,252 @@
+import csv
+import io
+import logging
+import time
+from datetime import datetime, timezone
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_METHODS = ["Auto", "REST", "Bulk API 2.0"]
+# Auto mode switches to Bulk API 2.0 at or above this many rows (SELECT COUNT() estimate)
+DEFAULT_BULK_THRESHOLD = 50000
+BULK_POLL_INTERVAL = 2.0
+BULK_POLL_TIMEOUT = 3600
+BULK_PAGE_SIZE = 50000
+WATERMARK_FIELDS = ["SystemModstamp", "LastModifiedDate"]
+
+class BulkJobError(Exception):
+    """Raised when a Bulk API 2.0 query job cannot be created or fails."""
+
+def build_soql(obj_name, fields, where=None, order_by=None):
+    """Build the extraction SOQL for a mapping."""
+    soql = f"SELECT {', '.join(fields)} FROM {obj_name}"
+    if where:
+        soql += f" WHERE {where}"
+    if order_by:
+        soql += f" ORDER BY {order_by}"
+    return soql
+
+def extraction_fields(mapping):
+    """Fields to SELECT for a mapping, adding Id and the watermark field for incremental mode."""
+    fields = list(mapping['fields'])
+    if mapping.get('incremental'):
+        for extra in ('Id', mapping.get('watermark_field', "SystemModstamp")):
+            if extra not in fields:
+                fields.append(extra)
+    return fields
+
+# --- Incremental (delta) extraction ---
+
+def format_soql_datetime(value):
+    """Normalize a Salesforce datetime to a sortable UTC SOQL literal with millisecond precision."""
+    dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+def build_delta_where(watermark):
+    """SOQL filter for rows changed after a (timestamp, Id) high-water mark."""
+    field, ts, last_id = watermark['field'], watermark['ts'], watermark['id']
+    return f"({field} > {ts} OR ({field} = {ts} AND Id > '{last_id}'))"
+
+def advance_watermark(watermark, records, field):
+    """Return the highest (timestamp, Id) seen across the current watermark and a batch."""
+    best = (watermark['ts'], watermark['id']) if watermark else None
+    for record in records:
+        ts = record.get(field)
+        if not ts:
+            continue
+        key = (format_soql_datetime(ts), record['Id'])
+        if best is None or key > best:
+            best = key
+    if best is None:
+        return None
+    return {'field': field, 'ts': best[0], 'id': best[1]}
+
+def iter_deleted_ids(sf, obj_name, watermark, bulk_threshold=DEFAULT_BULK_THRESHOLD):
+    """Stream Ids of rows deleted at or after the watermark (queryAll over IsDeleted rows).
+
+    The bound is inclusive: a delete stamped at the watermark instant is otherwise lost for good,
+    and deleting a row twice is harmless.
+    """
+    where = f"IsDeleted = true AND {watermark['field']} >= {watermark['ts']}"
+    mapping = {'object': obj_name, 'fields': ['Id']}
+    _, stream = open_record_stream(sf, mapping, bulk_threshold, where, include_deleted=True)
+    for record in stream:
+        yield record['Id']
+
+def iter_rest_records(sf, soql, include_deleted=False):
+    """Stream records page by page using the REST query / queryMore locator."""
+    result = sf.query(soql, include_deleted=include_deleted)
+    while True:
+        for record in result['records']:
+            record.pop('attributes', None)
+            yield record
+        if result.get('done', True):
+            break
+        # Resolve the locator against sf.base_url rather than the hardcoded https instance
+        locator = result['nextRecordsUrl'].rsplit('/', 1)[-1]
+        result = sf.query_more(locator, include_deleted=include_deleted)
+
+# --- Bulk API 2.0 query jobs ---
+
+def _bulk_request(sf, method, path, **kwargs):
+    headers = dict(sf.headers)
+    headers.update(kwargs.pop('headers', {}))
+    resp = sf.session.request(method, sf.base_url + path, headers=headers, **kwargs)
+    if resp.status_code >= 300:
+        raise BulkJobError(f"{method} {path} failed ({resp.status_code}): {resp.text}")
+    return resp
+
+def create_bulk_query_job(sf, soql, include_deleted=False):
+    """Create a Bulk API 2.0 query job and return its id."""
+    resp = _bulk_request(sf, 'POST', 'jobs/query', json={
+        'operation': 'queryAll' if include_deleted else 'query',
+        'query': soql,
+        'contentType': 'CSV',
+        'columnDelimiter': 'COMMA',
+        'lineEnding': 'LF',
+    })
+    return resp.json()['id']
+
+def wait_for_bulk_job(sf, job_id, poll_interval=BULK_POLL_INTERVAL, timeout=BULK_POLL_TIMEOUT):
+    """Poll a query job until it reaches JobComplete. Returns the final job info."""
+    deadline = time.monotonic() + timeout
+    while True:
+        info = _bulk_request(sf, 'GET', f'jobs/query/{job_id}').json()
+        state = info.get('state')
+        if state == 'JobComplete':
+            return info
+        if state in ('Failed', 'Aborted'):
+            raise BulkJobError(f"Bulk job {job_id} {state}: {info.get('errorMessage', '')}")
+        if time.monotonic() > deadline:
+            raise BulkJobError(f"Bulk job {job_id} did not complete within {timeout}s (state: {state})")
+        time.sleep(poll_interval)
+
+def iter_bulk_results(sf, job_id, page_size=BULK_PAGE_SIZE, position=None):
+    """Stream a completed job's CSV result pages, following the Sforce-Locator header.
+
+    If a position dict is given it is kept at {'bulk_job', 'locator', 'offset'} just past the
+    last yielded record, and a position saved earlier resumes the stream right there.
+    """
+    position = {} if position is None else position
+    locator = position.get('locator') if position.get('bulk_job') == job_id else None
+    skip = position.get('offset', 0) if position.get('bulk_job') == job_id else 0
+    position['bulk_job'] = job_id
+    while True:
+        params = {'maxRecords': page_size}
+        if locator:
+            params['locator'] = locator
+        resp = _bulk_request(sf, 'GET', f'jobs/query/{job_id}/results',
+                             params=params, headers={'Accept': 'text/csv'})
+        resp.encoding = 'utf-8'
+        with timed("parse", format="csv"):
+            # Bulk CSV encodes null as an empty value
+            rows = [{k: (v if v != '' else None) for k, v in row.items()}
+                    for row in csv.DictReader(io.StringIO(resp.text))]
+        for offset, row in enumerate(rows, 1):
+            if offset <= skip:
+                continue
+            position['locator'], position['offset'] = locator, offset
+            yield row
+
+        skip = 0
+        locator = resp.headers.get('Sforce-Locator')
+        if not locator or locator == 'null':
+            break
+
+def iter_bulk_records(sf, soql, include_deleted=False):
+    """Run a Bulk API 2.0 query job and stream its records."""
+    job_id = create_bulk_query_job(sf, soql, include_deleted)
+    yield from _iter_bulk_job(sf, job_id)
+
+def _iter_bulk_job(sf, job_id, position=None):
+    wait_for_bulk_job(sf, job_id)
+    yield from iter_bulk_results(sf, job_id, position=position)
+
+def resume_bulk_job(sf, position):
+    """Return a record stream continuing a checkpointed Bulk job, or None if its results are gone."""
+    job_id = position.get('bulk_job')
+    if not job_id:
+        return None
+    try:
+        info = _bulk_request(sf, 'GET', f'jobs/query/{job_id}').json()
+    except BulkJobError as e:
+        logger.warning("Bulk job %s cannot be resumed: %s", job_id, e)
+        return None
+    if info.get('state') != 'JobComplete':
+        logger.warning("Bulk job %s cannot be resumed (state: %s)", job_id, info.get('state'))
+        return None
+    return iter_bulk_results(sf, job_id, position=position)
+
+# --- Method selection ---
+
+def estimate_count(sf, obj_name, where=None, include_deleted=False):
+    """Cheap row-count estimate via SELECT COUNT()."""
+    return sf.query(build_soql(obj_name, ["COUNT()"], where), include_deleted=include_deleted)['totalSize']
+
+def choose_extract_method(sf, mapping, bulk_threshold=DEFAULT_BULK_THRESHOLD, where=None, include_deleted=False):
+    """Pick REST or Bulk API 2.0 for a mapping based on its configured method or row count."""
+    method = mapping.get('extract_method', "Auto")
+    if method != "Auto":
+        return method
+    count = estimate_count(sf, mapping['object'], where, include_deleted)
+    method = "Bulk API 2.0" if count >= bulk_threshold else "REST"
+    logger.info("%s: ~%d rows, using %s", mapping['object'], count, method)
+    return method
+
+def open_record_stream(sf, mapping, bulk_threshold=DEFAULT_BULK_THRESHOLD, where=None, include_deleted=False,
+                       position=None):
+    """Start extraction for a mapping. Returns (method, record iterator).
+
+    With a position dict (a run checkpoint) records come in Id order: a checkpointed Bulk job is
+    resumed at its locator, otherwise extraction restarts after the last Id in position.
+    """
+    order_by = None
+    if position is not None:
+        order_by = "Id"
+        stream = resume_bulk_job(sf, position)
+        if stream is not None:
+            logger.info("Resuming %s from Bulk job %s", mapping['object'], position['bulk_job'])
+            return "Bulk API 2.0", stream
+        for key in ('bulk_job', 'locator', 'offset'):
+            position.pop(key, None)
+        if position.get('id'):
+            keyset = f"Id > '{position['id']}'"
+            where = f"({where}) AND {keyset}" if where else keyset
+
+    soql = build_soql(mapping['object'], mapping['fields'], where, order_by)
+    method = choose_extract_method(sf, mapping, bulk_threshold, where, include_deleted)
+    logger.info("Extracting %s via %s: %s", mapping['object'], method, soql)
+
+    if method == "Bulk API 2.0":
+        try:
+            # Create the job eagerly so unsupported queries (e.g. compound fields) surface here
+            job_id = create_bulk_query_job(sf, soql, include_deleted)
+            return method, _iter_bulk_job(sf, job_id, position)
+        except BulkJobError as e:
+            if mapping.get('extract_method', "Auto") != "Auto":
+                raise
+            logger.warning("%s: Bulk job rejected, falling back to REST (%s)", mapping['object'], e)
+            method = "REST"
+
+    return method, iter_rest_records(sf, soql, include_deleted)
+
+def iter_batches(records, batch_size):
+    """Group a record stream into lists of at most batch_size records.
+
+    batch_size may also be a callable, read again for each batch (adaptive sizing).
+    """
+    size = batch_size if callable(batch_size) else lambda: batch_size
+    limit = size()
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= limit:
+            yield batch
+            batch = []
+            limit = size()
+    if batch:
+        yield batch
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Shared by every Streamlit session of the dyno; /tmp survives reruns but not dyno restarts
+CACHE_DIR = "/tmp/sf_metadata_cache"
+# Entries younger than this are used without asking Salesforce; older ones are revalidated
+METADATA_MAX_AGE = 600
+DEFAULT_PREFETCH_WORKERS = 4
+
+# describe() field attributes kept in the cache (DDL generation and flattening need these)
+FIELD_KEYS = (
+    'name', 'label', 'type', 'soapType', 'length', 'byteLength', 'precision', 'scale', 'digits',
+    'nillable', 'unique', 'externalId', 'calculated', 'compoundFieldName', 'relationshipName',
+    'referenceTo', 'defaultValue',
+)
+
+OBJECT_LIST_QUERY = """
+    SELECT QualifiedApiName, Label
+    FROM EntityDefinition
+    WHERE IsApexTriggerable = true
+      AND IsCustomizable = true
+      AND IsProcessEnabled = true
+    ORDER BY Label
+"""
+
+_memory = {}
+_memory_lock = threading.Lock()
+_org_ids = {}
+
+def org_id(sf):
+    """Return the 15-char Id of the org a client is logged into (cached per instance)."""
+    key = sf.base_url
+    if key not in _org_ids:
+        session_id = getattr(sf, 'session_id', '') or ''
+        if re.match(r'^00D\w{12,15}!', session_id):
+            # OAuth/session ids start with the org Id
+            _org_ids[key] = session_id[:15]
+        else:
+            _org_ids[key] = sf.query("SELECT Id FROM Organization LIMIT 1")['records'][0]['Id'][:15]
+    return _org_ids[key]
+
+def _cache_path(org, name):
+    return os.path.join(CACHE_DIR, org, re.sub(r'[^\w.-]', '_', name) + ".json")
+
+def _load_entry(org, name):
+    with _memory_lock:
+        entry = _memory.get((org, name))
+    if entry is not None:
+        return entry
+    try:
+        with open(_cache_path(org, name), 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Wall-clock age survives a process restart; monotonic time would not
+    with _memory_lock:
+        _memory[(org, name)] = entry
+    return entry
+
+def _store_entry(org, name, entry):
+    with _memory_lock:
+        _memory[(org, name)] = entry
+    path = _cache_path(org, name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not write metadata cache %s: %s", path, e)
+
+def _conditional_get(sf, path, entry):
+    """GET a REST resource, sending the validators of a cached entry. Returns the response."""
+    headers = dict(sf.headers)
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    resp = sf.session.request('GET', sf.base_url + path, headers=headers)
+    if resp.status_code not in (200, 304):
+        raise RuntimeError(f"GET {path} failed ({resp.status_code}): {resp.text[:500]}")
+    return resp
+
+def _entry(data, resp):
+    return {
+        'fetched_at': time.time(),
+        'etag': resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+        'data': data,
+    }
+
+def _is_fresh(entry, max_age):
+    return entry is not None and time.time() - entry['fetched_at'] <= max_age
+
+def trim_describe(desc):
+    """Keep only the describe() parts the app uses, so cache files stay small for wide objects."""
+    return {
+        'name': desc['name'],
+        'label': desc.get('label'),
+        'keyPrefix': desc.get('keyPrefix'),
+        'fields': [{k: f.get(k) for k in FIELD_KEYS} for f in desc.get('fields', [])],
+    }
+
+def describe_object(sf, obj_name, max_age=METADATA_MAX_AGE, force=False):
+    """Return the trimmed describe of an object from cache, revalidated with If-Modified-Since.
+
+    Returns (describe, source) where source is 'cached', 'not modified' or 'fetched'.
+    """
+    org = org_id(sf)
+    name = f"describe_{obj_name}"
+    entry = _load_entry(org, name)
+    if not force and _is_fresh(entry, max_age):
+        return entry['data'], "cached"
+
+    resp = _conditional_get(sf, f"sobjects/{obj_name}/describe/", entry)
+    if resp.status_code == 304 and entry:
+        entry = {**entry, 'fetched_at': time.time()}
+        _store_entry(org, name, entry)
+        return entry['data'], "not modified"
+    entry = _entry(trim_describe(resp.json()), resp)
+    _store_entry(org, name, entry)
+    return entry['data'], "fetched"
+
+def list_objects(sf, max_age=METADATA_MAX_AGE, force=False):
+    """Return [{'label', 'name'}] of selectable objects (EntityDefinition), cached per org.
+
+    Once stale, a conditional describeGlobal (ETag / If-Modified-Since) decides whether the
+    object list has to be queried again.
+    """
+    org = org_id(sf)
+    entry = _load_entry(org, "objects")
+    if not force and _is_fresh(entry, max_age):
+        return entry['data']
+
+    resp = _conditional_get(sf, "sobjects/", entry)
+    if resp.status_code == 304 and entry:
+        entry = {**entry, 'fetched_at': time.time()}
+    else:
+        records = sf.query_all(OBJECT_LIST_QUERY)['records']
+        entry = _entry([{'label': r['Label'], 'name': r['QualifiedApiName']} for r in records], resp)
+    _store_entry(org, "objects", entry)
+    return entry['data']
+
+def prefetch_describes(sf, obj_names, workers=DEFAULT_PREFETCH_WORKERS, force=False):
+    """Describe many objects concurrently into the cache. Returns {object: source or 'error: ...'}."""
+    def fetch(obj_name):
+        try:
+            return describe_object(sf, obj_name, force=force)[1]
+        except Exception as e:
+            logger.warning("Prefetch of %s failed: %s", obj_name, e)
+            return f"error: {e}"
+
+    obj_names = list(dict.fromkeys(obj_names))
+    if not obj_names:
+        return {}
+    org_id(sf)  # resolve once before the workers start
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(obj_names))),
+                            thread_name_prefix="sf-describe") as pool:
+        return dict(zip(obj_names, pool.map(fetch, obj_names)))
+
+def clear_metadata_cache(sf=None):
+    """Forget cached metadata (of one org, or everything)."""
+    org = org_id(sf) if sf is not None else None
+    with _memory_lock:
+        for key in [k for k in _memory if org is None or k[0] == org]:
+            del _memory[key]
+    root = os.path.join(CACHE_DIR, org) if org else CACHE_DIR
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            try:
+                os.remove(os.path.join(dirpath, name))
+            except OSError:
+                pass
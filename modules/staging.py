@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+import pandas as pd
+from .metrics import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # staging is optional; without pyarrow objects stream straight from extract to load
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Extracted snapshots are written here (the only writable path on Heroku), one directory per object
+STAGING_DIR = "/tmp/sf_etl_staging"
+STAGING_FORMATS = ["Arrow IPC", "Parquet"]
+EXTENSIONS = {"Arrow IPC": ".arrow", "Parquet": ".parquet"}
+# Complete snapshots kept per object; older ones are pruned when a new one is committed
+SNAPSHOTS_KEPT = 2
+# A snapshot without a manifest may still be written by another run; it counts as abandoned once
+# its directory has not changed for this long (a part file is added per batch)
+ABANDONED_AFTER_SECONDS = 6 * 3600
+MANIFEST = "manifest.json"
+ID_COLUMN = "__sf_id"
+
+def staging_available():
+    return pa is not None
+
+def _to_table(frame):
+    """Arrow table of a source frame, with its Id index as a column.
+
+    Columns whose values Arrow cannot give one type (e.g. booleans mixed with text) are staged as text.
+    """
+    arrays = {ID_COLUMN: pa.array([None if i is None else str(i) for i in frame.index], type=pa.string())}
+    for name in frame.columns:
+        try:
+            arrays[name] = pa.array(frame[name], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays[name] = pa.array([None if v is None else str(v) for v in frame[name]], type=pa.string())
+    return pa.table(arrays)
+
+def _to_frame(table):
+    frame = table.to_pandas()
+    frame.index = frame.pop(ID_COLUMN).tolist()
+    return frame.astype(object).where(frame.notna(), None)
+
+class SnapshotWriter:
+    """Write one object's extracted source columns as a partitioned snapshot (one part file per batch)."""
+
+    def __init__(self, obj_name, staging_format="Arrow IPC", root=STAGING_DIR):
+        if pa is None:
+            raise RuntimeError("Staging needs pyarrow (pip install pyarrow)")
+        if staging_format not in STAGING_FORMATS:
+            raise ValueError(f"Unknown staging format: {staging_format}")
+        self.obj_name = obj_name
+        self.format = staging_format
+        self.snapshot_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+        self.object_dir = os.path.join(root, obj_name)
+        self.path = os.path.join(self.object_dir, self.snapshot_id)
+        os.makedirs(self.path)
+        self.parts = []
+        self.rows = 0
+        self.columns = None
+
+    def write(self, frame):
+        """Append a batch as the next part file."""
+        name = f"part-{len(self.parts):05d}{EXTENSIONS[self.format]}"
+        table = _to_table(frame)
+        with timed("staging_write", format=self.format):
+            if self.format == "Parquet":
+                pq.write_table(table, os.path.join(self.path, name))
+            else:
+                # Uncompressed IPC files can be memory-mapped when read back
+                with ipc.new_file(os.path.join(self.path, name), table.schema) as writer:
+                    writer.write_table(table)
+        self.parts.append(name)
+        self.rows += len(frame)
+        self.columns = self.columns or list(frame.columns)
+
+    def commit(self, **info):
+        """Mark the snapshot complete (manifest written last) and prune older snapshots. Returns the manifest."""
+        manifest = {
+            'object': self.obj_name, 'snapshot_id': self.snapshot_id, 'format': self.format,
+            'created_at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            'rows': self.rows, 'parts': self.parts, 'columns': self.columns or [], **info,
+        }
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, default=str)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+        prune_snapshots(self.obj_name, os.path.dirname(self.object_dir))
+        return {**manifest, 'path': self.path}
+
+    def abort(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def list_snapshots(obj_name, root=STAGING_DIR, complete=True):
+    """Snapshots of an object, newest first, as manifests with their 'path' (incomplete ones only if not complete)."""
+    object_dir = os.path.join(root, obj_name)
+    if not os.path.isdir(object_dir):
+        return []
+    snapshots = []
+    for snapshot_id in sorted(os.listdir(object_dir), reverse=True):
+        path = os.path.join(object_dir, snapshot_id)
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                snapshots.append({**json.load(f), 'path': path})
+        except FileNotFoundError:
+            if not complete:
+                snapshots.append({'snapshot_id': snapshot_id, 'path': path})
+        except ValueError:
+            logger.warning("Ignoring staged snapshot with an unreadable manifest: %s", path)
+    return snapshots
+
+def prune_snapshots(obj_name, root=STAGING_DIR, keep=SNAPSHOTS_KEPT, abandoned_after=ABANDONED_AFTER_SECONDS):
+    """Remove complete snapshots beyond the newest keep, and incomplete ones untouched for abandoned_after seconds."""
+    complete = list_snapshots(obj_name, root)
+    for old in complete[keep:]:
+        shutil.rmtree(old['path'], ignore_errors=True)
+    finished = {s['path'] for s in complete}
+    cutoff = time.time() - abandoned_after
+    for snapshot in list_snapshots(obj_name, root, complete=False):
+        if snapshot['path'] in finished:
+            continue
+        try:
+            if os.path.getmtime(snapshot['path']) < cutoff:
+                logger.info("Removing abandoned staged snapshot %s", snapshot['path'])
+                shutil.rmtree(snapshot['path'], ignore_errors=True)
+        except OSError:
+            pass
+
+def latest_snapshot(obj_name, columns=None, root=STAGING_DIR):
+    """Newest complete snapshot of an object holding every one of columns, or None."""
+    for snapshot in list_snapshots(obj_name, root):
+        if not columns or set(columns) <= set(snapshot['columns']):
+            return snapshot
+    return None
+
+def read_part(snapshot, part, columns=None):
+    """One part file as a source frame indexed by Id; Arrow IPC parts are memory-mapped."""
+    path = os.path.join(snapshot['path'], part)
+    read_columns = None if columns is None else [ID_COLUMN] + list(columns)
+    with timed("staging_read", format=snapshot['format']):
+        if snapshot['format'] == "Parquet":
+            return _to_frame(pq.read_table(path, columns=read_columns, memory_map=True))
+        with pa.memory_map(path) as source:
+            # The table's buffers point into the mapping; convert before it is closed
+            table = ipc.open_file(source).read_all()
+            return _to_frame(table if read_columns is None else table.select(read_columns))
+
+def iter_snapshot(snapshot, columns=None):
+    """Source frames of a snapshot, one per staged batch."""
+    for part in snapshot['parts']:
+        yield read_part(snapshot, part, columns)
+
+def read_head(snapshot, n=5, columns=None):
+    """First n rows of a snapshot (reads only as many parts as needed)."""
+    frames, rows = [], 0
+    for frame in iter_snapshot(snapshot, columns):
+        frames.append(frame.head(n - rows))
+        rows += len(frames[-1])
+        if rows >= n:
+            break
+    return pd.concat(frames) if frames else pd.DataFrame(columns=columns or [])
@@ -1,6 +1,6 @@
 import streamlit as st
 from datetime import time
-from .config_manager import load_config
+from .config_manager import load_config, load_saved_etl_config
 
 def init_session_state():
     """Initialize session state variables."""
@@ -34,7 +34,11 @@ def init_session_state():
             }
 
     if 'etl_config' not in st.session_state:
-        if loaded_config and 'etl_config' in loaded_config:
+        # The copy in the target database outlives dyno restarts, config.json does not
+        saved = load_saved_etl_config(st.session_state['mariadb_config'])
+        if saved is not None:
+            st.session_state['etl_config'] = saved
+        elif loaded_config and 'etl_config' in loaded_config:
             config = loaded_config['etl_config']
             # Migration logic: If old format (no mappings), convert to new format
             if 'mappings' not in config:
@@ -74,12 +78,16 @@ def init_session_state():
                     sc['run_time'] = datetime.strptime(sc['run_time'], "%H:%M:%S").time()
                 except:
                     sc['run_time'] = time(9, 0)
+            sc.setdefault('cron', "0 9 * * *")
+            sc.setdefault('day_of_week', "mon")
             st.session_state['schedule_config'] = sc
         else:
             st.session_state['schedule_config'] = {
                 'frequency': 'Daily',
                 'run_time': time(9, 0),
-                'is_active': False
+                'is_active': False,
+                'cron': "0 9 * * *",
+                'day_of_week': "mon"
             }
 
     if 'is_connected' not in st.session_state:
@@ -0,0 +1,341 @@
+import json
+from datetime import datetime, timezone
+from .db import placeholder
+
+# Run state lives in the target database (Heroku dynos are stateless, see gemini.md)
+WATERMARK_TABLE = "etl_watermarks"
+SCHEDULE_TABLE = "etl_schedule_state"
+API_USAGE_TABLE = "etl_api_usage"
+CHECKPOINT_TABLE = "etl_checkpoints"
+SCHEDULE_CONFIG_TABLE = "etl_schedule_config"
+BATCH_SIZE_TABLE = "etl_batch_sizes"
+# The app's etl_config (mappings, transformations, ...) as last saved, read by the worker
+SAVED_CONFIG_TABLE = "etl_saved_config"
+ETL_CONFIG_NAME = "etl_config"
+SCHEDULE_COLUMNS = ('last_scheduled', 'last_started', 'last_finished', 'last_status', 'next_run', 'heartbeat_at')
+
+def ensure_state_tables(conn):
+    """Create the ETL state tables if they do not exist."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+                object_name VARCHAR(255) NOT NULL PRIMARY KEY,
+                watermark_field VARCHAR(64) NOT NULL,
+                watermark_ts VARCHAR(32) NOT NULL,
+                watermark_id VARCHAR(18) NOT NULL,
+                updated_at VARCHAR(32) NOT NULL
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SCHEDULE_TABLE} (
+                job_id VARCHAR(64) NOT NULL PRIMARY KEY,
+                last_scheduled VARCHAR(32),
+                last_started VARCHAR(32),
+                last_finished VARCHAR(32),
+                last_status VARCHAR(255),
+                next_run VARCHAR(32),
+                heartbeat_at VARCHAR(32)
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SCHEDULE_CONFIG_TABLE} (
+                job_id VARCHAR(255) NOT NULL PRIMARY KEY,
+                schedule_json TEXT NOT NULL,
+                updated_at VARCHAR(32) NOT NULL
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SAVED_CONFIG_TABLE} (
+                config_name VARCHAR(64) NOT NULL PRIMARY KEY,
+                config_json LONGTEXT NOT NULL,
+                updated_at VARCHAR(32) NOT NULL
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                object_name VARCHAR(255) NOT NULL PRIMARY KEY,
+                fingerprint VARCHAR(64) NOT NULL,
+                load_table VARCHAR(255) NOT NULL,
+                batch_no INT NOT NULL,
+                extracted BIGINT NOT NULL,
+                loaded BIGINT NOT NULL,
+                cursor_json TEXT,
+                watermark_json TEXT,
+                updated_at VARCHAR(32) NOT NULL
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {BATCH_SIZE_TABLE} (
+                object_name VARCHAR(255) NOT NULL PRIMARY KEY,
+                batch_size INT NOT NULL,
+                updated_at VARCHAR(32) NOT NULL
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {API_USAGE_TABLE} (
+                usage_date VARCHAR(10) NOT NULL,
+                job_id VARCHAR(64) NOT NULL,
+                runs INT NOT NULL,
+                api_calls INT NOT NULL,
+                PRIMARY KEY (usage_date, job_id)
+            )
+        """)
+        conn.commit()
+    finally:
+        cur.close()
+
+def get_watermark(conn, obj_name):
+    """Return the stored high-water mark for an object as a dict, or None."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"SELECT watermark_field, watermark_ts, watermark_id FROM {WATERMARK_TABLE} WHERE object_name = {ph}",
+            (obj_name,)
+        )
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    if not row:
+        return None
+    return {'field': row[0], 'ts': row[1], 'id': row[2]}
+
+def save_watermark(conn, obj_name, watermark, commit=True):
+    """Persist an object's high-water mark and commit (or leave it in the open transaction)."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {WATERMARK_TABLE} WHERE object_name = {ph}", (obj_name,))
+        cur.execute(
+            f"INSERT INTO {WATERMARK_TABLE} (object_name, watermark_field, watermark_ts, watermark_id, updated_at) "
+            f"VALUES ({ph}, {ph}, {ph}, {ph}, {ph})",
+            (obj_name, watermark['field'], watermark['ts'], watermark['id'],
+             datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def reset_watermark(conn, obj_name):
+    """Forget an object's high-water mark so the next run does a full extract."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {WATERMARK_TABLE} WHERE object_name = {ph}", (obj_name,))
+        conn.commit()
+    finally:
+        cur.close()
+
+def get_checkpoint(conn, obj_name):
+    """Return an object's unfinished-run checkpoint, or None.
+
+    {'fingerprint', 'load_table', 'batch_no', 'extracted', 'loaded', 'cursor', 'watermark'}
+    """
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"SELECT fingerprint, load_table, batch_no, extracted, loaded, cursor_json, watermark_json "
+            f"FROM {CHECKPOINT_TABLE} WHERE object_name = {ph}", (obj_name,)
+        )
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    if not row:
+        return None
+    return {
+        'fingerprint': row[0], 'load_table': row[1], 'batch_no': row[2], 'extracted': row[3], 'loaded': row[4],
+        'cursor': json.loads(row[5]) if row[5] else {}, 'watermark': json.loads(row[6]) if row[6] else None,
+    }
+
+def save_checkpoint(conn, obj_name, checkpoint):
+    """Write an object's checkpoint inside the caller's open transaction (no commit).
+
+    The batch it describes is committed together with it, so a batch is never loaded twice.
+    """
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE object_name = {ph}", (obj_name,))
+        cur.execute(
+            f"INSERT INTO {CHECKPOINT_TABLE} (object_name, fingerprint, load_table, batch_no, extracted, loaded, "
+            f"cursor_json, watermark_json, updated_at) VALUES ({', '.join([ph] * 9)})",
+            (obj_name, checkpoint['fingerprint'], checkpoint['load_table'], checkpoint['batch_no'],
+             checkpoint['extracted'], checkpoint['loaded'], json.dumps(checkpoint.get('cursor') or {}),
+             json.dumps(checkpoint['watermark']) if checkpoint.get('watermark') else None,
+             datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+        )
+    finally:
+        cur.close()
+
+def clear_checkpoint(conn, obj_name):
+    """Forget an object's checkpoint and commit (also commits a pending watermark update)."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE object_name = {ph}", (obj_name,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def get_batch_sizes(conn):
+    """Return the batch sizes adaptive sizing converged to, as {object_name: rows}."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT object_name, batch_size FROM {BATCH_SIZE_TABLE}")
+        return {obj_name: int(size) for obj_name, size in cur.fetchall()}
+    finally:
+        cur.close()
+
+def save_batch_sizes(conn, sizes):
+    """Record learned batch sizes ({object_name: rows}) so the next run starts from them, and commit."""
+    if not sizes:
+        return
+    ph = placeholder(conn)
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.cursor()
+    try:
+        for obj_name, size in sizes.items():
+            cur.execute(f"DELETE FROM {BATCH_SIZE_TABLE} WHERE object_name = {ph}", (obj_name,))
+            cur.execute(f"INSERT INTO {BATCH_SIZE_TABLE} (object_name, batch_size, updated_at) VALUES ({ph}, {ph}, {ph})",
+                        (obj_name, int(size), now))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def reset_batch_sizes(conn):
+    """Forget every learned batch size; runs start from the configured batch_size again."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {BATCH_SIZE_TABLE}")
+        conn.commit()
+    finally:
+        cur.close()
+
+def get_schedule_state(conn, job_id):
+    """Return the scheduler worker's bookkeeping for a job as a dict (empty if it never ran)."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM {SCHEDULE_TABLE} WHERE job_id = {ph}", (job_id,))
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    return dict(zip(SCHEDULE_COLUMNS, row)) if row else {}
+
+def save_schedule_state(conn, job_id, **values):
+    """Update some of a job's scheduler bookkeeping columns (timestamps as UTC strings) and commit."""
+    state = {**get_schedule_state(conn, job_id), **values}
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {SCHEDULE_TABLE} WHERE job_id = {ph}", (job_id,))
+        cur.execute(
+            f"INSERT INTO {SCHEDULE_TABLE} (job_id, {', '.join(SCHEDULE_COLUMNS)}) "
+            f"VALUES ({', '.join([ph] * (len(SCHEDULE_COLUMNS) + 1))})",
+            (job_id, *[state.get(c) for c in SCHEDULE_COLUMNS])
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def get_schedule_configs(conn):
+    """Return the schedules saved from the Schedule tab as {job_id: schedule dict}."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT job_id, schedule_json FROM {SCHEDULE_CONFIG_TABLE}")
+        return {job_id: json.loads(schedule) for job_id, schedule in cur.fetchall()}
+    finally:
+        cur.close()
+
+def save_schedule_configs(conn, schedules):
+    """Replace the saved schedules with {job_id: schedule dict} and commit."""
+    ph = placeholder(conn)
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {SCHEDULE_CONFIG_TABLE}")
+        for job_id, schedule in schedules.items():
+            cur.execute(f"INSERT INTO {SCHEDULE_CONFIG_TABLE} (job_id, schedule_json, updated_at) "
+                        f"VALUES ({ph}, {ph}, {ph})", (job_id, json.dumps(schedule, default=str), now))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def get_etl_config(conn):
+    """Return the etl_config last saved from the app, or None if it was never saved."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT config_json FROM {SAVED_CONFIG_TABLE} WHERE config_name = {ph}", (ETL_CONFIG_NAME,))
+        row = cur.fetchone()
+        return json.loads(row[0]) if row else None
+    finally:
+        cur.close()
+
+def save_etl_config(conn, etl_config):
+    """Replace the saved etl_config and commit."""
+    ph = placeholder(conn)
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {SAVED_CONFIG_TABLE} WHERE config_name = {ph}", (ETL_CONFIG_NAME,))
+        cur.execute(f"INSERT INTO {SAVED_CONFIG_TABLE} (config_name, config_json, updated_at) VALUES ({ph}, {ph}, {ph})",
+                    (ETL_CONFIG_NAME, json.dumps(etl_config, default=str), now))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def record_api_usage(conn, job_id, api_calls, day=None):
+    """Add one run and its Salesforce API calls to a job's usage for a UTC day (default today)."""
+    day = day or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT runs, api_calls FROM {API_USAGE_TABLE} WHERE usage_date = {ph} AND job_id = {ph}",
+                    (day, job_id))
+        row = cur.fetchone()
+        if row:
+            cur.execute(f"UPDATE {API_USAGE_TABLE} SET runs = {ph}, api_calls = {ph} "
+                        f"WHERE usage_date = {ph} AND job_id = {ph}",
+                        (row[0] + 1, row[1] + api_calls, day, job_id))
+        else:
+            cur.execute(f"INSERT INTO {API_USAGE_TABLE} (usage_date, job_id, runs, api_calls) "
+                        f"VALUES ({ph}, {ph}, {ph}, {ph})", (day, job_id, 1, api_calls))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def get_api_usage(conn, since_day):
+    """Return {job_id: (runs, api_calls)} summed over UTC days from since_day ('YYYY-MM-DD') on."""
+    ph = placeholder(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT job_id, SUM(runs), SUM(api_calls) FROM {API_USAGE_TABLE} "
+                    f"WHERE usage_date >= {ph} GROUP BY job_id", (since_day,))
+        return {job_id: (int(runs), int(calls)) for job_id, runs, calls in cur.fetchall()}
+    finally:
+        cur.close()
@@ -1,21 +1,97 @@
 import streamlit as st
 import json
 from .config_manager import save_app_config
+from .transformer import (
+    TRANSFORM_TYPES, DATE_FORMATS, TIMEZONES, ON_ERROR_ACTIONS, NULL_STRATEGIES, TransformConfigError,
+    validate_field_config, compile_transformations, on_error_action
+)
+from .db import get_pool
+from .schema_catalog import config_key, peek_catalog, get_catalog, invalidate_catalog, catalog_age, describe_column
+from .schema_ddl import plan_schema, apply_schema
+from .sf_metadata import describe_object
+from .flattener import expand_fields
 
-# Constants for Transformations
-TRANSFORM_TYPES = ["None", "To Number", "To Date", "To DateTime", "To Boolean", "Enum Mapping"]
-DATE_FORMATS = ["YYYY-MM-DD", "YYYYMMDD", "YYYY/MM/DD", "ISO8601", "Manual"]
-TIMEZONES = ["UTC", "Asia/Seoul", "US/Eastern", "US/Pacific", "Europe/London"]
-
-# Dummy MariaDB Schema
-MARIADB_SCHEMA = {
-    "stg_sf_account": ["id", "sf_id", "name", "type", "industry", "phone", "website", "created_at"],
-    "stg_sf_contact": ["id", "sf_id", "first_name", "last_name", "email", "phone", "account_id", "created_at"],
-    "stg_sf_opportunity": ["id", "sf_id", "name", "amount", "stage", "close_date", "account_id", "created_at"],
-    "stg_sf_lead": ["id", "sf_id", "name", "company", "email", "status", "source", "created_at"],
-    "stg_sf_case": ["id", "sf_id", "subject", "status", "priority", "description", "account_id", "created_at"],
-    "stg_sf_user": ["id", "sf_id", "username", "email", "full_name", "is_active", "profile_id", "created_at"]
-}
+def load_target_catalog(force=False):
+    """Return the cached {table: [column, ...]} catalog of the configured MariaDB database.
+
+    Reruns reuse the process-wide snapshot; the database is only queried when the TTL has
+    expired or the user refreshes. A failed read is not retried until the next refresh.
+    """
+    config = st.session_state.get('mariadb_config', {})
+    if not (config.get('host') and config.get('user') and config.get('database')):
+        return None, "MariaDB connection is not configured. Fill in the **'MariaDB'** tab first."
+    key = config_key(config)
+    if force:
+        invalidate_catalog(key)
+        st.session_state.pop('schema_catalog_error', None)
+    catalog = peek_catalog(key)
+    if catalog is not None:
+        return catalog, None
+    if st.session_state.get('schema_catalog_error'):
+        return None, st.session_state['schema_catalog_error']
+    try:
+        with st.spinner("Reading target schema from information_schema..."):
+            with get_pool(config).connection() as conn:
+                return get_catalog(conn), None
+    except Exception as e:
+        st.session_state['schema_catalog_error'] = f"Could not read the target schema: {e}"
+        return None, st.session_state['schema_catalog_error']
+
+def render_ddl_generator(transformations):
+    """Generate CREATE/ALTER TABLE statements from describe metadata and apply them on request."""
+    with st.expander("🧱 Generate Target Tables from Salesforce Metadata (DDL)", expanded=False):
+        st.caption("매핑된 객체의 describe 메타데이터로 컬럼 타입(VARCHAR(length), DECIMAL(p,s), DATETIME(3), TINYINT(1), "
+                   "Id는 CHAR(18) PK)을 생성합니다. 기존 테이블은 추가/변경된 컬럼만 ALTER 합니다 (컬럼 삭제 없음).")
+        if not st.session_state.get('is_connected'):
+            st.info("🔒 Salesforce login is required to read describe metadata.")
+            return
+        config = st.session_state.get('mariadb_config', {})
+        if not (config.get('host') and config.get('user') and config.get('database')):
+            st.info("MariaDB connection is not configured.")
+            return
+
+        if st.button("🔍 Generate DDL", key="ddl_generate"):
+            try:
+                with st.spinner("Describing objects and comparing with the target database..."):
+                    with get_pool(config).connection() as conn:
+                        st.session_state['ddl_plan'] = plan_schema(
+                            st.session_state['sf_client'], conn,
+                            {**st.session_state['etl_config'], 'transformations': transformations})
+            except Exception as e:
+                st.error(f"DDL generation failed: {e}")
+                st.session_state.pop('ddl_plan', None)
+
+        plans = st.session_state.get('ddl_plan')
+        if not plans:
+            return
+        labels = {"create": "🆕 CREATE", "alter": "✏️ ALTER", "none": "✅ up to date"}
+        for plan in plans:
+            st.markdown(f"**{plan['object']} → `{plan['table']}`** · {labels[plan['action']]}")
+            for sql in plan['statements']:
+                st.code(sql, language="sql")
+            for note in plan['notes']:
+                st.caption(f"ℹ️ {note}")
+            for warning in plan['warnings']:
+                st.warning(f"⚠️ {warning}")
+
+        pending = [p for p in plans if p['statements']]
+        if pending and st.button(f"⚙️ Apply DDL ({len(pending)} tables)", type="primary", key="ddl_apply"):
+            try:
+                with get_pool(config).connection() as conn:
+                    changed = apply_schema(conn, pending)
+            except Exception as e:
+                st.error(f"Applying DDL failed: {e}")
+                return
+            # New tables become the target of objects that had none, with the generated column names
+            for plan in pending:
+                t = transformations.setdefault(plan['object'], {'field_map': {}, 'field_configs': {}})
+                if not t.get('target_table'):
+                    t['target_table'] = plan['table']
+                    for col in plan['columns']:
+                        t.setdefault('field_map', {}).setdefault(col['source'], col['name'])
+            st.session_state.pop('ddl_plan', None)
+            st.success(f"Applied DDL to: {', '.join(changed)}")
+            st.rerun()
 
 def render_transform_tab():
     st.subheader("🛠️ Data Transformation & Mapping")
@@ -28,12 +104,38 @@ def render_transform_tab():
     mappings = st.session_state['etl_config']['mappings']
     transformations = st.session_state['etl_config'].get('transformations', {})
 
-    # MariaDB 테이블 목록
-    target_tables = list(MARIADB_SCHEMA.keys())
+    render_ddl_generator(transformations)
+
+    # MariaDB 테이블 목록 (information_schema, TTL 캐시)
+    col_info, col_refresh = st.columns([4, 1])
+    with col_refresh:
+        force_refresh = st.button("🔄 Refresh Schema", use_container_width=True)
+    catalog, catalog_error = load_target_catalog(force=force_refresh)
+    with col_info:
+        if catalog_error:
+            st.warning(f"⚠️ {catalog_error}")
+        else:
+            age = catalog_age(config_key(st.session_state['mariadb_config']))
+            st.caption(f"🗄️ {len(catalog)} tables · schema read {int(age or 0)}s ago (cached)")
+    if catalog is None:
+        # Keep saved mappings visible (read-only column lists) while the database is unreachable
+        catalog = {
+            t['target_table']: [{'name': c, 'column_type': "", 'data_type': "", 'nullable': True, 'key': ""}
+                                for c in dict.fromkeys(v for v in t.get('field_map', {}).values() if v)]
+            for t in transformations.values() if t.get('target_table')
+        }
+    target_tables = sorted(catalog.keys())
+    sf = st.session_state.get('sf_client')
 
     for idx, mapping in enumerate(mappings):
         obj_name = mapping['object']
         fields = mapping['fields']
+        if sf is not None:
+            # Address/geolocation fields are loaded as their flattened components
+            try:
+                fields = expand_fields(describe_object(sf, obj_name)[0], fields)
+            except Exception:
+                pass
         
         with st.expander(f"📦 Mapping: {obj_name} ({len(fields)} fields)", expanded=True):
             col_target_top = st.columns([2, 3])
@@ -76,7 +178,8 @@ def render_transform_tab():
 
             field_map = transformations[obj_name].get('field_map', {})
             field_configs = transformations[obj_name].get('field_configs', {})
-            target_columns = MARIADB_SCHEMA[selected_target]
+            column_labels = {c['name']: describe_column(c) for c in catalog[selected_target]}
+            target_columns = list(column_labels)
             
             # 3. Field Mapping Rows
             for f_api in fields:
@@ -94,6 +197,7 @@ def render_transform_tab():
                         options=["-- Skip --"] + target_columns,
                         index=(col_idx + 1) if col_idx is not None else 0,
                         key=f"map_{obj_name}_{f_api}_{idx}",
+                        format_func=lambda c: column_labels.get(c, c),
                         label_visibility="collapsed"
                     )
                     
@@ -117,6 +221,9 @@ def render_transform_tab():
                     if selected_transform != current_cfg['type']:
                         current_cfg = {"type": selected_transform}
                         field_configs[f_api] = current_cfg
+
+                        for err in validate_field_config(current_cfg):
+                            st.error(f"❌ {err}")
                 
                 with r_col4:
                     if field_map[f_api]:
@@ -152,7 +259,12 @@ def render_transform_tab():
                             with c1:
                                 current_cfg['decimal_places'] = st.number_input("Decimal Places", min_value=0, max_value=10, value=current_cfg.get('decimal_places', 0), key=f"decimal_{obj_name}_{f_api}_{idx}")
                             with c2:
-                                current_cfg['handle_null'] = st.selectbox("Null Strategy", ["Zero", "Keep Null", "Default"], index=0, key=f"null_strat_{obj_name}_{f_api}_{idx}")
+                                current_cfg['handle_null'] = st.selectbox("Null Strategy", NULL_STRATEGIES, index=NULL_STRATEGIES.index(current_cfg.get('handle_null', 'Zero')) if current_cfg.get('handle_null') in NULL_STRATEGIES else 0, key=f"null_strat_{obj_name}_{f_api}_{idx}")
+                            with c3:
+                                if current_cfg['handle_null'] == "Default":
+                                    current_cfg['null_default'] = st.number_input("Default Value", value=float(current_cfg.get('null_default') or 0), key=f"null_default_{obj_name}_{f_api}_{idx}", help="비어 있는 값 대신 적재할 숫자입니다 (Decimal Places에 맞춰 반올림).")
+                                else:
+                                    current_cfg.pop('null_default', None)
                         
                         elif selected_transform == "To Boolean":
                             with c1:
@@ -163,9 +275,22 @@ def render_transform_tab():
                         elif selected_transform == "Enum Mapping":
                             mapping_str = current_cfg.get('enum_map', '{"SF_Value": "DB_Value"}')
                             current_cfg['enum_map'] = st.text_area("Mapping Table (JSON)", value=mapping_str, key=f"enum_map_{obj_name}_{f_api}_{idx}", help="Enter a JSON object for value-to-value mapping.")
-                        
+
+                        e1, _ = st.columns([1, 2])
+                        with e1:
+                            current_cfg['on_error'] = st.selectbox(
+                                "Invalid Values", ON_ERROR_ACTIONS,
+                                index=ON_ERROR_ACTIONS.index(on_error_action(current_cfg)),
+                                key=f"on_error_{obj_name}_{f_api}_{idx}",
+                                help="변환할 수 없는 값(숫자 아님, 날짜 형식 불일치, enum_map에 없는 값)이 있는 행을 "
+                                     "Dead Letter 테이블로 보내거나(Reject Row), 변환 결과(NULL 또는 원래 값) 그대로 적재합니다(Keep Value)."
+                            )
+
                         field_configs[f_api] = current_cfg
 
+                        for err in validate_field_config(current_cfg):
+                            st.error(f"❌ {err}")
+
             transformations[obj_name]['field_map'] = field_map
             transformations[obj_name]['field_configs'] = field_configs
 
@@ -173,6 +298,14 @@ def render_transform_tab():
     
     # Save Action
     if st.button("💾 Save Transform Settings", type="primary", use_container_width=True):
-        st.session_state['etl_config']['transformations'] = transformations
-        save_app_config()
-        st.success("Transformation settings saved successfully!")
+        try:
+            # Compile now so bad rules surface here, not hours into a load
+            compile_transformations(transformations)
+        except TransformConfigError as e:
+            st.error("Transformation settings were not saved. Fix these rules first:")
+            for err in e.errors:
+                st.markdown(f"- `{err}`")
+        else:
+            st.session_state['etl_config']['transformations'] = transformations
+            save_app_config()
+            st.success("Transformation settings saved successfully!")
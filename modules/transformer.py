@@ -0,0 +1,339 @@
+import hashlib
+import json
+import threading
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+import pandas as pd
+from .metrics import timed
+
+# Constants for Transformations (shared by the Transform tab and the headless runner)
+TRANSFORM_TYPES = ["None", "To Number", "To Date", "To DateTime", "To Boolean", "Enum Mapping"]
+DATE_FORMATS = ["YYYY-MM-DD", "YYYYMMDD", "YYYY/MM/DD", "ISO8601", "Manual"]
+TIMEZONES = ["UTC", "Asia/Seoul", "US/Eastern", "US/Pacific", "Europe/London"]
+
+# strftime/strptime patterns for DATE_FORMATS ("ISO8601"/"Manual" are parsed leniently)
+STRFTIME_FORMATS = {
+    "YYYY-MM-DD": "%Y-%m-%d",
+    "YYYYMMDD": "%Y%m%d",
+    "YYYY/MM/DD": "%Y/%m/%d",
+}
+# Date separator of each target format, used to rewrite numpy ISO strings in bulk
+DATE_SEPARATORS = {"YYYY-MM-DD": "-", "YYYYMMDD": "", "YYYY/MM/DD": "/", "ISO8601": "-"}
+TZ_SUFFIX = r"(?:Z|[+-]\d{2}:?\d{2})$"
+# What "To Number" writes for empty source values; "Default" writes the field's null_default
+NULL_STRATEGIES = ["Zero", "Keep Null", "Default"]
+
+# What happens to a row whose value a rule cannot convert; rejected rows go to the dead-letter table.
+# Enum mappings keep unmapped values by default, since partial maps are common.
+ON_ERROR_ACTIONS = ["Reject Row", "Keep Value"]
+REJECT_REASONS = {
+    "To Number": "not a number",
+    "To Date": "not a valid date",
+    "To DateTime": "not a valid datetime",
+    "To Boolean": "not a listed true/false value",
+    "Enum Mapping": "no enum_map entry",
+}
+
+# Compiled plans keyed by the hash of etl_config['transformations']
+PLAN_CACHE_SIZE = 8
+_plan_cache = {}
+_plan_cache_lock = threading.Lock()
+
+class TransformConfigError(ValueError):
+    """Raised when etl_config['transformations'] contains invalid rules. .errors lists them all."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("Invalid transformation config:\n" + "\n".join(f"- {e}" for e in errors))
+
+def get_path(record, field):
+    """Resolve a (possibly dotted relationship) field from a Salesforce record."""
+    if field in record:
+        # Bulk API CSV results are already flat ("Profile.Name" columns)
+        return record[field]
+    value = record
+    for part in field.split('.'):
+        if value is None:
+            return None
+        value = value.get(part)
+    return value
+
+def get_target_columns(transformation):
+    """Return (source_fields, target_columns) for the mapped fields of an object."""
+    field_map = transformation.get('field_map', {})
+    pairs = [(src, tgt) for src, tgt in field_map.items() if tgt]
+    return [p[0] for p in pairs], [p[1] for p in pairs]
+
+def _first_valid(series):
+    idx = series.first_valid_index()
+    return None if idx is None else series[idx]
+
+# --- Column ops (each takes and returns a pandas Series) ---
+
+def _number_op(cfg):
+    places = int(cfg.get('decimal_places', 0))
+    handle_null = cfg.get('handle_null', "Zero")
+    fill = {"Zero": 0, "Default": round(float(cfg.get('null_default') or 0), places)}.get(handle_null)
+
+    def op(s):
+        missing = s.isna() | (s.astype(object) == "")
+        num = pd.to_numeric(s.where(~missing), errors='coerce').round(places)
+        if fill is not None:
+            num = num.mask(missing, fill)
+        return num.astype('Int64') if places == 0 else num
+    return op
+
+def _format_datetimes(dt, tgt_fmt, with_time):
+    # Series.dt.strftime formats element by element; numpy's ISO formatter plus
+    # separator rewrites is roughly 10x faster for the fixed DATE_FORMATS.
+    iso = np.datetime_as_string(dt.to_numpy(dtype='datetime64[s]'), unit='s')
+    if not with_time:
+        iso = iso.astype('U10')
+    sep = DATE_SEPARATORS.get(tgt_fmt, "-")
+    if sep != "-":
+        iso = np.char.replace(iso, "-", sep)
+    if with_time and tgt_fmt != "ISO8601":
+        iso = np.char.replace(iso, "T", " ")
+    return pd.Series(iso, index=dt.index, dtype=object).where(dt.notna(), None)
+
+def _datetime_op(cfg, with_time):
+    src_fmt = cfg.get('src_fmt', "ISO8601")
+    parse_fmt = STRFTIME_FORMATS.get(src_fmt, "ISO8601")
+    tgt_fmt = cfg.get('tgt_fmt', "YYYY-MM-DD")
+    tz_convert = cfg.get('tz_convert', False)
+    src_tz = cfg.get('src_tz', "UTC")
+    tgt_tz = cfg.get('tgt_tz', "Asia/Seoul")
+
+    def op(s):
+        s = s.where(s.astype(object) != "")
+        first = _first_valid(s)
+        # Salesforce DateTime values carry an offset; Date values and custom formats do not
+        aware = isinstance(first, str) and parse_fmt == "ISO8601" and pd.Series([first]).str.contains(TZ_SUFFIX).iloc[0]
+        dt = pd.to_datetime(s, format=parse_fmt, errors='coerce', utc=bool(aware))
+        if tz_convert:
+            if not aware:
+                dt = dt.dt.tz_localize(src_tz, ambiguous='NaT', nonexistent='NaT')
+            dt = dt.dt.tz_convert(tgt_tz).dt.tz_localize(None)
+        elif aware:
+            dt = dt.dt.tz_localize(None)
+        return _format_datetimes(dt, tgt_fmt, with_time)
+    return op
+
+def _boolean_op(cfg):
+    lookup = {v.strip().lower(): 1 for v in cfg.get('true_val', 'true,1,Y,Yes').split(',')}
+    lookup.update({v.strip().lower(): 0 for v in cfg.get('false_val', 'false,0,N,No').split(',')})
+
+    def op(s):
+        out = s.astype(str).str.strip().str.lower().map(lookup)
+        # Native booleans (REST JSON) map directly
+        out = out.mask(s.isin([True]), 1).mask(s.isin([False]), 0)
+        return out.mask(s.isna()).astype('Int64')
+    return op
+
+def _enum_op(cfg):
+    enum_map = cfg.get('enum_map', '{}')
+    if isinstance(enum_map, str):
+        enum_map = json.loads(enum_map)
+
+    def op(s):
+        mapped = s.astype(str).map(enum_map)
+        return mapped.where(mapped.notna(), s).where(s.notna(), None)
+    return op
+
+def _passthrough_op(s):
+    if isinstance(_first_valid(s), dict):
+        # Compound fields (e.g. BillingAddress) come back as nested dicts
+        return s.map(lambda v: json.dumps({k: x for k, x in v.items() if k != 'attributes'})
+                     if isinstance(v, dict) else v)
+    return s
+
+def on_error_action(cfg):
+    """'Reject Row' or 'Keep Value' for a field's transformation config."""
+    t_type = cfg.get('type', "None")
+    return cfg.get('on_error') or ("Keep Value" if t_type in ("None", "Enum Mapping") else "Reject Row")
+
+def compile_check(cfg):
+    """Build the vectorized validation of one field's rule: check(source, result) -> mask of invalid values.
+
+    Returns None when the rule never rejects rows.
+    """
+    t_type = cfg.get('type', "None")
+    if t_type not in REJECT_REASONS or on_error_action(cfg) != "Reject Row":
+        return None
+    if t_type == "Enum Mapping":
+        enum_map = cfg.get('enum_map', '{}')
+        keys = list(json.loads(enum_map) if isinstance(enum_map, str) else enum_map)
+        return lambda s, out: s.notna() & ~s.astype(str).isin(keys)
+    # Conversions yield null for values they cannot parse
+    return lambda s, out: s.notna() & (s.astype(object) != "") & out.isna()
+
+def compile_op(cfg):
+    """Build the vectorized column op for one field's transformation config."""
+    t_type = cfg.get('type', "None")
+    if t_type == "To Number":
+        return _number_op(cfg)
+    if t_type == "To Date":
+        return _datetime_op(cfg, with_time=False)
+    if t_type == "To DateTime":
+        return _datetime_op(cfg, with_time=True)
+    if t_type == "To Boolean":
+        return _boolean_op(cfg)
+    if t_type == "Enum Mapping":
+        return _enum_op(cfg)
+    return _passthrough_op
+
+def validate_field_config(cfg):
+    """Return a list of problems with one field's transformation config."""
+    errors = []
+    t_type = cfg.get('type', "None")
+    if t_type not in TRANSFORM_TYPES:
+        return [f"unknown transform type '{t_type}'"]
+
+    if t_type in ("To Date", "To DateTime"):
+        for key in ('src_fmt', 'tgt_fmt'):
+            if cfg.get(key) is not None and cfg[key] not in DATE_FORMATS:
+                errors.append(f"{key} '{cfg[key]}' is not one of {DATE_FORMATS}")
+        if cfg.get('tz_convert'):
+            for key in ('src_tz', 'tgt_tz'):
+                try:
+                    ZoneInfo(cfg.get(key) or "UTC")
+                except (ZoneInfoNotFoundError, ValueError):
+                    errors.append(f"{key} '{cfg.get(key)}' is not a known timezone")
+
+    elif t_type == "To Number":
+        try:
+            if not 0 <= int(cfg.get('decimal_places', 0)) <= 10:
+                errors.append("decimal_places must be between 0 and 10")
+        except (TypeError, ValueError):
+            errors.append(f"decimal_places '{cfg.get('decimal_places')}' is not an integer")
+        handle_null = cfg.get('handle_null', "Zero")
+        if handle_null not in NULL_STRATEGIES:
+            errors.append(f"handle_null '{handle_null}' is not one of {NULL_STRATEGIES}")
+        elif handle_null == "Default":
+            try:
+                float(cfg.get('null_default'))
+            except (TypeError, ValueError):
+                errors.append(f"null_default '{cfg.get('null_default')}' is not a number")
+
+    elif t_type == "To Boolean":
+        true_vals = {v.strip().lower() for v in cfg.get('true_val', 'true,1,Y,Yes').split(',') if v.strip()}
+        false_vals = {v.strip().lower() for v in cfg.get('false_val', 'false,0,N,No').split(',') if v.strip()}
+        if not true_vals or not false_vals:
+            errors.append("true_val and false_val must each list at least one value")
+        if true_vals & false_vals:
+            errors.append(f"values listed as both true and false: {sorted(true_vals & false_vals)}")
+
+    if cfg.get('on_error') is not None and cfg['on_error'] not in ON_ERROR_ACTIONS:
+        errors.append(f"on_error '{cfg['on_error']}' is not one of {ON_ERROR_ACTIONS}")
+
+    if t_type == "Enum Mapping":
+        enum_map = cfg.get('enum_map', '{}')
+        try:
+            parsed = json.loads(enum_map) if isinstance(enum_map, str) else enum_map
+            if not isinstance(parsed, dict):
+                errors.append("enum_map must be a JSON object")
+        except json.JSONDecodeError as e:
+            errors.append(f"enum_map is not valid JSON ({e})")
+
+    return errors
+
+def validate_transformations(transformations):
+    """Return every problem in etl_config['transformations'] as 'Object.Field: message' strings."""
+    errors = []
+    for obj_name, transformation in transformations.items():
+        field_map = transformation.get('field_map', {})
+        for src, cfg in transformation.get('field_configs', {}).items():
+            # Rules on skipped fields never run, so they cannot fail a load
+            if not field_map.get(src):
+                continue
+            errors.extend(f"{obj_name}.{src}: {e}" for e in validate_field_config(cfg))
+    return errors
+
+def config_hash(section):
+    """Stable hash of a config section (key order independent)."""
+    return hashlib.sha256(json.dumps(section, sort_keys=True, default=str).encode()).hexdigest()
+
+def compile_plan(transformation):
+    """Compile an object's field_map/field_configs into a list of column ops."""
+    field_configs = transformation.get('field_configs', {})
+    sources, targets = get_target_columns(transformation)
+    return [
+        {'source': src, 'target': tgt, 'type': field_configs.get(src, {}).get('type', "None"),
+         'op': compile_op(field_configs.get(src, {"type": "None"})),
+         'check': compile_check(field_configs.get(src, {"type": "None"}))}
+        for src, tgt in zip(sources, targets)
+    ]
+
+def compile_transformations(transformations):
+    """Validate and compile every object's plan, reusing the cached result while the config is unchanged.
+
+    Returns {object_name: plan}. Raises TransformConfigError before any data is touched.
+    """
+    key = config_hash(transformations)
+    with _plan_cache_lock:
+        if key in _plan_cache:
+            return _plan_cache[key]
+
+    errors = validate_transformations(transformations)
+    if errors:
+        raise TransformConfigError(errors)
+    plans = {obj_name: compile_plan(t) for obj_name, t in transformations.items()}
+
+    with _plan_cache_lock:
+        if len(_plan_cache) >= PLAN_CACHE_SIZE:
+            _plan_cache.pop(next(iter(_plan_cache)))
+        _plan_cache[key] = plans
+    return plans
+
+def records_to_frame(records, fields):
+    """Build a column-oriented DataFrame of the source fields from a batch of records."""
+    return pd.DataFrame({
+        field: pd.Series([get_path(r, field) for r in records], dtype=object)
+        for field in dict.fromkeys(fields)
+    })
+
+def apply_plan(plan, frame):
+    """Apply a compiled plan to a DataFrame of source fields. Returns the target-column frame."""
+    columns = []
+    for step in plan:
+        with timed("transform_op", op=step['type']):
+            columns.append(step['op'](frame[step['source']]).rename(step['target']))
+    if not columns:
+        return pd.DataFrame(index=frame.index)
+    return pd.concat(columns, axis=1)
+
+def apply_plan_checked(plan, frame):
+    """Apply a compiled plan and set aside the rows that fail a 'Reject Row' rule.
+
+    Returns (good, reasons): the target-column frame without the rejected rows, and a
+    Series of rejection reasons (first failing field) indexed by the rejected rows' labels.
+    """
+    columns = []
+    rejected = pd.Series(False, index=frame.index)
+    reasons = pd.Series(None, index=frame.index, dtype=object)
+    for step in plan:
+        source = frame[step['source']]
+        with timed("transform_op", op=step['type']):
+            out = step['op'](source)
+            if step['check'] is not None:
+                invalid = step['check'](source, out) & ~rejected
+                if invalid.any():
+                    reasons[invalid] = [f"{step['source']}: {REJECT_REASONS[step['type']]} ({str(v)[:100]!r})"
+                                        for v in source[invalid]]
+                    rejected |= invalid
+        columns.append(out.rename(step['target']))
+    good = pd.concat(columns, axis=1) if columns else pd.DataFrame(index=frame.index)
+    if not rejected.any():
+        return good, reasons.iloc[:0]
+    return good[~rejected], reasons[rejected]
+
+def transform_batch(records, transformation):
+    """Transform a batch of Salesforce records into a DataFrame of target columns."""
+    plan = compile_plan(transformation)
+    return apply_plan(plan, records_to_frame(records, [step['source'] for step in plan]))
+
+def frame_to_rows(frame):
+    """Convert a transformed frame into DB-API rows of plain Python values (NaN/NA -> None)."""
+    columns = [frame.iloc[:, i] for i in range(frame.shape[1])]
+    columns = [s.astype(object).where(s.notna(), None).tolist() for s in columns]
+    return list(zip(*columns))
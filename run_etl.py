@@ -0,0 +1,145 @@
+"""Headless ETL runner: executes the etl_config saved in config.json end to end.
+
+Usage:
+    python run_etl.py [--config config.json] [--object Account --object Case]
+                      [--profile] [--metrics-file metrics.txt]
+
+Point --instance-url/--session-id at any Salesforce-compatible REST endpoint and
+--sqlite at a local database file to run without a real org or MariaDB.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from simple_salesforce import Salesforce
+from modules.db import ConnectionPool, get_pool
+from modules.etl_runner import run_etl
+from modules.metrics import to_openmetrics
+from modules.pipeline import stage_utilization
+from modules.profiler import StageProfiler
+from modules.transformer import TransformConfigError, compile_transformations
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Salesforce -> MariaDB ETL headlessly.")
+    parser.add_argument("--config", default="config.json", help="Path to config.json")
+    parser.add_argument("--object", action="append", dest="objects",
+                        help="Only run this object (repeatable). Defaults to all in load_order.")
+    parser.add_argument("--batch-size", type=int, help="Override etl_config.batch_size")
+    parser.add_argument("--workers", type=int, help="Override etl_config.parallel_workers (concurrent object extraction)")
+    parser.add_argument("--instance-url", default=os.environ.get("SF_INSTANCE_URL"),
+                        help="Salesforce instance URL (use with --session-id instead of username/password)")
+    parser.add_argument("--session-id", default=os.environ.get("SF_SESSION_ID"),
+                        help="Salesforce session id / access token")
+    parser.add_argument("--sqlite", help="Load into a local SQLite file instead of MariaDB")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard checkpoints of interrupted runs instead of resuming them")
+    parser.add_argument("--pipeline-depth", type=int,
+                        help="Override etl_config.pipeline_depth (chunks queued between stages, 0 = no pipelining)")
+    parser.add_argument("--stage", action="store_true",
+                        help="Extract each object into a staged Arrow/Parquet snapshot under /tmp before loading")
+    parser.add_argument("--from-staging", action="store_true",
+                        help="Re-run transforms and loads from the latest staged snapshots without calling the API")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample where each stage spends its time and print the top hotspots")
+    parser.add_argument("--metrics-file", help="Write the run's timers and counters in OpenMetrics text format")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+def connect_salesforce(sf_config, instance_url=None, session_id=None):
+    """Create a Salesforce client from a session or from saved credentials."""
+    if instance_url and session_id:
+        sf = Salesforce(instance_url=instance_url, session_id=session_id)
+        if instance_url.startswith("http://"):
+            # Local stand-in endpoints are plain HTTP; simple-salesforce assumes HTTPS
+            sf.base_url = sf.base_url.replace("https://", "http://", 1)
+        return sf
+    return Salesforce(
+        username=sf_config['username'],
+        password=sf_config['password'],
+        security_token=sf_config.get('security_token', ''),
+        domain=sf_config.get('domain', 'login'),
+    )
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    etl_config = config.get('etl_config', {})
+    if args.batch_size:
+        etl_config['batch_size'] = args.batch_size
+    if args.workers:
+        etl_config['parallel_workers'] = args.workers
+    if args.pipeline_depth is not None:
+        etl_config['pipeline_depth'] = args.pipeline_depth
+    if args.stage:
+        etl_config['staging'] = True
+
+    # Fail on bad transform rules before spending any API calls
+    try:
+        compile_transformations(etl_config.get('transformations', {}))
+    except TransformConfigError as e:
+        print(f"❌ {e}")
+        return 2
+
+    sf = connect_salesforce(config.get('sf_config', {}), args.instance_url, args.session_id)
+    if args.sqlite:
+        pool = ConnectionPool(lambda: sqlite3.connect(args.sqlite, check_same_thread=False))
+    else:
+        pool = get_pool(config.get('mariadb_config', {}))
+
+    profiler = StageProfiler() if args.profile else None
+    started = time.monotonic()
+    try:
+        with pool.connection() as conn:
+            results = run_etl(etl_config, sf, conn, objects=args.objects, pool=pool, fresh=args.fresh, source="cli",
+                              profiler=profiler, from_staging=args.from_staging)
+    finally:
+        pool.close()
+    wall = time.monotonic() - started
+
+    for r in results:
+        if 'error' in r:
+            print(f"❌ {r['object']}: {r['error']}")
+        else:
+            print(f"✅ {r['object']} -> {r['target_table']} ({r['strategy']}, {r['extract_method']}, {r['mode']}): "
+                  f"{r['loaded']}/{r['extracted']} rows in {r['batches']} batches, "
+                  f"{r['deleted']} deleted, {r['seconds']}s")
+            if r.get('rejected'):
+                print(f"   {r['rejected']} rows rejected to the dead-letter table (etl_dead_letters)")
+            if 'resumed_after_batch' in r:
+                print(f"   resumed after batch {r['resumed_after_batch']}")
+            waited = f" | waited {r['wait_seconds']}s" if 'wait_seconds' in r else ""
+            print(f"   extract {r['extract_seconds']}s | transform {r['transform_seconds']}s | "
+                  f"load {r['load_seconds']}s{waited} | {r.get('api_calls', 0)} API calls, {r.get('bytes', 0)} bytes")
+            if 'batch_size' in r:
+                print(f"   batch size converged to {r['batch_size']} rows")
+            if r.get('chunks'):
+                rows = [c['rows'] for c in r['chunks']]
+                print(f"   {len(rows)} PK chunks, {min(rows)} to {max(rows)} rows each")
+            busy = stage_utilization(r)
+            if busy:
+                print("   utilization " + " | ".join(f"{name} {share:.0%}" for name, share in busy.items()) +
+                      f" (bottleneck: {max(busy, key=busy.get)})")
+    serial = sum(r.get('seconds', 0) for r in results)
+    print(f"Total wall time {wall:.3f}s (sum of per-object times {serial:.3f}s)")
+    if profiler is not None:
+        for stage, spots in profiler.hotspots(limit=10).items():
+            print(f"Hotspots of {stage} ({profiler.samples[stage]} samples):")
+            for spot in spots:
+                print(f"   {spot['own_pct']:5.1f}%  {spot['own_seconds']:.3f}s own / "
+                      f"{spot['total_seconds']:.3f}s total  {spot['function']}")
+    if args.metrics_file:
+        with open(args.metrics_file, 'w') as f:
+            f.write(to_openmetrics())
+    return 1 if any('error' in r for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_salesforce import FakeSalesforce
+
+@pytest.fixture
+def fake_sf():
+    fake = FakeSalesforce().start()
+    yield fake
+    fake.stop()
+
+@pytest.fixture
+def sqlite_conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "etl.db", check_same_thread=False)
+    yield conn
+    conn.close()
@@ -0,0 +1,231 @@
+"""Local stand-in for the Salesforce REST endpoints the ETL calls.
+
+Serves query / queryMore, Bulk API 2.0 query jobs (create, poll, CSV result pages linked by
+the Sforce-Locator header), sObject describes (ETag / 304) and /limits from in-memory records
+over plain HTTP, so the runner can be exercised end to end with
+run_etl.connect_salesforce(instance_url=..., session_id=...).
+Only the SOQL the extractor builds is understood: SELECT <fields> FROM <object>, an optional
+WHERE of comparisons, IN lists and AND / OR, ORDER BY Id [ASC|DESC] and LIMIT.
+"""
+import csv
+import hashlib
+import io
+import json
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_VERSION = "59.0"
+_SOQL = re.compile(r"SELECT (?P<fields>.+?) FROM (?P<object>\w+)(?: WHERE (?P<where>.+?))?(?: ORDER BY (?P<order>\w+)(?: (?P<direction>ASC|DESC))?)?(?: LIMIT (?P<limit>\d+))?$")
+
+_TOKEN = re.compile(r"'[^']*'|\d{4}-\d{2}-\d{2}T[\d:.]+Z|>=|<=|!=|=|>|<|\(|\)|,|\w+")
+_KEYWORDS = {'AND': "and", 'OR': "or", 'NOT': "not", 'IN': "in", 'true': "True", 'false': "False", '=': "=="}
+
+def parse_soql(soql):
+    match = _SOQL.match(soql.strip())
+    if not match:
+        raise ValueError(f"Unsupported SOQL: {soql}")
+    return ([f.strip() for f in match.group('fields').split(',')], match.group('object'),
+            match.group('where'), match.group('order'), match.group('direction'), match.group('limit'))
+
+def _where_to_python(where):
+    """Translate a SOQL WHERE clause into a Python expression over the record dict _r."""
+    out, in_list = [], False
+    for token in _TOKEN.findall(where):
+        if token == "(" and out and out[-1] == "in":
+            in_list = True
+            out.append("[")  # IN (...) becomes a list so one-element lists stay lists
+        elif token == ")" and in_list:
+            in_list = False
+            out.append("]")
+        elif token in _KEYWORDS:
+            out.append(_KEYWORDS[token])
+        elif token[0] == "'" or "T" in token and token[0].isdigit():
+            out.append(repr(token.strip("'")))
+        elif token[0].isalpha() or token[0] == "_":
+            out.append(f"_r.get({token!r})")
+        else:
+            out.append(token)
+    return " ".join(out)
+
+def matches(record, where):
+    """Evaluate a WHERE clause of comparisons, IN lists, AND / OR and parentheses against a record.
+
+    Datetime literals compare as strings, so records hold them in the same
+    YYYY-MM-DDTHH:MM:SS.sssZ form the extractor writes.
+    """
+    if not where:
+        return True
+    return bool(eval(_where_to_python(where), {}, {'_r': record}))
+
+class FakeSalesforce:
+    """In-memory org served on 127.0.0.1; records maps object names to lists of field dicts."""
+
+    def __init__(self, records=None, page_size=2):
+        self.records = records or {}
+        self.page_size = page_size
+        self.limit_info = "api-usage=10/15000"
+        self.limits = {
+            'DailyApiRequests': {'Max': 15000, 'Remaining': 14990},
+            'DailyBulkV2QueryJobs': {'Max': 10000, 'Remaining': 10000},
+        }
+        # States a Bulk job reports on successive polls; the last one repeats
+        self.bulk_states = ["InProgress", "JobComplete"]
+        # Set to an error message to reject every Bulk job at creation
+        self.bulk_reject = None
+        # describe() payloads per object, served with an ETag and 304 on a matching If-None-Match
+        self.describes = {}
+        self.requests = []
+        self._cursors = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- lifecycle ---
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        threading.Thread(target=self._server.serve_forever, name="fake-salesforce", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def client(self):
+        from run_etl import connect_salesforce
+        return connect_salesforce({}, self.url, "fake-session")
+
+    # --- data ---
+
+    def select(self, soql, include_deleted=False):
+        fields, obj_name, where, order, direction, limit = parse_soql(soql)
+        rows = [r for r in self.records.get(obj_name, [])
+                if (include_deleted or not r.get('IsDeleted')) and matches(r, where)]
+        if order:
+            rows = sorted(rows, key=lambda r: r.get(order) or "", reverse=direction == "DESC")
+        return fields, obj_name, rows[:int(limit)] if limit else rows
+
+    def query(self, soql, include_deleted=False):
+        fields, obj_name, rows = self.select(soql, include_deleted)
+        if fields == ["COUNT()"]:
+            return {'totalSize': len(rows), 'done': True, 'records': []}
+        records = [{'attributes': {'type': obj_name}, **{f: r.get(f) for f in fields}} for r in rows]
+        with self._lock:
+            cursor = f"01g{len(self._cursors):015d}"
+            self._cursors[cursor] = records
+        return self.page(cursor, 0)
+
+    def page(self, cursor, offset):
+        records = self._cursors[cursor]
+        end = offset + self.page_size
+        body = {'totalSize': len(records), 'done': end >= len(records), 'records': records[offset:end]}
+        if not body['done']:
+            body['nextRecordsUrl'] = f"/services/data/v{API_VERSION}/query/{cursor}-{end}"
+        return body
+
+    def create_job(self, body):
+        if self.bulk_reject:
+            return 400, [{'errorCode': "INVALIDJOB", 'message': self.bulk_reject}], {}
+        fields, _, rows = self.select(body['query'], include_deleted=body.get('operation') == "queryAll")
+        with self._lock:
+            job_id = f"750{len(self._jobs):015d}"
+            self._jobs[job_id] = {'fields': fields, 'rows': rows, 'polls': 0}
+        return 200, {'id': job_id, 'operation': body.get('operation'), 'state': "UploadComplete"}, {}
+
+    def job_info(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return 404, [{'errorCode': "NOT_FOUND", 'message': f"Job {job_id} not found"}], {}
+        state = self.bulk_states[min(job['polls'], len(self.bulk_states) - 1)]
+        job['polls'] += 1
+        info = {'id': job_id, 'state': state, 'numberRecordsProcessed': len(job['rows'])}
+        if state == "Failed":
+            info['errorMessage'] = "Simulated failure"
+        return 200, info, {}
+
+    def job_results(self, job_id, query):
+        """One CSV page of a job's rows; the Sforce-Locator header is the next offset or 'null'."""
+        job = self._jobs[job_id]
+        offset = int(query.get('locator', ["0"])[0])
+        end = offset + int(query.get('maxRecords', [self.page_size])[0])
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(job['fields'])
+        for row in job['rows'][offset:end]:
+            writer.writerow(["" if row.get(f) is None else row.get(f) for f in job['fields']])
+        locator = str(end) if end < len(job['rows']) else "null"
+        return 200, out.getvalue(), {'Content-Type': "text/csv", 'Sforce-Locator': locator}
+
+    def describe(self, obj_name, if_none_match=None):
+        desc = self.describes.get(obj_name)
+        if desc is None:
+            return 404, [{'errorCode': "NOT_FOUND", 'message': f"The requested resource does not exist: {obj_name}"}], {}
+        etag = '"' + hashlib.sha1(json.dumps(desc, sort_keys=True).encode()).hexdigest()[:16] + '"'
+        if if_none_match == etag:
+            return 304, "", {'ETag': etag}
+        return 200, desc, {'ETag': etag}
+
+    # --- HTTP ---
+
+    def handle(self, method, path, query, body, headers=None):
+        """Return (status, payload, headers) for one request; subclasses add endpoints."""
+        if method == "GET":
+            match = re.search(r"/sobjects/(\w+)/describe/?$", path)
+            if match:
+                return self.describe(match.group(1), (headers or {}).get('If-None-Match'))
+            match = re.search(r"/(query|queryAll)/?$", path)
+            if match:
+                return 200, self.query(query['q'][0], include_deleted=match.group(1) == "queryAll"), {}
+            match = re.search(r"/(?:query|queryAll)/(\w+)-(\d+)$", path)
+            if match:
+                return 200, self.page(match.group(1), int(match.group(2))), {}
+            if path.endswith("/limits") or path.endswith("/limits/"):
+                return 200, self.limits, {}
+            match = re.search(r"/jobs/query/(\w+)/results$", path)
+            if match:
+                return self.job_results(match.group(1), query)
+            match = re.search(r"/jobs/query/(\w+)$", path)
+            if match:
+                return self.job_info(match.group(1))
+        if method == "POST" and path.endswith("/jobs/query"):
+            return self.create_job(body)
+        return 404, [{'errorCode': "NOT_FOUND", 'message': f"{method} {path}"}], {}
+
+def _handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, method):
+            url = urllib.parse.urlparse(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            fake.requests.append((method, url.path))
+            try:
+                status, payload, headers = fake.handle(method, url.path, urllib.parse.parse_qs(url.query), body,
+                                                       self.headers)
+            except ValueError as e:
+                status, payload, headers = 400, [{'errorCode': "MALFORMED_QUERY", 'message': str(e)}], {}
+            data = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", headers.pop("Content-Type", "application/json"))
+            self.send_header("Sforce-Limit-Info", fake.limit_info)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._respond("GET")
+
+        def do_POST(self):
+            self._respond("POST")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
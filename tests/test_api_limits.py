@@ -0,0 +1,100 @@
+import pytest
+
+from modules.api_budget import ApiBudget
+from modules.api_limits import ApiGovernor, ApiLimitExceeded, parse_limit_info
+from modules.etl_runner import run_etl
+
+ACCOUNTS = [{'Id': f"001{i:015d}", 'Name': f"Account {i}"} for i in range(5)]
+CONFIG = {
+    'mappings': [{'object': "Account", 'fields': ["Id", "Name"]}],
+    'transformations': {'Account': {'target_table': "accounts", 'field_map': {'Id': "sf_id", 'Name': "name"}}},
+    'load_order': ["Account"],
+    'api_reserve_pct': 10,
+}
+
+def limits(remaining, maximum=15000, bulk_remaining=10000):
+    return {'DailyApiRequests': {'Max': maximum, 'Remaining': remaining},
+            'DailyBulkV2QueryJobs': {'Max': 10000, 'Remaining': bulk_remaining}}
+
+@pytest.fixture
+def org(fake_sf, sqlite_conn):
+    fake_sf.records['Account'] = ACCOUNTS
+    fake_sf.bulk_states = ["JobComplete"]
+    sqlite_conn.execute("CREATE TABLE accounts (sf_id TEXT, name TEXT)")
+    sqlite_conn.commit()
+    return fake_sf
+
+def test_reserve_blocks_a_new_run(org, sqlite_conn):
+    # 1,000 of 15,000 left is below the 10% (1,500) reserve
+    org.limits = limits(1000)
+    org.limit_info = "api-usage=14000/15000"
+    results = run_etl(CONFIG, org.client(), sqlite_conn)
+
+    assert "reserved for other integrations" in results[0]['error']
+    assert [path for _, path in org.requests] == ["/services/data/v59.0/limits/"]
+    assert sqlite_conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0] == 0
+
+def test_run_within_the_allocation(org, sqlite_conn):
+    results = run_etl(CONFIG, org.client(), sqlite_conn)
+    assert results[0]['loaded'] == len(ACCOUNTS)
+
+@pytest.mark.parametrize("remaining, expected", [
+    (15000, None),      # plenty left: unthrottled
+    (4875, None),       # exactly 25% of the 13,500 above the reserve
+    (3000, 2.222),      # 1,500 above the reserve: 11% of it, so 5 calls/s * 0.11 / 0.25
+    (1510, 0.2),        # almost at the reserve: the floor
+])
+def test_rate_slows_below_a_quarter_of_the_headroom(remaining, expected):
+    governor = ApiGovernor(10, fetch=lambda sf: limits(remaining))
+    governor.refresh(None)
+    rate = governor.rate()
+    assert rate == expected if expected is None else rate == pytest.approx(expected, abs=1e-3)
+    governor.check()
+
+def test_rate_scales_the_configured_rate():
+    governor = ApiGovernor(10, fetch=lambda sf: limits(3000))
+    governor.refresh(None)
+    assert governor.rate(20.0) == pytest.approx(8.889, abs=1e-3)
+    assert governor.rate(20.0) < 20.0
+
+def test_budget_throttles_its_token_bucket(org):
+    governor = ApiGovernor(10, fetch=lambda sf: limits(3000))
+    budget = ApiBudget(governor=governor)
+    sf = budget.install(org.client())
+    governor.refresh(sf)
+    with budget.acquire():
+        pass
+    assert budget._bucket.rate == pytest.approx(2.222, abs=1e-3)
+
+@pytest.mark.parametrize("header, expected", [
+    ("api-usage=25/15000", (25, 15000)),
+    ("per-app-api-usage=3/100(appName=etl), api-usage=9000/15000", (9000, 15000)),
+    ("api-usage=12/5000;per-app-api-usage=1/10", (12, 5000)),
+    ("per-app-api-usage=3/100", None),
+    (None, None),
+])
+def test_parse_limit_info(header, expected):
+    assert parse_limit_info(header) == expected
+
+def test_observe_header_tracks_every_response(org):
+    governor = ApiGovernor(10, fetch=lambda sf: limits(14000))
+    budget = ApiBudget(governor=governor)
+    sf = budget.install(org.client())
+    governor.refresh(sf)
+    assert governor.available() == 12500
+
+    org.limit_info = "per-app-api-usage=3/100(appName=etl), api-usage=14200/15000"
+    sf.query("SELECT Id FROM Account")
+    assert governor.limits['DailyApiRequests'] == {'Max': 15000, 'Remaining': 800}
+    with pytest.raises(ApiLimitExceeded):
+        sf.query("SELECT Id FROM Account")
+
+@pytest.mark.parametrize("bulk_remaining, method", [(10000, "Bulk API 2.0"), (500, "REST")])
+def test_bulk_reserve_moves_auto_to_rest(org, sqlite_conn, bulk_remaining, method):
+    # 500 of 10,000 Bulk query jobs is below the 10% reserve
+    org.limits = limits(14990, bulk_remaining=bulk_remaining)
+    results = run_etl({**CONFIG, 'bulk_threshold': 1}, org.client(), sqlite_conn)
+
+    assert results[0]['extract_method'] == method
+    assert results[0]['loaded'] == len(ACCOUNTS)
+    assert (("POST", "/services/data/v59.0/jobs/query") in org.requests) == (method == "Bulk API 2.0")
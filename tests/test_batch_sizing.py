@@ -0,0 +1,44 @@
+from modules.batch_sizing import MAX_STEP, BatchSizer, batch_sizers, learned_batch_sizes
+
+def load(sizer, batches, seconds_per_row, bytes_per_row=100):
+    """Feed full batches with a constant per-row load time; returns the size before each batch."""
+    sizes = []
+    for _ in range(batches):
+        sizes.append(sizer.size)
+        sizer.observe(sizer.size, sizer.size * bytes_per_row, sizer.size * seconds_per_row)
+    return sizes
+
+def test_size_converges_to_the_target_latency():
+    sizer = BatchSizer(500, min_size=100, max_size=50000, target_seconds=2.0)
+    # 0.5 ms per row: 4000 rows take the 2 s target
+    sizes = load(sizer, 8, 0.0005)
+
+    assert sizes[:4] == [500, 1000, 2000, 4000]
+    assert all(b <= a * MAX_STEP for a, b in zip(sizes, sizes[1:]))
+    assert sizer.size == 4000 and sizer.converged
+
+def test_slow_loads_shrink_the_batch_within_min_size():
+    sizer = BatchSizer(8000, min_size=1000, max_size=20000, target_seconds=1.0)
+    assert load(sizer, 5, 0.01) == [8000, 4000, 2000, 1000, 1000]
+
+def test_max_allowed_packet_caps_the_size():
+    sizer = BatchSizer(1000, max_size=100000, target_seconds=10.0, max_packet=1_000_000)
+    load(sizer, 6, 0.00001, bytes_per_row=250)
+    # Half the packet over 250 bytes per row, even though the latency target allows far more
+    assert sizer.size == 2000
+
+def test_short_batches_do_not_move_the_size():
+    sizer = BatchSizer(1000)
+    sizer.observe(10, 1000, 5.0)
+    assert (sizer.size, sizer.observations, sizer.converged) == (1000, 0, False)
+
+def test_sizers_start_from_learned_sizes():
+    run_plan = [({'object': "Account"}, {}), ({'object': "Case", 'batch_size': 300}, {})]
+    config = {'adaptive_batch_size': True, 'batch_size_min': 200, 'batch_size_max': 5000}
+
+    sizers = batch_sizers(config, run_plan, 1000, learned={'Account': 9000})
+
+    assert {name: s.size for name, s in sizers.items()} == {'Account': 5000, 'Case': 300}
+    assert batch_sizers({}, run_plan, 1000) is None
+    assert learned_batch_sizes([{'object': "Account", 'batch_size': 4000}, {'object': "Case", 'error': "x"},
+                                {'object': "Lead"}]) == {'Account': 4000}
@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from modules.db import ConnectionPool
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path / "pool.db")
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+def test_returned_connections_are_reused(connect):
+    pool = ConnectionPool(connect, max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats() == {'max_size': 2, 'in_use': 0, 'idle': 1, 'created': 1, 'reconnects': 0}
+
+def test_borrowing_past_max_size_times_out(connect):
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(TimeoutError, match="pool size 1"):
+            with pool.connection():
+                pass
+    # The slot is free again once the first borrower returns
+    with pool.connection():
+        assert pool.stats()['in_use'] == 1
+
+def test_waiting_borrowers_share_max_size_connections(connect):
+    pool = ConnectionPool(connect, max_size=2, timeout=5)
+    peak, active, lock = [0], [0], threading.Lock()
+
+    def borrow():
+        with pool.connection() as conn:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            conn.execute("SELECT 1")
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=borrow) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    assert pool.stats()['created'] == 2 and pool.stats()['in_use'] == 0
+
+def test_uncommitted_work_is_rolled_back_on_return(connect):
+    pool = ConnectionPool(connect, max_size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+def test_stale_connections_are_replaced(connect):
+    pool = ConnectionPool(connect, max_size=1, health_check_interval=0)
+    with pool.connection() as conn:
+        stale = conn
+    stale.close()
+    with pool.connection() as conn:
+        assert conn is not stale
+        conn.execute("SELECT 1")
+    assert pool.stats()['reconnects'] == 1 and pool.stats()['created'] == 2
+
+def test_broken_connection_is_dropped_after_an_error(connect):
+    pool = ConnectionPool(connect, max_size=1)
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection() as conn:
+            conn.close()
+            conn.execute("SELECT 1")
+    assert pool.stats()['idle'] == 0
+    with pool.connection() as conn:
+        conn.execute("SELECT 1")
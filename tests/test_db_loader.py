@@ -0,0 +1,126 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from modules.db_loader import RowsRejected, frame_to_tsv, load_batch, write_isolating
+
+def make_table(conn):
+    conn.execute("CREATE TABLE target (sf_id TEXT PRIMARY KEY, name TEXT NOT NULL)")
+    conn.execute("INSERT INTO target VALUES ('001A', 'existing')")
+    conn.commit()
+
+def test_rejected_rows_are_isolated_and_the_rest_committed(sqlite_conn):
+    make_table(sqlite_conn)
+    frame = pd.DataFrame({'sf_id': ["001B", "001A", "001C", "001D", "001E"],
+                          'name': ["b", "duplicate", None, "d", "e"]})
+    rejected = []
+    loaded = load_batch(sqlite_conn, "target", ["sf_id", "name"], frame, rejected=rejected)
+
+    assert loaded == 3
+    assert [label for label, _ in rejected] == [1, 2]
+    assert all(reason.startswith("IntegrityError") for _, reason in rejected)
+    rows = sqlite_conn.execute("SELECT sf_id FROM target ORDER BY sf_id").fetchall()
+    assert [r[0] for r in rows] == ["001A", "001B", "001D", "001E"]
+
+def test_savepoints_are_named_per_depth_and_released(sqlite_conn):
+    make_table(sqlite_conn)
+    statements = []
+    sqlite_conn.set_trace_callback(statements.append)
+    frame = pd.DataFrame({'sf_id': ["001B", "001A", "001C", "001D"], 'name': ["b", "a", "c", "d"]})
+
+    def write(part):
+        sqlite_conn.executemany("INSERT INTO target VALUES (?, ?)", part.itertuples(index=False))
+        return len(part)
+
+    rejected = []
+    assert write_isolating(sqlite_conn, write, frame, rejected) == 3
+    sqlite_conn.set_trace_callback(None)
+    savepoints = [s for s in statements if "SAVEPOINT" in s]
+
+    # The batch runs in an explicit transaction, so releasing the outer savepoint commits nothing
+    assert statements[0] == "BEGIN"
+    assert sqlite_conn.in_transaction
+    assert savepoints == [
+        "SAVEPOINT etl_batch_rows_0", "ROLLBACK TO SAVEPOINT etl_batch_rows_0",
+        "SAVEPOINT etl_batch_rows_1", "ROLLBACK TO SAVEPOINT etl_batch_rows_1",
+        "SAVEPOINT etl_batch_rows_2", "RELEASE SAVEPOINT etl_batch_rows_2",
+        "SAVEPOINT etl_batch_rows_2", "ROLLBACK TO SAVEPOINT etl_batch_rows_2", "RELEASE SAVEPOINT etl_batch_rows_2",
+        "RELEASE SAVEPOINT etl_batch_rows_1",
+        "SAVEPOINT etl_batch_rows_1", "RELEASE SAVEPOINT etl_batch_rows_1",
+        "RELEASE SAVEPOINT etl_batch_rows_0",
+    ]
+    assert [label for label, _ in rejected] == [1]
+
+def committed(path, sql):
+    """What another connection sees, i.e. only committed rows."""
+    other = sqlite3.connect(path)
+    try:
+        return [r[0] for r in other.execute(sql)]
+    finally:
+        other.close()
+
+def test_rejected_rows_commit_or_roll_back_with_their_batch(sqlite_conn, tmp_path):
+    make_table(sqlite_conn)
+    sqlite_conn.execute("CREATE TABLE dead_letters (label TEXT, reason TEXT)")
+    sqlite_conn.commit()
+    frame = pd.DataFrame({'sf_id': ["001B", "001C"], 'name': ["b", None]})
+
+    def record_rejects(fail):
+        def before_commit(conn):
+            conn.executemany("INSERT INTO dead_letters VALUES (?, ?)", [(str(l), r) for l, r in rejected])
+            if fail:
+                raise RuntimeError("checkpoint write failed")
+        return before_commit
+
+    rejected = []
+    with pytest.raises(RuntimeError):
+        load_batch(sqlite_conn, "target", ["sf_id", "name"], frame, before_commit=record_rejects(True),
+                   rejected=rejected)
+    # Neither the kept row nor the dead letter survived the failed commit
+    assert committed(tmp_path / "etl.db", "SELECT name FROM target ORDER BY sf_id") == ["existing"]
+    assert committed(tmp_path / "etl.db", "SELECT label FROM dead_letters") == []
+
+    rejected = []
+    assert load_batch(sqlite_conn, "target", ["sf_id", "name"], frame, before_commit=record_rejects(False),
+                      rejected=rejected) == 1
+    assert committed(tmp_path / "etl.db", "SELECT name FROM target ORDER BY sf_id") == ["existing", "b"]
+    assert committed(tmp_path / "etl.db", "SELECT label FROM dead_letters") == ["1"]
+
+def test_rows_load_data_only_warns_about_are_rejected(sqlite_conn):
+    make_table(sqlite_conn)
+    frame = pd.DataFrame({'sf_id': ["001B", "001A", "001C"], 'name': ["b", "duplicate", "c"]})
+
+    def load_ignoring(part):
+        # Like LOAD DATA LOCAL (implied IGNORE): good rows go in, the duplicate only shows up as a warning
+        cur = sqlite_conn.executemany("INSERT OR IGNORE INTO target VALUES (?, ?)", part.itertuples(index=False))
+        if cur.rowcount != len(part):
+            raise RowsRejected(f"LOAD DATA loaded {cur.rowcount} of {len(part)} rows; "
+                               "Warning 1062: Duplicate entry '001A' for key 'PRIMARY'")
+        return len(part)
+
+    rejected = []
+    assert write_isolating(sqlite_conn, load_ignoring, frame, rejected) == 2
+    assert rejected == [(1, "RowsRejected: LOAD DATA loaded 0 of 1 rows; "
+                            "Warning 1062: Duplicate entry '001A' for key 'PRIMARY'")]
+    rows = sqlite_conn.execute("SELECT sf_id, name FROM target ORDER BY sf_id").fetchall()
+    assert rows == [("001A", "existing"), ("001B", "b"), ("001C", "c")]
+
+def test_tsv_writes_numbers_positionally():
+    frame = pd.DataFrame({
+        'amount': [0.00001, 1e20, 0.1 + 0.2, 12.0, None],
+        'count': pd.array([1, None, 3, 4, 5], dtype="Int64"),
+        # Object columns bound for numeric targets (e.g. mixed REST values) are formatted too
+        'raw': pd.Series([1.5e-7, "42", None, 7, 2.25], dtype=object),
+        'note': pd.Series([1.5e-7, "a\tb", None, "c", "d"], dtype=object),
+    })
+
+    tsv = frame_to_tsv(frame, {'amount': "number", 'count': "number", 'raw': "number"})
+
+    assert tsv.splitlines() == [
+        "0.00001\t1\t0.00000015\t1.5e-07",
+        "100000000000000000000\t\\N\t42\ta\\tb",
+        "0.3\t3\t\\N\t\\N",
+        "12\t4\t7\tc",
+        "\\N\t5\t2.25\td",
+    ]
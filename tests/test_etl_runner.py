@@ -0,0 +1,179 @@
+import pytest
+from modules import etl_runner
+from modules.etl_runner import run_etl
+from modules.db_loader import LOAD_STRATEGIES
+from modules.dead_letters import load_dead_letters
+from modules.state_store import get_batch_sizes, get_checkpoint, save_batch_sizes, save_checkpoint
+
+ACCOUNTS = [
+    {'Id': f"001{i:015d}", 'Name': f"Account {i}", 'AnnualRevenue': str(i * 1000.5), 'Industry': "Tech" if i % 2 else None}
+    for i in range(7)
+]
+
+def account_config(strategy, **etl):
+    return {
+        'mappings': [{'object': "Account", 'fields': ["Id", "Name", "AnnualRevenue", "Industry"]}],
+        'transformations': {'Account': {
+            'target_table': "accounts",
+            'field_map': {'Id': "sf_id", 'Name': "name", 'AnnualRevenue': "revenue", 'Industry': "industry"},
+            'field_configs': {'AnnualRevenue': {'type': "To Number", 'decimal_places': 1}},
+            'load_strategy': strategy,
+            'match_key': "sf_id",
+        }},
+        'load_order': ["Account"],
+        'batch_size': 3,
+        **etl,
+    }
+
+def create_accounts_table(conn):
+    conn.execute("CREATE TABLE accounts (sf_id TEXT PRIMARY KEY, name TEXT, revenue REAL, industry TEXT)")
+    conn.commit()
+
+def loaded_rows(conn):
+    return conn.execute("SELECT sf_id, name, revenue, industry FROM accounts ORDER BY sf_id").fetchall()
+
+EXPECTED = [(r['Id'], r['Name'], round(float(r['AnnualRevenue']), 1), r['Industry']) for r in ACCOUNTS]
+
+@pytest.mark.parametrize("strategy", LOAD_STRATEGIES)
+@pytest.mark.parametrize("pipeline_depth", [0, 2])
+def test_streams_paged_query_into_sqlite(fake_sf, sqlite_conn, strategy, pipeline_depth):
+    fake_sf.records['Account'] = [dict(r) for r in ACCOUNTS]
+    create_accounts_table(sqlite_conn)
+
+    results = run_etl(account_config(strategy, pipeline_depth=pipeline_depth), fake_sf.client(), sqlite_conn)
+
+    assert len(results) == 1 and 'error' not in results[0], results
+    result = results[0]
+    assert result['extract_method'] == "REST"
+    assert (result['extracted'], result['loaded'], result['batches']) == (7, 7, 3)
+    assert loaded_rows(sqlite_conn) == EXPECTED
+    # page_size 2 means the 7 records arrived through the query plus three queryMore calls
+    assert sum(1 for method, path in fake_sf.requests if "/query/01g" in path) == 3
+
+@pytest.mark.parametrize("strategy, expected_rows", [
+    ("INSERT", 9), ("MERGE (UPSERT)", 7), ("OVERWRITE", 2),
+])
+def test_second_run_per_strategy(fake_sf, sqlite_conn, strategy, expected_rows):
+    fake_sf.records['Account'] = [dict(r) for r in ACCOUNTS]
+    sqlite_conn.execute("CREATE TABLE accounts (sf_id TEXT, name TEXT, revenue REAL, industry TEXT)")
+    sqlite_conn.commit()
+    config = account_config(strategy)
+    config['transformations']['Account']['create_match_index'] = strategy == "MERGE (UPSERT)"
+    run_etl(config, fake_sf.client(), sqlite_conn)
+
+    fake_sf.records['Account'] = [dict(r, Name="Renamed") for r in ACCOUNTS[:2]]
+    results = run_etl(config, fake_sf.client(), sqlite_conn)
+
+    assert 'error' not in results[0], results
+    rows = loaded_rows(sqlite_conn)
+    assert len(rows) == expected_rows
+    if strategy != "INSERT":
+        # MERGE updates the two rows in place; OVERWRITE replaces the table with just them
+        assert {r[0] for r in rows if r[1] == "Renamed"} == {r['Id'] for r in ACCOUNTS[:2]}
+
+def test_learned_batch_sizes_live_in_the_database(fake_sf, sqlite_conn):
+    fake_sf.records['Account'] = [dict(r) for r in ACCOUNTS] * 3
+    sqlite_conn.execute("CREATE TABLE accounts (sf_id TEXT, name TEXT, revenue REAL, industry TEXT)")
+    config = account_config("INSERT", batch_size=2, adaptive_batch_size=True, batch_size_min=2, batch_size_max=2)
+
+    result = run_etl(config, fake_sf.client(), sqlite_conn)[0]
+    assert (result['batches'], result['batch_size']) == (11, 2)
+    assert get_batch_sizes(sqlite_conn) == {'Account': 2}
+    assert 'batch_size' not in config['mappings'][0]
+
+    # The next run starts from the stored size rather than the configured one
+    save_batch_sizes(sqlite_conn, {'Account': 7})
+    config.update(batch_size_min=1, batch_size_max=7)
+    result = run_etl(config, fake_sf.client(), sqlite_conn)[0]
+    assert result['batches'] == 3
+
+CONTACTS = [{'Id': f"003{i:015d}", 'LastName': f"Contact {i}", 'AccountId': ACCOUNTS[i % 3]['Id']} for i in range(5)]
+CASES = [{'Id': f"500{i:015d}", 'Subject': f"Case {i}", 'ContactId': CONTACTS[i]['Id']} for i in range(4)]
+
+def three_object_config(**etl):
+    config = account_config("INSERT", **etl)
+    config['mappings'] += [{'object': "Contact", 'fields': ["Id", "LastName", "AccountId"]},
+                           {'object': "Case", 'fields': ["Id", "Subject", "ContactId"]}]
+    config['transformations'].update({
+        'Contact': {'target_table': "contacts", 'load_strategy': "INSERT",
+                    'field_map': {'Id': "sf_id", 'LastName': "last_name", 'AccountId': "account_id"}},
+        'Case': {'target_table': "cases", 'load_strategy': "INSERT",
+                 'field_map': {'Id': "sf_id", 'Subject': "subject", 'ContactId': "contact_id"}},
+    })
+    # Contacts reference accounts and cases reference contacts, so they load in this order
+    config['load_order'] = ["Account", "Contact", "Case"]
+    return config
+
+def seed_three_objects(fake_sf, conn, contacts_table=True):
+    fake_sf.records.update({'Account': [dict(r) for r in ACCOUNTS], 'Contact': [dict(r) for r in CONTACTS],
+                            'Case': [dict(r) for r in CASES]})
+    create_accounts_table(conn)
+    if contacts_table:
+        conn.execute("CREATE TABLE contacts (sf_id TEXT PRIMARY KEY, last_name TEXT, account_id TEXT)")
+    conn.execute("CREATE TABLE cases (sf_id TEXT PRIMARY KEY, subject TEXT, contact_id TEXT)")
+    conn.commit()
+
+def test_parallel_extraction_keeps_results_and_load_order(fake_sf, sqlite_conn):
+    seed_three_objects(fake_sf, sqlite_conn)
+    inserts = []
+    sqlite_conn.set_trace_callback(lambda sql: sql.startswith("INSERT INTO `") and inserts.append(sql.split()[2]))
+
+    results = run_etl(three_object_config(parallel_workers=3), fake_sf.client(), sqlite_conn)
+
+    sqlite_conn.set_trace_callback(None)
+    assert [r['object'] for r in results] == ["Account", "Contact", "Case"]
+    assert all('error' not in r for r in results), results
+    assert [(r['extracted'], r['loaded']) for r in results] == [(7, 7), (5, 5), (4, 4)]
+    assert all('wait_seconds' in r for r in results)
+    # Every object's rows are written before the next object's, whatever order extraction finished in
+    targets = [t.strip("`") for t in inserts]
+    assert targets == sorted(targets, key=["accounts", "contacts", "cases"].index)
+    assert set(targets) == {"accounts", "contacts", "cases"}
+    assert loaded_rows(sqlite_conn) == EXPECTED
+    assert sqlite_conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0] == 5
+    assert sqlite_conn.execute("SELECT COUNT(*) FROM cases").fetchone()[0] == 4
+
+def test_parallel_failure_stops_dependent_objects(fake_sf, sqlite_conn):
+    seed_three_objects(fake_sf, sqlite_conn, contacts_table=False)
+
+    results = run_etl(three_object_config(parallel_workers=3), fake_sf.client(), sqlite_conn)
+
+    assert [r['object'] for r in results] == ["Account", "Contact"]
+    assert results[0]['loaded'] == 7 and 'error' not in results[0]
+    assert "contacts" in results[1]['error']
+    # Case was extracted concurrently but never loaded, since it depends on the failed Contact load
+    assert sqlite_conn.execute("SELECT COUNT(*) FROM cases").fetchone()[0] == 0
+
+def test_interrupted_run_resumes_after_its_last_committed_batch(fake_sf, sqlite_conn, monkeypatch):
+    fake_sf.records['Account'] = [dict(r) for r in ACCOUNTS]
+    # No primary key, so a batch loaded twice would show up as duplicate rows
+    sqlite_conn.execute("CREATE TABLE accounts (sf_id TEXT, name TEXT, revenue REAL, industry TEXT)")
+    sqlite_conn.commit()
+    config = account_config("INSERT")
+    config['transformations']['Account']['field_configs']['Name'] = {
+        'type': "Enum Mapping", 'enum_map': {f"Account {i}": f"Account {i}" for i in range(7) if i != 4},
+        'on_error': "Reject Row"}
+    saved = []
+
+    def failing_checkpoint(conn, obj_name, checkpoint):
+        # The third batch fails after its rows and dead letters are written but before it commits
+        if checkpoint['batch_no'] == 3:
+            raise RuntimeError("connection lost")
+        saved.append(checkpoint['batch_no'])
+        save_checkpoint(conn, obj_name, checkpoint)
+
+    monkeypatch.setattr(etl_runner, "save_checkpoint", failing_checkpoint)
+    failed = run_etl(config, fake_sf.client(), sqlite_conn)[0]
+    assert failed['error'] == "connection lost" and saved == [1, 2]
+    assert len(loaded_rows(sqlite_conn)) == 5
+    assert [r['source_id'] for r in load_dead_letters(sqlite_conn, "Account")] == [ACCOUNTS[4]['Id']]
+
+    monkeypatch.undo()
+    resumed = run_etl(config, fake_sf.client(), sqlite_conn)[0]
+
+    assert 'error' not in resumed, resumed
+    assert resumed['resumed_after_batch'] == 2
+    assert (resumed['batches'], resumed['extracted'], resumed['loaded']) == (3, 7, 6)
+    assert loaded_rows(sqlite_conn) == [row for row in EXPECTED if row[0] != ACCOUNTS[4]['Id']]
+    assert [r['source_id'] for r in load_dead_letters(sqlite_conn, "Account")] == [ACCOUNTS[4]['Id']]
+    assert get_checkpoint(sqlite_conn, "Account") is None
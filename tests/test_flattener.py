@@ -0,0 +1,71 @@
+from modules.flattener import build_layout, component_key, expand_fields, flatten_records, resolve_field
+
+ACCOUNT = {'name': "Account", 'fields': [
+    {'name': "Id", 'type': "id"},
+    {'name': "Name", 'type': "string"},
+    {'name': "BillingAddress", 'type': "address"},
+    {'name': "BillingStreet", 'type': "textarea", 'compoundFieldName': "BillingAddress"},
+    {'name': "BillingCity", 'type': "string", 'compoundFieldName': "BillingAddress"},
+    {'name': "Site__c", 'type': "location"},
+    {'name': "Site__Latitude__s", 'type': "double", 'compoundFieldName': "Site__c"},
+    {'name': "Site__Longitude__s", 'type': "double", 'compoundFieldName': "Site__c"},
+    {'name': "OwnerId", 'type': "reference", 'relationshipName': "Owner", 'referenceTo': ["User"]},
+]}
+USER = {'name': "User", 'fields': [
+    {'name': "Name", 'type': "string"},
+    {'name': "ProfileId", 'type': "reference", 'relationshipName': "Profile", 'referenceTo': ["Profile"]},
+]}
+PROFILE = {'name': "Profile", 'fields': [{'name': "Name", 'type': "string"}]}
+
+def test_component_keys_match_the_rest_compound_value():
+    assert component_key("BillingAddress", "BillingStreet") == "street"
+    assert component_key("MailingAddress", "MailingPostalCode") == "postalCode"
+    assert component_key("Site__c", "Site__Latitude__s") == "latitude"
+
+def test_compounds_expand_into_their_components():
+    assert expand_fields(ACCOUNT, ["Id", "BillingAddress", "BillingCity", "Site__c"]) == [
+        "Id", "BillingAddress", "BillingStreet", "BillingCity", "Site__c", "Site__Latitude__s", "Site__Longitude__s"]
+    # Without a describe nothing is known to be compound
+    assert expand_fields(None, ["BillingAddress"]) == ["BillingAddress"]
+
+def test_layout_queries_components_and_splits_relationship_paths():
+    layout = build_layout(ACCOUNT, ["Id", "BillingAddress", "BillingCity", "Owner.Profile.Name"])
+    assert layout['select'] == ["Id", "BillingStreet", "BillingCity", "Owner.Profile.Name"]
+    assert layout['paths']['Owner.Profile.Name'] == ("Owner", "Profile", "Name")
+    assert layout['compounds'] == {'BillingAddress': [("BillingStreet", "street"), ("BillingCity", "city")]}
+
+def test_rest_records_flatten_nested_relationships_and_compounds():
+    fields = ["Id", "BillingAddress", "BillingCity", "Owner.Name", "Owner.Profile.Name"]
+    layout = build_layout(ACCOUNT, fields)
+    records = [
+        {'Id': "001A", 'BillingStreet': "1 Main St", 'BillingCity': "Seoul",
+         'Owner': {'Name': "Kim", 'Profile': {'Name': "Admin"}}},
+        {'Id': "001B", 'BillingStreet': None, 'BillingCity': None, 'Owner': None},
+    ]
+
+    frame = flatten_records(records, layout, fields)
+
+    assert list(frame.columns) == fields
+    assert frame.loc[0, 'BillingAddress'] == '{"street": "1 Main St", "city": "Seoul"}'
+    assert frame.loc[0, 'BillingCity'] == "Seoul"
+    assert frame.loc[0, ['Owner.Name', 'Owner.Profile.Name']].tolist() == ["Kim", "Admin"]
+    # An empty compound and a missing parent relationship are both NULL
+    assert frame.loc[1].drop('Id').isna().all()
+
+def test_bulk_csv_records_use_their_flat_columns():
+    fields = ["Id", "Owner.Profile.Name", "Site__Latitude__s"]
+    layout = build_layout(ACCOUNT, fields)
+    records = [{'Id': "001A", 'Owner.Profile.Name': "Admin", 'Site__Latitude__s': "37.5"}]
+    frame = flatten_records(records, layout, fields)
+    assert frame.iloc[0].tolist() == ["001A", "Admin", "37.5"]
+
+def test_empty_batches_keep_every_column():
+    fields = ["Id", "BillingAddress", "Owner.Name"]
+    frame = flatten_records([], build_layout(ACCOUNT, fields), fields)
+    assert list(frame.columns) == fields and frame.empty
+
+def test_relationship_fields_resolve_through_describes():
+    describes = {'User': USER, 'Profile': PROFILE}
+    assert resolve_field(describes.get, ACCOUNT, "Owner.Profile.Name") == {'name': "Name", 'type': "string"}
+    assert resolve_field(describes.get, ACCOUNT, "Parent.Name") is None
+    assert resolve_field(describes.get, ACCOUNT, "Name")['type'] == "string"
@@ -0,0 +1,54 @@
+from modules.etl_runner import run_etl
+from modules.sf_extract import advance_watermark, build_delta_where, iter_deleted_ids
+from modules.state_store import get_watermark
+from test_etl_runner import account_config, create_accounts_table
+
+T0, T1, T2 = "2024-01-01T00:00:00.000Z", "2024-01-02T00:00:00.000Z", "2024-01-03T00:00:00.000Z"
+
+def account(i, ts, **fields):
+    return {'Id': f"001{i:015d}", 'Name': f"Account {i}", 'AnnualRevenue': "1.0", 'Industry': None,
+            'SystemModstamp': ts, 'IsDeleted': False, **fields}
+
+def incremental_config():
+    config = account_config("MERGE (UPSERT)")
+    config['mappings'][0]['incremental'] = True
+    return config
+
+def test_delta_where_breaks_timestamp_ties_on_id():
+    watermark = {'field': "SystemModstamp", 'ts': T1, 'id': "001B"}
+    assert build_delta_where(watermark) == f"(SystemModstamp > {T1} OR (SystemModstamp = {T1} AND Id > '001B'))"
+
+def test_advance_watermark_keeps_the_highest_timestamp_and_id():
+    records = [{'Id': "001A", 'SystemModstamp': "2024-01-02T00:00:00+00:00"},
+               {'Id': "001C", 'SystemModstamp': "2024-01-01T09:00:00+09:00"},
+               {'Id': "001B", 'SystemModstamp': T1}, {'Id': "001D", 'SystemModstamp': None}]
+    assert advance_watermark(None, records, "SystemModstamp") == {'field': "SystemModstamp", 'ts': T1, 'id': "001B"}
+    newer = {'field': "SystemModstamp", 'ts': T2, 'id': "001A"}
+    assert advance_watermark(newer, records, "SystemModstamp") == newer
+    assert advance_watermark(None, [records[3]], "SystemModstamp") is None
+
+def test_deletes_stamped_at_the_watermark_are_included(fake_sf):
+    fake_sf.records['Account'] = [account(1, T0, IsDeleted=True), account(2, T1, IsDeleted=True),
+                                  account(3, T2, IsDeleted=True), account(4, T2)]
+    watermark = {'field': "SystemModstamp", 'ts': T1, 'id': account(2, T1)['Id']}
+    assert list(iter_deleted_ids(fake_sf.client(), "Account", watermark)) == [account(2, T1)['Id'], account(3, T2)['Id']]
+
+def test_second_run_loads_changes_and_propagates_deletes(fake_sf, sqlite_conn):
+    fake_sf.records['Account'] = [account(i, T1) for i in range(4)]
+    create_accounts_table(sqlite_conn)
+    first = run_etl(incremental_config(), fake_sf.client(), sqlite_conn)[0]
+    assert first['loaded'] == 4
+    assert get_watermark(sqlite_conn, "Account")['ts'] == T1
+
+    # Row 3 is deleted in the same instant the watermark holds; row 1 changes later; a new row 4 appears
+    fake_sf.records['Account'][3]['IsDeleted'] = True
+    fake_sf.records['Account'][1].update(Name="Renamed", SystemModstamp=T2)
+    fake_sf.records['Account'].append(account(4, T2))
+    second = run_etl(incremental_config(), fake_sf.client(), sqlite_conn)[0]
+
+    assert 'error' not in second, second
+    assert second['extracted'] == 2
+    rows = dict(sqlite_conn.execute("SELECT sf_id, name FROM accounts").fetchall())
+    assert sorted(rows) == [account(i, T1)['Id'] for i in (0, 1, 2, 4)]
+    assert rows[account(1, T1)['Id']] == "Renamed"
+    assert get_watermark(sqlite_conn, "Account") == {'field': "SystemModstamp", 'ts': T2, 'id': account(4, T2)['Id']}
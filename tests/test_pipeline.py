@@ -0,0 +1,95 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from modules.pipeline import pipelined, prefetch, stage_utilization
+
+current_object = contextvars.ContextVar("current_object", default=None)
+
+class Source:
+    """Generator-like source that records how far it was iterated and whether it was closed."""
+
+    def __init__(self, count, fail_at=None):
+        self.produced = 0
+        self.closed = False
+        self._items = self._generate(count, fail_at)
+
+    def _generate(self, count, fail_at):
+        for i in range(count):
+            if i == fail_at:
+                raise ValueError(f"page {i} failed")
+            self.produced += 1
+            yield i
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._items)
+
+    def close(self):
+        self.closed = True
+        self._items.close()
+
+def pipeline_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("etl-")]
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_items_keep_their_order(depth):
+    assert list(pipelined(Source(50), lambda i: i * 2, depth)) == [i * 2 for i in range(50)]
+
+def test_producer_stays_at_most_depth_ahead():
+    source = Source(20)
+    lead = []
+    for consumed, _ in enumerate(prefetch(source, depth=2), 1):
+        time.sleep(0.01)
+        lead.append(source.produced - consumed)
+    # depth items queued plus the one the producer holds while it waits for room
+    assert max(lead) <= 3
+    assert source.closed
+
+def test_producer_errors_reach_the_consumer_after_the_items_before_them():
+    received = []
+    with pytest.raises(ValueError, match="page 3 failed"):
+        for item in prefetch(Source(10, fail_at=3), depth=2):
+            received.append(item)
+    assert received == [0, 1, 2]
+    assert not pipeline_threads()
+
+def test_transform_errors_stop_the_extract_stage():
+    source = Source(100)
+
+    def transform(i):
+        if i == 5:
+            raise KeyError("bad row")
+        return i
+
+    with pytest.raises(KeyError):
+        list(pipelined(source, transform, depth=2))
+    assert source.closed and source.produced < 100
+    assert not pipeline_threads()
+
+def test_closing_early_stops_every_stage():
+    source = Source(1000)
+    items = pipelined(source, lambda i: i, depth=2)
+    assert [next(items), next(items)] == [0, 1]
+
+    items.close()
+
+    assert source.closed and source.produced < 1000
+    assert not pipeline_threads()
+
+def test_producer_runs_in_the_callers_context():
+    token = current_object.set("Account")
+    try:
+        seen = list(prefetch((current_object.get() for _ in range(3)), depth=1))
+    finally:
+        current_object.reset(token)
+    assert seen == ["Account"] * 3
+
+def test_stage_utilization_is_capped_at_the_wall_time():
+    result = {'seconds': 10, 'extract_seconds': 9.5, 'transform_seconds': 2, 'load_seconds': 12}
+    assert stage_utilization(result) == {'extract': 0.95, 'transform': 0.2, 'load': 1.0}
+    assert stage_utilization({'seconds': 0}) == {}
@@ -0,0 +1,45 @@
+from modules.api_budget import ApiBudget
+from modules.etl_runner import run_etl
+from modules.pk_chunking import open_chunked_stream
+from modules.run_history import load_chunks
+
+ACCOUNTS = [{'Id': f"001{i:012d}AAA", 'Name': f"Account {i}"} for i in range(1, 21)]
+MAPPING = {'object': "Account", 'fields': ["Id", "Name"], 'extract_method': "REST", 'pk_chunk_size': 5}
+
+def test_chunks_cover_every_record_once(fake_sf):
+    fake_sf.records = {'Account': ACCOUNTS}
+    method, stream = open_chunked_stream(fake_sf.client(), MAPPING, workers=3)
+    assert method == "REST"
+    assert sorted(r['Id'] for r in stream) == [a['Id'] for a in ACCOUNTS]
+
+def test_chunk_worker_calls_are_attributed_to_the_object(fake_sf):
+    fake_sf.records = {'Account': ACCOUNTS}
+    sf = fake_sf.client()
+    budget = ApiBudget(max_concurrent=3)
+    budget.install(sf)
+    with budget.track("Account"):
+        _, stream = open_chunked_stream(sf, MAPPING, workers=3)
+        assert len(list(stream)) == len(ACCOUNTS)
+
+    # COUNT(), the two Id bounds and at least one query per chunk, all made under the object's tag
+    assert budget.calls > 3
+    assert budget.usage == {'Account': {'api_calls': budget.calls, 'bytes': budget.bytes}}
+
+def test_chunk_progress_is_recorded_with_the_run(fake_sf, sqlite_conn):
+    fake_sf.records = {'Account': ACCOUNTS}
+    sqlite_conn.execute("CREATE TABLE accounts (sf_id TEXT PRIMARY KEY, name TEXT)")
+    config = {
+        'mappings': [{**MAPPING, 'pk_chunk_workers': 3}],
+        'transformations': {'Account': {'target_table': "accounts", 'field_map': {'Id': "sf_id", 'Name': "name"}}},
+    }
+
+    result = run_etl(config, fake_sf.client(), sqlite_conn)[0]
+
+    assert result['loaded'] == len(ACCOUNTS)
+    assert len(result['chunks']) > 1 and all(c['done'] for c in result['chunks'])
+    assert sum(c['rows'] for c in result['chunks']) == len(ACCOUNTS)
+    run_id = sqlite_conn.execute("SELECT run_id FROM etl_runs").fetchone()[0]
+    recorded = load_chunks(sqlite_conn, [run_id])
+    assert [(c['chunk_no'], c['rows_extracted'], c['done']) for c in recorded] == [
+        (n, c['rows'], 1) for n, c in enumerate(result['chunks'], 1)]
+    assert recorded[0]['id_from'] is None and recorded[-1]['id_to'] is None
@@ -0,0 +1,75 @@
+import json
+
+from modules.db import ConnectionPool
+from modules.scheduler import JOB_ID, ScheduleWorker, apply_saved_schedules, saved_schedules, schedule_jobs
+from modules.state_store import (ensure_state_tables, get_etl_config, get_schedule_configs, save_etl_config,
+                                  save_schedule_configs)
+
+CONFIG = {
+    'schedule_config': {'is_active': False, 'frequency': "Daily", 'run_time': "09:00:00"},
+    'etl_config': {'mappings': [
+        {'object': "Account", 'fields': ["Id"]},
+        {'object': "Opportunity", 'fields': ["Id"], 'schedule': {'frequency': "Inherit"}},
+    ]},
+}
+
+def test_schedules_round_trip_through_the_database(sqlite_conn):
+    ensure_state_tables(sqlite_conn)
+    config = json.loads(json.dumps(CONFIG))
+    config['schedule_config']['is_active'] = True
+    config['etl_config']['mappings'][1]['schedule'] = {'frequency': "Every N Minutes", 'interval_minutes': 15}
+    save_schedule_configs(sqlite_conn, saved_schedules(config))
+
+    saved = get_schedule_configs(sqlite_conn)
+    assert set(saved) == {JOB_ID, "object:Account", "object:Opportunity"}
+    applied = apply_saved_schedules(CONFIG, saved)
+    assert set(schedule_jobs(applied)) == {JOB_ID, "object:Opportunity"}
+    assert schedule_jobs(applied)[JOB_ID]['objects'] == ["Account"]
+    # The file's config is left as it was
+    assert schedule_jobs(CONFIG) == {}
+
+def test_saving_replaces_previous_schedules(sqlite_conn):
+    ensure_state_tables(sqlite_conn)
+    save_schedule_configs(sqlite_conn, {JOB_ID: {'is_active': True}, "object:Case": {'frequency': "Hourly"}})
+    save_schedule_configs(sqlite_conn, {JOB_ID: {'is_active': False}})
+    assert get_schedule_configs(sqlite_conn) == {JOB_ID: {'is_active': False}}
+
+def test_worker_reads_the_schedule_from_the_database(tmp_path, sqlite_conn):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(CONFIG))
+    ensure_state_tables(sqlite_conn)
+    worker = ScheduleWorker(str(config_path), ConnectionPool(lambda: sqlite_conn), run_fn=None)
+    assert worker._read_config(sqlite_conn)['schedule_config']['is_active'] is False
+
+    save_schedule_configs(sqlite_conn, {JOB_ID: {**CONFIG['schedule_config'], 'is_active': True}})
+    assert set(schedule_jobs(worker._read_config(sqlite_conn))) == {JOB_ID}
+
+def test_a_job_never_runs_twice_at_once(tmp_path, sqlite_conn):
+    config = json.loads(json.dumps(CONFIG))
+    config['schedule_config']['is_active'] = True
+    config['etl_config']['mappings'][0]['schedule'] = {'frequency': "Hourly", 'max_concurrent': 4}
+    worker = ScheduleWorker(str(tmp_path / "config.json"), ConnectionPool(lambda: sqlite_conn), run_fn=None)
+    worker._jobs = schedule_jobs(config)
+    worker._config = {'schedule_config': {'max_db_writers': 8}}
+    worker._running = {"object:Account": 1}
+    worker._pending = {"object:Account": None}
+    worker.dispatch()
+    assert worker._pending == {"object:Account": None}
+
+def test_worker_runs_the_etl_config_saved_in_the_database(tmp_path, sqlite_conn, caplog):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(CONFIG))
+    ensure_state_tables(sqlite_conn)
+    worker = ScheduleWorker(str(config_path), ConnectionPool(lambda: sqlite_conn), run_fn=None)
+
+    # Nothing saved from the app yet: the file's mappings run, with a warning
+    assert worker._read_config(sqlite_conn)['etl_config'] == CONFIG['etl_config']
+    assert "No etl_config saved in the database" in caplog.text
+
+    saved = {'mappings': [{'object': "Case", 'fields': ["Id", "Subject"]}],
+             'transformations': {'Case': {'target_table': "cases"}}, 'load_order': ["Case"]}
+    save_etl_config(sqlite_conn, saved)
+    assert get_etl_config(sqlite_conn) == saved
+    config = worker._read_config(sqlite_conn)
+    assert config['etl_config'] == saved
+    assert config['schedule_config'] == CONFIG['schedule_config']
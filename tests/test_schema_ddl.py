@@ -0,0 +1,70 @@
+import pytest
+
+from modules.schema_ddl import diff_table, is_widening
+
+EXISTING = [
+    {'name': "sf_id", 'column_type': "char(18)", 'key': "PRI"},
+    {'name': "name", 'column_type': "varchar(255)", 'key': ""},
+    {'name': "annual_revenue", 'column_type': "decimal(18,2)", 'key': ""},
+    {'name': "employees", 'column_type': "int(11)", 'key': ""},
+]
+
+def column(name, col_type, primary=False):
+    return {'source': name, 'name': name, 'type': col_type, 'primary': primary}
+
+@pytest.mark.parametrize("current, new", [
+    ("varchar(40)", "VARCHAR(255)"),
+    ("varchar(4000)", "TEXT"),
+    ("text", "MEDIUMTEXT"),
+    ("int(11)", "BIGINT"),
+    ("int(11)", "DECIMAL(18,2)"),
+    ("decimal(18,2)", "DECIMAL(20,4)"),
+    ("tinyint(1)", "INT"),
+    ("date", "DATETIME(3)"),
+    ("datetime", "DATETIME(3)"),
+    ("decimal(18,2)", "VARCHAR(255)"),
+])
+def test_widening(current, new):
+    assert is_widening(current, new)
+
+@pytest.mark.parametrize("current, new", [
+    ("varchar(255)", "VARCHAR(40)"),
+    ("text", "VARCHAR(4000)"),
+    ("decimal(18,2)", "DECIMAL(18,0)"),
+    ("decimal(18,2)", "DECIMAL(10,2)"),
+    ("bigint(20)", "INT"),
+    ("bigint(20)", "DECIMAL(18,2)"),
+    ("datetime(3)", "DATE"),
+    ("datetime(3)", "DATETIME"),
+    ("varchar(255)", "DECIMAL(18,2)"),
+    ("decimal(18,2)", "VARCHAR(10)"),
+    ("json", "TEXT"),
+])
+def test_narrowing(current, new):
+    assert not is_widening(current, new)
+
+def test_diff_applies_widening_and_reports_narrowing():
+    columns = [
+        column("sf_id", "CHAR(18)", primary=True),
+        column("name", "VARCHAR(40)"),
+        column("annual_revenue", "DECIMAL(20,2)"),
+        column("employees", "INT"),
+        column("industry", "VARCHAR(255)"),
+    ]
+    statements, notes, warnings = diff_table("stg_sf_account", columns, EXISTING)
+
+    assert statements == [
+        "ALTER TABLE `stg_sf_account`\n"
+        "  MODIFY COLUMN `annual_revenue` DECIMAL(20,2),\n"
+        "  ADD COLUMN `industry` VARCHAR(255) AFTER `employees`"
+    ]
+    assert notes == ["annual_revenue: decimal(18,2) -> DECIMAL(20,2)"]
+    assert len(warnings) == 1 and warnings[0].startswith("name: varchar(255) -> VARCHAR(40) not applied")
+
+def test_diff_with_only_narrowing_has_no_statements():
+    columns = [column("sf_id", "CHAR(18)", primary=True), column("annual_revenue", "DECIMAL(18,0)")]
+    statements, notes, warnings = diff_table("stg_sf_account", columns, EXISTING)
+    assert statements == []
+    assert notes == ["kept columns not in the mapping: name, employees"]
+    assert warnings == ["annual_revenue: decimal(18,2) -> DECIMAL(18,0) not applied, since it could truncate "
+                        "existing values; change it manually after checking the data"]
@@ -0,0 +1,85 @@
+import pytest
+
+from modules.sf_extract import (BulkJobError, create_bulk_query_job, iter_bulk_results, open_record_stream,
+                                wait_for_bulk_job)
+
+CONTACTS = [
+    {'Id': f"003{i:015d}", 'LastName': f"Contact {i}", 'Email': f"c{i}@example.com" if i % 2 else None}
+    for i in range(1, 6)
+]
+MAPPING = {'object': "Contact", 'fields': ["Id", "LastName", "Email"], 'extract_method': "Auto"}
+
+@pytest.fixture
+def sf(fake_sf):
+    # Jobs complete on the first poll so the default poll interval never sleeps
+    fake_sf.bulk_states = ["JobComplete"]
+    fake_sf.records = {'Contact': CONTACTS}
+    return fake_sf.client()
+
+def test_create_job_posts_query(fake_sf, sf):
+    job_id = create_bulk_query_job(sf, "SELECT Id, LastName FROM Contact", include_deleted=True)
+    assert job_id.startswith("750")
+    assert ("POST", "/services/data/v59.0/jobs/query") in fake_sf.requests
+
+def test_wait_polls_until_complete(fake_sf, sf):
+    fake_sf.bulk_states = ["UploadComplete", "InProgress", "InProgress", "JobComplete"]
+    job_id = create_bulk_query_job(sf, "SELECT Id FROM Contact")
+    assert wait_for_bulk_job(sf, job_id, poll_interval=0)['state'] == "JobComplete"
+    assert fake_sf.requests.count(("GET", f"/services/data/v59.0/jobs/query/{job_id}")) == 4
+
+@pytest.mark.parametrize("state", ["Failed", "Aborted"])
+def test_wait_raises_on_failed_job(fake_sf, sf, state):
+    fake_sf.bulk_states = ["InProgress", state]
+    job_id = create_bulk_query_job(sf, "SELECT Id FROM Contact")
+    with pytest.raises(BulkJobError, match=state):
+        wait_for_bulk_job(sf, job_id, poll_interval=0)
+
+def test_wait_times_out(fake_sf, sf):
+    fake_sf.bulk_states = ["InProgress"]
+    job_id = create_bulk_query_job(sf, "SELECT Id FROM Contact")
+    with pytest.raises(BulkJobError, match="did not complete"):
+        wait_for_bulk_job(sf, job_id, poll_interval=0, timeout=0)
+
+def test_results_follow_locator_until_null(fake_sf, sf):
+    job_id = create_bulk_query_job(sf, "SELECT Id, LastName, Email FROM Contact ORDER BY Id")
+    wait_for_bulk_job(sf, job_id, poll_interval=0)
+    position = {}
+    records = list(iter_bulk_results(sf, job_id, page_size=2, position=position))
+
+    assert [r['Id'] for r in records] == [c['Id'] for c in CONTACTS]
+    pages = [p for p in fake_sf.requests if p == ("GET", f"/services/data/v59.0/jobs/query/{job_id}/results")]
+    assert len(pages) == 3
+    # The last page's locator is 'null'; the position stays on the page that held the last record
+    assert position == {'bulk_job': job_id, 'locator': "4", 'offset': 1}
+
+def test_results_resume_from_position(fake_sf, sf):
+    job_id = create_bulk_query_job(sf, "SELECT Id FROM Contact ORDER BY Id")
+    wait_for_bulk_job(sf, job_id, poll_interval=0)
+    position = {'bulk_job': job_id, 'locator': "2", 'offset': 1}
+    records = list(iter_bulk_results(sf, job_id, page_size=2, position=position))
+    assert [r['Id'] for r in records] == [c['Id'] for c in CONTACTS[3:]]
+
+def test_empty_csv_values_become_none(fake_sf, sf):
+    job_id = create_bulk_query_job(sf, "SELECT Id, LastName, Email FROM Contact ORDER BY Id")
+    wait_for_bulk_job(sf, job_id, poll_interval=0)
+    records = list(iter_bulk_results(sf, job_id))
+    assert records[1] == {'Id': CONTACTS[1]['Id'], 'LastName': "Contact 2", 'Email': None}
+    assert records[0]['Email'] == "c1@example.com"
+
+def test_auto_uses_bulk_above_threshold(fake_sf, sf):
+    method, stream = open_record_stream(sf, MAPPING, bulk_threshold=1)
+    assert method == "Bulk API 2.0"
+    assert [r['Id'] for r in stream] == [c['Id'] for c in CONTACTS]
+
+def test_auto_falls_back_to_rest_when_job_rejected(fake_sf, sf):
+    fake_sf.bulk_reject = "FUNCTIONALITY_NOT_ENABLED: compound fields are not supported"
+    method, stream = open_record_stream(sf, MAPPING, bulk_threshold=1)
+    assert method == "REST"
+    records = list(stream)
+    assert [r['Id'] for r in records] == [c['Id'] for c in CONTACTS]
+    assert records[1]['Email'] is None
+
+def test_explicit_bulk_does_not_fall_back(fake_sf, sf):
+    fake_sf.bulk_reject = "INVALIDJOB"
+    with pytest.raises(BulkJobError, match="INVALIDJOB"):
+        open_record_stream(sf, {**MAPPING, 'extract_method': "Bulk API 2.0"})
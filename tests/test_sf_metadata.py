@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from modules import sf_metadata
+from modules.sf_metadata import FIELD_KEYS, describe_object, prefetch_describes
+
+ACCOUNT_DESCRIBE = {
+    'name': "Account", 'label': "Account", 'keyPrefix': "001", 'urls': {'sobject': "/sobjects/Account"},
+    'fields': [{'name': "Id", 'type': "id", 'length': 18, 'nillable': False, 'inlineHelpText': None},
+               {'name': "Name", 'type': "string", 'length': 255, 'nillable': False}],
+}
+
+@pytest.fixture
+def sf(fake_sf, tmp_path, monkeypatch):
+    monkeypatch.setattr(sf_metadata, "CACHE_DIR", str(tmp_path / "metadata"))
+    monkeypatch.setattr(sf_metadata, "_memory", {})
+    fake_sf.records = {'Organization': [{'Id': "00D000000000001AAA"}]}
+    fake_sf.describes = {'Account': json.loads(json.dumps(ACCOUNT_DESCRIBE))}
+    return fake_sf.client()
+
+def describe_calls(fake_sf):
+    return sum(1 for _, path in fake_sf.requests if path.endswith("/sobjects/Account/describe/"))
+
+def test_fresh_entries_are_served_without_a_request(fake_sf, sf):
+    desc, source = describe_object(sf, "Account")
+    assert source == "fetched"
+    assert [f['name'] for f in desc['fields']] == ["Id", "Name"]
+    # Only the attributes the app uses are kept
+    assert set(desc['fields'][0]) == set(FIELD_KEYS) and 'urls' not in desc
+
+    assert describe_object(sf, "Account") == (desc, "cached")
+    assert describe_calls(fake_sf) == 1
+
+def test_stale_entry_is_revalidated_with_its_etag(fake_sf, sf):
+    desc, _ = describe_object(sf, "Account")
+    assert describe_object(sf, "Account", max_age=0) == (desc, "not modified")
+    assert describe_calls(fake_sf) == 2
+
+    # A changed describe gets a new ETag, so the next revalidation downloads it
+    fake_sf.describes['Account']['fields'].append({'name': "Industry", 'type': "picklist"})
+    changed, source = describe_object(sf, "Account", max_age=0)
+    assert source == "fetched"
+    assert [f['name'] for f in changed['fields']] == ["Id", "Name", "Industry"]
+
+def test_cache_files_outlive_the_process_memory(fake_sf, sf, monkeypatch):
+    desc, _ = describe_object(sf, "Account")
+    path = os.path.join(sf_metadata.CACHE_DIR, "00D000000000001", "describe_Account.json")
+    assert json.load(open(path))['data'] == desc
+
+    monkeypatch.setattr(sf_metadata, "_memory", {})
+    assert describe_object(sf, "Account") == (desc, "cached")
+    assert describe_object(sf, "Account", force=True) == (desc, "not modified")
+    assert describe_calls(fake_sf) == 2
+
+def test_prefetch_reports_each_object(fake_sf, sf):
+    describe_object(sf, "Account")
+    outcome = prefetch_describes(sf, ["Account", "Missing", "Account"])
+    assert outcome['Account'] == "cached"
+    assert outcome['Missing'].startswith("error: GET sobjects/Missing/describe/ failed (404)")
@@ -0,0 +1,40 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from modules import staging
+from modules.staging import SnapshotWriter, list_snapshots
+
+pytestmark = pytest.mark.skipif(not staging.staging_available(), reason="staging needs pyarrow")
+
+FRAME = pd.DataFrame({'Name': ["a", "b"]}, index=["001A", "001B"])
+
+def committed(root):
+    writer = SnapshotWriter("Account", root=str(root))
+    writer.write(FRAME)
+    writer.commit()
+    return writer
+
+def test_keeps_the_newest_complete_snapshots(tmp_path):
+    writers = [committed(tmp_path) for _ in range(4)]
+    kept = [s['snapshot_id'] for s in list_snapshots("Account", str(tmp_path))]
+    assert kept == [writers[3].snapshot_id, writers[2].snapshot_id]
+
+def test_in_progress_snapshot_survives_other_commits(tmp_path):
+    in_progress = SnapshotWriter("Account", root=str(tmp_path))
+    in_progress.write(FRAME)
+    for _ in range(3):
+        committed(tmp_path)
+
+    assert os.path.isdir(in_progress.path)
+    in_progress.write(FRAME)
+    assert in_progress.commit()['rows'] == 4
+
+def test_abandoned_snapshot_is_removed(tmp_path):
+    abandoned = SnapshotWriter("Account", root=str(tmp_path))
+    stale = time.time() - staging.ABANDONED_AFTER_SECONDS - 60
+    os.utime(abandoned.path, (stale, stale))
+    committed(tmp_path)
+    assert not os.path.exists(abandoned.path)
@@ -0,0 +1,110 @@
+import pandas as pd
+import pytest
+
+from modules.transformer import (PLAN_CACHE_SIZE, TransformConfigError, _plan_cache, apply_plan_checked, compile_op,
+                                 compile_plan, compile_transformations, config_hash, validate_field_config)
+
+def run_op(cfg, values):
+    return compile_op(cfg)(pd.Series(values, dtype=object)).tolist()
+
+@pytest.mark.parametrize("handle_null, expected", [
+    ("Zero", [12, 0, 0, 3]),
+    ("Keep Null", [12, pd.NA, pd.NA, 3]),
+    ("Default", [12, -1, -1, 3]),
+])
+def test_number_null_strategies(handle_null, expected):
+    cfg = {'type': "To Number", 'handle_null': handle_null, 'null_default': -1}
+    assert run_op(cfg, ["12.4", None, "", 3]) == expected
+
+def test_number_default_is_rounded_to_the_decimal_places():
+    cfg = {'type': "To Number", 'decimal_places': 1, 'handle_null': "Default", 'null_default': "2.46"}
+    assert run_op(cfg, ["1.04", None]) == [1.0, 2.5]
+
+def test_number_default_needs_a_numeric_value():
+    assert validate_field_config({'type': "To Number", 'handle_null': "Default"}) == ["null_default 'None' is not a number"]
+    assert validate_field_config({'type': "To Number", 'handle_null': "Blank"})[0].startswith("handle_null 'Blank'")
+    assert validate_field_config({'type': "To Number", 'handle_null': "Default", 'null_default': "0.5"}) == []
+
+@pytest.mark.parametrize("cfg, expected", [
+    ({'type': "To Date", 'tgt_fmt': "YYYYMMDD"}, ["20240131", None]),
+    ({'type': "To Date", 'src_fmt': "YYYY/MM/DD", 'tgt_fmt': "YYYY-MM-DD"}, [None, None]),
+    ({'type': "To DateTime", 'tgt_fmt': "YYYY-MM-DD"}, ["2024-01-31 15:30:00", None]),
+    ({'type': "To DateTime", 'tgt_fmt': "ISO8601", 'tz_convert': True, 'tgt_tz': "Asia/Seoul"},
+     ["2024-02-01T00:30:00", None]),
+])
+def test_datetime_formats_and_timezones(cfg, expected):
+    assert run_op(cfg, ["2024-01-31T15:30:00.000+0000", None]) == expected
+
+def test_boolean_maps_listed_values_and_native_booleans():
+    cfg = {'type': "To Boolean", 'true_val': "Y,yes", 'false_val': "N"}
+    assert run_op(cfg, ["Y", " YES ", "n", True, False, "maybe", None]) == [1, 1, 0, 1, 0, pd.NA, pd.NA]
+
+def test_enum_keeps_unmapped_values():
+    cfg = {'type': "Enum Mapping", 'enum_map': '{"Hot": "H", "Cold": "C"}'}
+    out = run_op(cfg, ["Hot", "Warm", None])
+    assert out[:2] == ["H", "Warm"] and pd.isna(out[2])
+
+def test_compound_fields_pass_through_as_json():
+    out = run_op({'type': "None"}, [{'city': "Seoul", 'attributes': {}}, None])
+    assert out[0] == '{"city": "Seoul"}' and pd.isna(out[1])
+
+def test_checked_plan_rejects_rows_with_the_first_failing_field():
+    plan = compile_plan({
+        'field_map': {'Amount': "amount", 'Stage': "stage"},
+        'field_configs': {'Amount': {'type': "To Number"},
+                          'Stage': {'type': "Enum Mapping", 'enum_map': {'Won': "W"}, 'on_error': "Reject Row"}},
+    })
+    frame = pd.DataFrame({'Amount': ["5", "x", "7"], 'Stage': ["Won", "Lost", "Lost"]}, index=["a", "b", "c"])
+
+    good, reasons = apply_plan_checked(plan, frame)
+
+    assert good.to_dict('index') == {'a': {'amount': 5, 'stage': "W"}}
+    assert reasons.to_dict() == {'b': "Amount: not a number ('x')", 'c': "Stage: no enum_map entry ('Lost')"}
+
+def plan_config(places=0):
+    return {'Account': {'field_map': {'AnnualRevenue': "revenue"},
+                        'field_configs': {'AnnualRevenue': {'type': "To Number", 'decimal_places': places}}}}
+
+@pytest.fixture
+def empty_cache():
+    _plan_cache.clear()
+    yield
+    _plan_cache.clear()
+
+def test_compiled_plans_are_cached_per_config(empty_cache):
+    plans = compile_transformations(plan_config())
+    # Key order does not change the hash, so an equal config read back from JSON hits the cache
+    reordered = {'Account': dict(reversed(list(plan_config()['Account'].items())))}
+    assert compile_transformations(reordered) is plans
+    assert compile_transformations(plan_config()) is plans
+
+def test_changed_config_compiles_a_new_plan(empty_cache):
+    plans = compile_transformations(plan_config(0))
+    changed = compile_transformations(plan_config(2))
+    assert changed is not plans
+    frame = pd.DataFrame({'AnnualRevenue': ["1.234"]})
+    assert apply_plan_checked(changed['Account'], frame)[0]['revenue'].tolist() == [1.23]
+    assert apply_plan_checked(plans['Account'], frame)[0]['revenue'].tolist() == [1]
+
+def test_cache_evicts_the_oldest_config(empty_cache):
+    configs = [plan_config(places) for places in range(PLAN_CACHE_SIZE + 1)]
+    first = compile_transformations(configs[0])
+    for config in configs[1:]:
+        compile_transformations(config)
+    assert len(_plan_cache) == PLAN_CACHE_SIZE and config_hash(configs[0]) not in _plan_cache
+    assert compile_transformations(configs[0]) is not first
+
+def test_bad_rules_raise_before_anything_is_cached(empty_cache):
+    config = plan_config()
+    config['Account']['field_configs']['AnnualRevenue'].update(decimal_places="two", on_error="Skip")
+    config['Account']['field_configs']['Skipped'] = {'type': "Unknown"}
+
+    with pytest.raises(TransformConfigError) as raised:
+        compile_transformations(config)
+
+    # Every problem of mapped fields is reported at once; rules of unmapped fields are ignored
+    assert raised.value.errors == [
+        "Account.AnnualRevenue: decimal_places 'two' is not an integer",
+        "Account.AnnualRevenue: on_error 'Skip' is not one of ['Reject Row', 'Keep Value']",
+    ]
+    assert config_hash(config) not in _plan_cache
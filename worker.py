@@ -0,0 +1,91 @@
+"""Scheduler worker: runs the ETL on the schedule saved from the Schedule tab.
+
+Usage:
+    python worker.py [--config config.json] [--poll-interval 30] [--metrics-port 9108] [--profile]
+
+Runs as its own process (Procfile `worker`), separate from the Streamlit web process.
+The app saves etl_config (mappings, transformations, load order) to the etl_saved_config table
+and the Schedule tab saves schedules to etl_schedule_config in the target database (the dynos
+keep no state of their own); both are re-read every poll interval, so changes apply without a
+restart. config.json supplies the credentials, and its etl_config is used only until the app has
+saved one. A change of mariadb_config or of Max Concurrent DB Writers beyond the pool needs a
+restart of the worker.
+Batch sizes learned by adaptive sizing are kept in the etl_batch_sizes table.
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+from modules.db import DEFAULT_POOL_SIZE, ConnectionPool, connect_mariadb, get_pool
+from modules.etl_runner import run_etl
+from modules.metrics import serve_metrics
+from modules.profiler import StageProfiler
+from modules.scheduler import DEFAULT_MAX_DB_WRITERS, JOB_ID, POLL_INTERVAL, ScheduleWorker
+from modules.state_store import ensure_state_tables, get_schedule_configs
+from modules.transformer import compile_transformations
+from run_etl import connect_salesforce
+
+logger = logging.getLogger("worker")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Salesforce -> MariaDB ETL on its saved schedule.")
+    parser.add_argument("--config", default="config.json", help="Path to config.json")
+    parser.add_argument("--poll-interval", type=int, default=POLL_INTERVAL,
+                        help="Seconds between config re-reads and heartbeats")
+    parser.add_argument("--instance-url", help="Salesforce instance URL (use with --session-id)")
+    parser.add_argument("--session-id", help="Salesforce session id / access token")
+    parser.add_argument("--sqlite", help="Load into a local SQLite file instead of MariaDB")
+    parser.add_argument("--metrics-port", type=int, help="Serve timers and counters as OpenMetrics on /metrics")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every run; hotspots are stored in the run history (Runs tab)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    def run(config, conn, pool, objects, budget):
+        etl_config = config.get('etl_config', {})
+        compile_transformations(etl_config.get('transformations', {}))
+        # Log in per run; a session from the previous run may have expired
+        sf = connect_salesforce(config.get('sf_config', {}), args.instance_url, args.session_id)
+        return run_etl(etl_config, sf, conn, objects=objects, pool=pool, budget=budget, source="schedule",
+                       profiler=StageProfiler() if args.profile else None)
+
+    if args.sqlite:
+        pool = ConnectionPool(lambda: sqlite3.connect(args.sqlite, check_same_thread=False))
+    else:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+        mariadb_config = config.get('mariadb_config', {})
+        conn = connect_mariadb(mariadb_config)
+        try:
+            ensure_state_tables(conn)
+            schedule_config = get_schedule_configs(conn).get(JOB_ID, config.get('schedule_config', {}))
+        finally:
+            conn.close()
+        # One connection per concurrently writing run, plus the heartbeat/dispatch bookkeeping
+        writers = int(schedule_config.get('max_db_writers') or DEFAULT_MAX_DB_WRITERS)
+        pool_size = max(int(mariadb_config.get('pool_size') or DEFAULT_POOL_SIZE), writers + 2)
+        pool = get_pool(mariadb_config, max_size=pool_size)
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+        logger.info("Serving metrics on :%d/metrics", args.metrics_port)
+
+    worker = ScheduleWorker(args.config, pool, run, poll_interval=args.poll_interval)
+    try:
+        worker.start()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Worker stopped")
+    finally:
+        pool.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())